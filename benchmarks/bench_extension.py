@@ -0,0 +1,190 @@
+"""
+Times the hot paths of the extension on a synthetic stage, headless: the extension is loaded with the stand-ins
+from kit_stubs.py, so only pxr and numpy are required.
+
+    python benchmarks/bench_extension.py --objects 20 --meshes 50 --materials 10 --variants 3 --output result.json
+
+Every operation is reported with the number of calls and min/median/mean/max seconds per call. Operations run in
+the background are timed per frame, so max_s is the worst frame. The report also contains the parameters, the
+version of the extension and of USD, so results of different releases can be compared.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import pathlib
+import platform
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+
+import kit_stubs  # noqa: E402
+import synthetic_stage  # noqa: E402
+
+from pxr import Gf, Usd  # noqa: E402
+
+
+class Timings:
+    def __init__(self):
+        self.samples = {}
+
+    def measure(self, name, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.samples.setdefault(name, []).append(time.perf_counter() - start)
+        return result
+
+    def report(self):
+        return {
+            name: {
+                "calls": len(samples),
+                "min_s": min(samples),
+                "median_s": statistics.median(samples),
+                "mean_s": statistics.fmean(samples),
+                "max_s": max(samples),
+            }
+            for name, samples in self.samples.items()
+        }
+
+
+def measure_frames(timings, name, scheduler, start_job, *args):
+    """It starts a background job and runs it to the end one slice at a time, the way the app does it every frame"""
+    job = timings.measure(name, start_job, *args, background=True)
+    if job is None:
+        return None
+    while not job.is_finished:
+        timings.measure(name, job.run_slice, time.perf_counter() + scheduler.DEFAULT_BUDGET_MS / 1000.0)
+    # The jobs are only queued, the loop never runs
+    scheduler.cancel(job)
+    return job
+
+
+def get_extension_version():
+    toml = (kit_stubs.EXT_PATH / "config" / "extension.toml").read_text()
+    match = re.search(r'^version\s*=\s*"([^"]+)"', toml, re.MULTILINE)
+    return match.group(1) if match else None
+
+
+def run(args):
+    kit_stubs.install()
+    ext_module = kit_stubs.import_extension()
+    from karpenko.materialsmanager.ext.prim_serializer import get_prim_as_text
+
+    stage = synthetic_stage.build_stage(args.objects, args.meshes, args.materials, args.spacing)
+    camera_path = synthetic_stage.add_camera(stage)
+    kit_stubs.VIEWPORT.camera_path = str(camera_path)
+    kit_stubs.open_stage(stage)
+
+    # The roaming task is only scheduled, the loop never runs, so it doesn't interfere with the timings
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    ext = ext_module.MaterialManagerExtended()
+    ext.on_startup(kit_stubs.EXT_ID)
+    if args.deduplicate:
+        ext.set_setting(True, "MMEDeduplicateMaterials")
+    timings = Timings()
+    objects = [stage.GetPrimAtPath(synthetic_stage.get_object_path(i)) for i in range(args.objects)]
+
+    # Variants are created the way the UI does it
+    for _ in range(args.variants):
+        for prim in objects:
+            timings.measure("add_variant", ext.add_variant, prim.GetPrimAtPath("Looks"), prim)
+    layer_size = len(stage.GetRootLayer().ExportToString())
+
+    for _ in range(args.repeat):
+        timings.measure("get_mme_valid_objects_on_stage", ext.get_mme_valid_objects_on_stage)
+
+    variant_names = [None] + [f"Look_{i}" for i in range(1, args.variants + 1)]
+    for _ in range(args.repeat):
+        for prim in objects:
+            looks = prim.GetPrimAtPath("Looks")
+            for folder_name in variant_names[1:] + variant_names[:1]:
+                timings.measure("enable_variant", ext.enable_variant, folder_name, looks, prim)
+
+    # A material of the active variant is bound to another mesh, then the extension updates the variant
+    if args.variants:
+        for prim in objects:
+            ext.enable_variant("Look_1", prim.GetPrimAtPath("Looks"), prim)
+        for repeat in range(args.repeat):
+            for i, prim in enumerate(objects):
+                mesh_path = synthetic_stage.get_mesh_path(i, repeat % args.meshes)
+                material_index = (repeat + 1) % args.materials
+                material_path = prim.GetPath().AppendPath(f"Looks/MME/Look_1/Material_{material_index}")
+                ext.ignore_change = True
+                kit_stubs.COMMANDS.execute("BindMaterial", prim_path=mesh_path, material_path=material_path)
+                ext.ignore_change = False
+                latest_action = next(reversed(kit_stubs.COMMANDS.history.values()))
+                timings.measure("update_material_data", ext.update_material_data, latest_action)
+
+    # One more variant of every object at once, the way "Add variant to selected models" does it
+    timings.measure("add_variants", ext.add_variants, objects)
+
+    # The same in the background, every slice of the frame budget is one frame
+    for prim in objects:
+        measure_frames(timings, "add_variant_frame", ext.jobs, ext.add_variant, prim.GetPrimAtPath("Looks"), prim)
+    measure_frames(timings, "add_variants_frame", ext.jobs, ext.add_variants, objects)
+
+    # Commands of other tools reach on_change as well, they have to be rejected without touching the stage
+    kit_stubs.COMMANDS.execute(
+        "ChangeProperty", prop_path=camera_path.AppendProperty("xformOp:translate"), value=Gf.Vec3d(0.0), prev=None
+    )
+    for _ in range(args.repeat):
+        timings.measure("on_change_unhandled", ext.on_change)
+
+    for i in range(args.objects):
+        material_paths = [synthetic_stage.get_material_path(i, j) for j in range(args.materials)]
+        timings.measure("get_prim_as_text", get_prim_as_text, stage, material_paths)
+
+    ext.set_setting(True, "MMEEnableRoamingMode")
+    ext.set_setting(float(args.spacing * 2), "MMEMaxVisibleDistance")
+    translate_attr = stage.GetPrimAtPath(camera_path).GetAttribute("xformOp:translate")
+    extent = args.spacing * max(1, int(args.objects ** 0.5))
+    for repeat in range(args.repeat):
+        # The camera flies across the grid, so the closest object changes
+        position = extent * repeat / max(1, args.repeat - 1)
+        translate_attr.Set(Gf.Vec3d(position, 100.0, position))
+        timings.measure("get_closest_mme_object", ext.get_closest_mme_object)
+
+    command_handlers = ext.command_router.get_stats()
+    ext.on_shutdown()
+    return {
+        "extension_version": get_extension_version(),
+        "usd_version": ".".join(str(i) for i in Usd.GetVersion()),
+        "python_version": platform.python_version(),
+        "parameters": vars(args),
+        "commands": dict(kit_stubs.COMMANDS.counts),
+        # Timing counters of the on_change handlers
+        "command_handlers": command_handlers,
+        # Size of the scene as USDA text after all variants were added
+        "layer_size_bytes": layer_size,
+        "warnings": kit_stubs.LOG["warn"],
+        "errors": kit_stubs.LOG["error"],
+        "timings": timings.report(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=10)
+    parser.add_argument("--meshes", type=int, default=20)
+    parser.add_argument("--materials", type=int, default=5)
+    parser.add_argument("--variants", type=int, default=2)
+    parser.add_argument("--spacing", type=float, default=300.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--deduplicate", action="store_true", help="Share identical materials between variants")
+    parser.add_argument("--output", help="Write the report into this file instead of stdout")
+    args = parser.parse_args()
+
+    # The extension prints into stdout, it's kept for the report only
+    with contextlib.redirect_stdout(sys.stderr):
+        report = json.dumps(run(args), indent=4)
+    if args.output:
+        pathlib.Path(args.output).write_text(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compares the legacy (base64 encoded JSON) and the current (parallel arrays) formats of the mesh data:
+encode/decode throughput and the size of the layer that stores it.
+
+Requires only pxr:
+
+    python benchmarks/bench_mesh_data.py --entries 10000
+"""
+import argparse
+import importlib.util
+import json
+import pathlib
+import sys
+import time
+import types
+
+from pxr import Sdf, Usd
+
+EXT_PATH = pathlib.Path(__file__).resolve().parents[1] / "exts" / "karpenko.materialsmanager.ext"
+MESH_DATA_PATH = EXT_PATH / "karpenko" / "materialsmanager" / "ext" / "mesh_data.py"
+
+
+def _load_mesh_data():
+    # mesh_data only needs carb for logging
+    if "carb" not in sys.modules:
+        carb = types.ModuleType("carb")
+        carb.log_warn = print
+        sys.modules["carb"] = carb
+    spec = importlib.util.spec_from_file_location("mesh_data", MESH_DATA_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_entries(count, materials):
+    return [
+        {
+            "mesh": f"/World/Vehicle/Body/Part_{i // 100}/Mesh_{i}",
+            "path": f"/World/Vehicle/Looks/Material_{i % materials}",
+        }
+        for i in range(count)
+    ]
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def layer_size(write_fn):
+    stage = Usd.Stage.CreateInMemory()
+    prim = stage.DefinePrim("/World/Vehicle/Looks/MME/Look_1", "Scope")
+    write_fn(prim)
+    return len(stage.GetRootLayer().ExportToString().encode()), stage, prim
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--materials", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    mesh_data = _load_mesh_data()
+    entries = make_entries(args.entries, args.materials)
+
+    def write_legacy(prim):
+        prim.CreateAttribute(mesh_data.LEGACY_ATTR, Sdf.ValueTypeNames.StringArray, custom=True).Set(
+            [value.decode() for value in mesh_data.encode_legacy_mesh_data(entries)]
+        )
+
+    legacy_size, legacy_stage, legacy_prim = layer_size(write_legacy)
+    current_size, current_stage, current_prim = layer_size(lambda prim: mesh_data.write_mesh_data(prim, entries))
+
+    results = {
+        "entries": args.entries,
+        "unique_materials": args.materials,
+        "legacy": {
+            "encode_s": measure(lambda: mesh_data.encode_legacy_mesh_data(entries), args.repeat),
+            "decode_s": measure(lambda: mesh_data.read_mesh_data(legacy_prim), args.repeat),
+            "layer_bytes": legacy_size,
+        },
+        "current": {
+            "encode_s": measure(lambda: mesh_data.encode_mesh_data(entries), args.repeat),
+            "decode_s": measure(lambda: mesh_data.read_mesh_data(current_prim), args.repeat),
+            "layer_bytes": current_size,
+        },
+    }
+    for fmt in ("legacy", "current"):
+        for op in ("encode", "decode"):
+            results[fmt][f"{op}_entries_per_s"] = args.entries / max(results[fmt][f"{op}_s"], 1e-9)
+
+    # Both formats have to decode to exactly the same data
+    assert mesh_data.read_mesh_data(legacy_prim) == mesh_data.read_mesh_data(current_prim)
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Measures the material thumbnail pipeline: requesting thumbnails of all materials of a stage when nothing is cached
+(rendered in the background), when they are in memory, and when only the disk cache has them (a new session).
+
+    python benchmarks/bench_thumbnails.py --materials 800 --renderer stub
+
+The stub renderer is deterministic and cheap, so the numbers show the overhead of the pipeline itself. The swatch
+renderer is the one the extension uses by default.
+"""
+import argparse
+import asyncio
+import json
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+
+import kit_stubs  # noqa: E402
+import synthetic_stage  # noqa: E402
+
+
+def run(args):
+    kit_stubs.install()
+    kit_stubs.import_extension()
+    from karpenko.materialsmanager.ext.thumbnails import (StubRenderer, SwatchRenderer, ThumbnailDiskCache,
+                                                          ThumbnailService)
+
+    stage = synthetic_stage.build_stage(1, 1, args.materials)
+    materials = [stage.GetPrimAtPath(synthetic_stage.get_material_path(0, i)) for i in range(args.materials)]
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    results = {}
+
+    def create_service(directory):
+        renderer = StubRenderer() if args.renderer == "stub" else SwatchRenderer()
+        return ThumbnailService(ThumbnailDiskCache(directory, args.cache_mb * 1024 * 1024), renderer, args.size)
+
+    with tempfile.TemporaryDirectory() as directory:
+        service = create_service(directory)
+        ready = []
+        start = time.perf_counter()
+        for prim in materials:
+            service.request(prim, ready.append)
+        results["cold_request_s"] = time.perf_counter() - start
+        loop.run_until_complete(service.wait())
+        results["cold_total_s"] = time.perf_counter() - start
+        results["rendered"] = len(ready)
+
+        start = time.perf_counter()
+        hits = sum(1 for prim in materials if service.request(prim))
+        results["memory_s"] = time.perf_counter() - start
+        results["memory_hits"] = hits
+
+        # A new session: keys are computed again, the files are found on disk
+        service = create_service(directory)
+        start = time.perf_counter()
+        hits = sum(1 for prim in materials if service.request(prim))
+        results["disk_s"] = time.perf_counter() - start
+        results["disk_hits"] = hits
+        results["disk_cache_bytes"] = service.disk_cache.size
+        results["disk_cache_files"] = len(service.disk_cache)
+    loop.close()
+    return {"parameters": vars(args), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--materials", type=int, default=200)
+    parser.add_argument("--size", type=int, default=64)
+    parser.add_argument("--cache-mb", type=int, default=64)
+    parser.add_argument("--renderer", choices=("stub", "swatch"), default="stub")
+    print(json.dumps(run(parser.parse_args()), indent=4))
+
+
+if __name__ == "__main__":
+    main()
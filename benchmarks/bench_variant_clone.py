@@ -0,0 +1,98 @@
+"""
+Compares the two ways of copying materials into a variant folder:
+the USDA text round trip (get_prim_as_text + ImportLayer) and the direct layer-to-layer clone_prims.
+
+Requires only pxr:
+
+    python benchmarks/bench_variant_clone.py --materials 200 --shaders 10
+"""
+import argparse
+import importlib.util
+import json
+import pathlib
+import sys
+import time
+import types
+
+from pxr import Sdf, Usd, UsdShade
+
+EXT_PATH = pathlib.Path(__file__).resolve().parents[1] / "exts" / "karpenko.materialsmanager.ext"
+SERIALIZER_PATH = EXT_PATH / "karpenko" / "materialsmanager" / "ext" / "prim_serializer.py"
+
+
+def _load_prim_serializer():
+    # prim_serializer only needs omni.kit.commands.execute (used by text_to_stage), which isn't called here
+    if "omni.kit.commands" not in sys.modules:
+        for name in ("omni", "omni.kit", "omni.kit.commands"):
+            sys.modules.setdefault(name, types.ModuleType(name))
+        sys.modules["omni.kit.commands"].execute = None
+    spec = importlib.util.spec_from_file_location("prim_serializer", SERIALIZER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_stage(materials, shaders):
+    stage = Usd.Stage.CreateInMemory()
+    stage.DefinePrim("/World/Car/Looks/MME/Look_1", "Scope")
+    paths = []
+    for i in range(materials):
+        material = UsdShade.Material.Define(stage, f"/World/Car/Looks/Material_{i}")
+        previous = None
+        for j in range(shaders):
+            shader = UsdShade.Shader.Define(stage, f"/World/Car/Looks/Material_{i}/Shader_{j}")
+            shader.CreateIdAttr("UsdPreviewSurface")
+            shader.CreateInput("diffuseColor", Sdf.ValueTypeNames.Color3f).Set((i / materials, j / shaders, 0.5))
+            shader.CreateInput("roughness", Sdf.ValueTypeNames.Float).Set(0.5)
+            output = shader.CreateOutput("out", Sdf.ValueTypeNames.Token)
+            if previous:
+                shader.CreateInput("in", Sdf.ValueTypeNames.Token).ConnectToSource(previous)
+            previous = output
+        material.CreateSurfaceOutput().ConnectToSource(previous)
+        paths.append(material.GetPath())
+    return stage, paths
+
+
+def text_round_trip(serializer, stage, paths, root):
+    text = serializer.get_prim_as_text(stage, paths)
+    layer = serializer._to_layer(text)
+    # The same thing ImportLayer does: put children of every Item_XX root prim under the root
+    target_layer = stage.GetEditTarget().GetLayer()
+    with Sdf.ChangeBlock():
+        for item in layer.rootPrims:
+            for child in item.nameChildren:
+                Sdf.CopySpec(layer, child.path, target_layer, root.AppendChild(child.name))
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--materials", type=int, default=200)
+    parser.add_argument("--shaders", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    serializer = _load_prim_serializer()
+    stage, paths = build_stage(args.materials, args.shaders)
+    root = Sdf.Path("/World/Car/Looks/MME/Look_1")
+
+    results = {
+        "materials": args.materials,
+        "shaders_per_material": args.shaders,
+        "text_round_trip_s": measure(lambda: text_round_trip(serializer, stage, paths, root), args.repeat),
+        "clone_prims_s": measure(lambda: serializer.clone_prims(stage, paths, root), args.repeat),
+    }
+    results["speedup"] = results["text_round_trip_s"] / max(results["clone_prims_s"], 1e-9)
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Measures what variant libraries save: a scene where every model keeps all its looks inline under Looks/MME is
+compared with the same scene after the looks were exported into libraries (export_variants) and linked back as
+payloads, and with the inline scene where the folders of the looks that are not enabled are deactivated
+(MMEDeactivateVariants). For each it reports the time to open the scene and the number of composed prims, the library
+scene is opened the way the extension keeps it, with only the active look of every model loaded.
+
+    python benchmarks/bench_variant_library.py --objects 10 --meshes 20 --materials 10 --looks 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+
+import kit_stubs  # noqa: E402
+import synthetic_stage  # noqa: E402
+
+from pxr import Usd  # noqa: E402
+
+
+def _count_prims(stage):
+    return sum(1 for _ in Usd.PrimRange(stage.GetPseudoRoot()))
+
+
+def _get_active_folders(stage):
+    """The variant folders with MMEisActive set, the flag is authored in the scene so it's readable when unloaded"""
+    return {
+        prim.GetPath() for prim in Usd.PrimRange(stage.GetPseudoRoot(), Usd.PrimAllPrimsPredicate)
+        if prim.GetPath().GetParentPath().name == "MME" and prim.GetAttribute("MMEisActive").Get()
+    }
+
+
+def _open(file_path, lazy, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if lazy:
+            stage = Usd.Stage.Open(file_path, Usd.Stage.LoadNone)
+            stage.LoadAndUnload(_get_active_folders(stage), set())
+        else:
+            stage = Usd.Stage.Open(file_path)
+        timings.append(time.perf_counter() - start)
+        prim_count = _count_prims(stage)
+        # The layers must not be shared between the runs
+        del stage
+    return {"open_s": min(timings), "prims": prim_count}
+
+
+def run(args):
+    kit_stubs.install()
+    ext_module = kit_stubs.import_extension()
+    stage = synthetic_stage.build_stage(args.objects, args.meshes, args.materials)
+    kit_stubs.open_stage(stage)
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    ext = ext_module.MaterialManagerExtended()
+    ext.on_startup(kit_stubs.EXT_ID)
+    objects = [stage.GetPrimAtPath(synthetic_stage.get_object_path(i)) for i in range(args.objects)]
+    for _ in range(args.looks):
+        for prim in objects:
+            ext.add_variant(prim.GetPrimAtPath("Looks"), prim)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        inline_path = os.path.join(directory, "inline.usda")
+        stage.GetRootLayer().Export(inline_path)
+        results["inline"] = _open(inline_path, False, args.repeat)
+
+        # The same scene with the folders of the looks that are not enabled deactivated (MMEDeactivateVariants)
+        start = time.perf_counter()
+        ext.set_deactivate_variants(True)
+        results["deactivate_s"] = time.perf_counter() - start
+        deactivated_path = os.path.join(directory, "inline_deactivated.usda")
+        stage.GetRootLayer().Export(deactivated_path)
+        results["inline_deactivated"] = _open(deactivated_path, False, args.repeat)
+        ext.set_deactivate_variants(False)
+
+        start = time.perf_counter()
+        for prim in objects:
+            ext.export_variants(prim, os.path.join(directory, f"{prim.GetName()}_looks.usda"))
+        results["export_s"] = time.perf_counter() - start
+        library_path = os.path.join(directory, "library.usda")
+        stage.GetRootLayer().Export(library_path)
+        results["library_all_loaded"] = _open(library_path, False, args.repeat)
+        results["library_active_loaded"] = _open(library_path, True, args.repeat)
+    ext.on_shutdown()
+    return {"parameters": vars(args), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=5)
+    parser.add_argument("--meshes", type=int, default=20)
+    parser.add_argument("--materials", type=int, default=10)
+    parser.add_argument("--looks", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    print(json.dumps(run(parser.parse_args()), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Compares the two ways of switching the look of a model:
+rebinding every mesh (SetMMEActiveFlags + BindMaterialsBatch) and selecting a variant of the MMELook variant set
+(SetMMELookSelection). For every switch it measures the time of the edit itself, the time it takes to read the
+bound materials of all meshes afterwards (that's when the stage pays for recomposition), and how many paths the
+change notice reports as resynced or changed.
+
+Requires only pxr and numpy, Kit modules are replaced with the stand-ins from kit_stubs.py:
+
+    python benchmarks/bench_variant_switch.py --meshes 500 --looks 5
+"""
+import argparse
+import importlib
+import json
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+
+import kit_stubs  # noqa: E402
+
+from pxr import Sdf, Tf, Usd, UsdShade  # noqa: E402
+
+OBJECT_PATH = Sdf.Path("/World/Car")
+
+
+def _load_commands():
+    kit_stubs.install()
+    kit_stubs.import_extension()
+    return (
+        importlib.import_module(f"{kit_stubs.EXT_MODULE}.commands"),
+        importlib.import_module(f"{kit_stubs.EXT_MODULE}.variant_sets"),
+    )
+
+
+def build_stage(meshes, looks):
+    """It builds a model with the original materials, the given number of variants and the mesh data of every look"""
+    stage = Usd.Stage.CreateInMemory()
+    looks_path = OBJECT_PATH.AppendChild("Looks")
+    folders = {"Original": looks_path.AppendChild("MME")}
+    for i in range(1, looks + 1):
+        folders[f"Look_{i}"] = looks_path.AppendPath(f"MME/Look_{i}")
+    for folder_path in folders.values():
+        stage.DefinePrim(folder_path, "Scope")
+    looks_data = {}
+    for variant_name, folder_path in folders.items():
+        materials_path = looks_path if variant_name == "Original" else folder_path
+        bindings = []
+        for i in range(meshes):
+            material_path = materials_path.AppendChild(f"Material_{i % 20}")
+            if not stage.GetPrimAtPath(material_path):
+                UsdShade.Material.Define(stage, material_path)
+            bindings.append((OBJECT_PATH.AppendPath(f"Body/Mesh_{i}"), material_path))
+        looks_data[variant_name] = (folder_path, bindings)
+    for mesh_path, _ in looks_data["Original"][1]:
+        stage.DefinePrim(mesh_path, "Mesh")
+    return stage, looks_data
+
+
+class NoticeCounter:
+    def __init__(self, stage):
+        self.resynced = 0
+        self.changed_info = 0
+        self._listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_objects_changed, stage)
+
+    def _on_objects_changed(self, notice, stage):
+        self.resynced += len(notice.GetResyncedPaths())
+        self.changed_info += len(notice.GetChangedInfoOnlyPaths())
+
+    def revoke(self):
+        self._listener.Revoke()
+
+
+def read_bindings(stage, looks_data):
+    for mesh_path, _ in looks_data["Original"][1]:
+        UsdShade.MaterialBindingAPI(stage.GetPrimAtPath(mesh_path)).ComputeBoundMaterial()
+
+
+def run(stage, looks_data, switch_fn, switches):
+    names = list(looks_data)
+    counter = NoticeCounter(stage)
+    edit_s = 0.0
+    read_s = 0.0
+    for i in range(switches):
+        variant_name = names[(i + 1) % len(names)]
+        start = time.perf_counter()
+        switch_fn(variant_name)
+        edit_s += time.perf_counter() - start
+        start = time.perf_counter()
+        read_bindings(stage, looks_data)
+        read_s += time.perf_counter() - start
+    counter.revoke()
+    return {
+        "edit_s": edit_s / switches,
+        "read_bindings_s": read_s / switches,
+        "resynced_paths": counter.resynced / switches,
+        "changed_info_paths": counter.changed_info / switches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meshes", type=int, default=500)
+    parser.add_argument("--looks", type=int, default=5)
+    parser.add_argument("--switches", type=int, default=20)
+    args = parser.parse_args()
+
+    commands, variant_sets = _load_commands()
+
+    # Rebinding: flags and bindings are authored locally on every switch
+    stage, looks_data = build_stage(args.meshes, args.looks)
+    folder_paths = [folder_path for folder_path, _ in looks_data.values()]
+
+    def rebind(variant_name):
+        active_folder_path, bindings = looks_data[variant_name]
+        flags = {folder_path: folder_path == active_folder_path for folder_path in folder_paths}
+        commands.SetMMEActiveFlagsCommand(flags, stage=stage).do()
+        commands.BindMaterialsBatchCommand(bindings, stage=stage).do()
+
+    rebind("Original")
+    read_bindings(stage, looks_data)
+    rebinding = run(stage, looks_data, rebind, args.switches)
+
+    # Variant set: all looks are authored once, a switch only changes the selection
+    stage, looks_data = build_stage(args.meshes, args.looks)
+    start = time.perf_counter()
+    variant_sets.author_look_variants(stage.GetRootLayer(), OBJECT_PATH, looks_data, "Original")
+    convert_s = time.perf_counter() - start
+
+    def select(variant_name):
+        commands.SetMMELookSelectionCommand({OBJECT_PATH: variant_name}, stage=stage).do()
+
+    read_bindings(stage, looks_data)
+    variant_set = run(stage, looks_data, select, args.switches)
+    variant_set["convert_s"] = convert_s
+
+    results = {
+        "meshes": args.meshes,
+        "looks": args.looks + 1,
+        "rebinding": rebinding,
+        "variant_set": variant_set,
+    }
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+"""
+Lightweight stand-ins for the Kit modules the extension imports, so it can be loaded and driven headless with
+nothing but pxr (and numpy). They implement just enough behaviour for the benchmarks: commands are executed
+and recorded in the undo history, UI calls are accepted and ignored, the USD context holds an in-memory stage.
+
+    import kit_stubs
+    kit_stubs.install()
+    ext = kit_stubs.import_extension()
+"""
+import contextlib
+import importlib
+import pathlib
+import sys
+import types
+from collections import OrderedDict
+
+from pxr import Sdf
+
+EXT_PATH = pathlib.Path(__file__).resolve().parents[1] / "exts" / "karpenko.materialsmanager.ext"
+EXT_MODULE = "karpenko.materialsmanager.ext"
+EXT_ID = "karpenko.materialsmanager.ext"
+
+
+def _module(name):
+    module = sys.modules.get(name)
+    if module is None:
+        module = types.ModuleType(name)
+        sys.modules[name] = module
+        parent_name, _, child_name = name.rpartition(".")
+        if parent_name:
+            setattr(_module(parent_name), child_name, module)
+    return module
+
+
+# omni.ui -------------------------------------------------------------------------------------------------------------
+
+class _StubMeta(type):
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Stub
+
+
+class _Stub(metaclass=_StubMeta):
+    """Accepts any construction, call, attribute access and `with` block"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        return _Stub()
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Stub()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+def _stub_getattr(name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+    return _Stub
+
+
+# omni.kit.commands / omni.kit.undo -----------------------------------------------------------------------------------
+
+class Command:
+    def do(self):
+        pass
+
+    def undo(self):
+        pass
+
+
+class _HistoryEntry:
+    def __init__(self, name, kwargs, level, command):
+        self.name = name
+        self.kwargs = kwargs
+        self.level = level
+        self.command = command
+
+
+class _Commands:
+    def __init__(self):
+        self.registry = {}
+        self.history = OrderedDict()
+        self.subscribers = []
+        self.level = 0
+        self.counts = {}
+        # (start, end) of the undo groups in the history
+        self.groups = []
+        self._group_start = 0
+
+    def register(self, cls):
+        self.registry[cls.__name__] = cls
+
+    def register_all_commands_in_module(self, module):
+        for value in vars(module).values():
+            if isinstance(value, type) and issubclass(value, Command) and value is not Command:
+                self.register(value)
+
+    def unregister_module_commands(self, module):
+        for name, value in vars(module).items():
+            if isinstance(value, type) and self.registry.get(name) is value:
+                del self.registry[name]
+
+    def execute(self, name, **kwargs):
+        cls = self.registry.get(name) or self.registry.get(f"{name}Command")
+        if cls is None:
+            raise KeyError(f"Command {name} is not registered")
+        command = cls(**kwargs)
+        result = command.do()
+        self.history[len(self.history)] = _HistoryEntry(name, kwargs, self.level, command)
+        self.counts[name] = self.counts.get(name, 0) + 1
+        for fn in list(self.subscribers):
+            fn()
+        # Like in Kit, the result is returned along with the success flag
+        return True, result
+
+    @contextlib.contextmanager
+    def group(self):
+        self.begin_group()
+        try:
+            yield
+        finally:
+            self.end_group()
+
+    def begin_group(self):
+        if self.level == 0:
+            self._group_start = len(self.history)
+        self.level += 1
+
+    def end_group(self):
+        self.level -= 1
+        # Like in Kit, an empty group leaves nothing in the history
+        if self.level == 0 and self._group_start < len(self.history):
+            self.groups.append((self._group_start, len(self.history)))
+
+    def undo(self):
+        """It undoes the last command, or all commands of the last group"""
+        if not self.history:
+            return
+        start = len(self.history) - 1
+        if self.groups and self.groups[-1][1] == len(self.history):
+            start = self.groups.pop()[0]
+        for key in reversed(list(self.history)[start:]):
+            self.history.pop(key).command.undo()
+
+    def reset(self):
+        self.history.clear()
+        self.counts.clear()
+        self.groups.clear()
+
+
+COMMANDS = _Commands()
+
+
+class UsdLayerUndo:
+    """Remembers specs of the layer before they are changed and puts them back on undo"""
+
+    def __init__(self, layer):
+        self._layer = layer
+        self._backup = Sdf.Layer.CreateAnonymous()
+        self._reserved = []
+
+    def reserve(self, path, info=None):
+        path = Sdf.Path(str(path))
+        existed = bool(self._layer.GetObjectAtPath(path))
+        if existed:
+            _copy_spec(self._layer, self._backup, path)
+        self._reserved.append((path, existed))
+
+    def undo(self):
+        with Sdf.ChangeBlock():
+            for path, existed in reversed(self._reserved):
+                if self._layer.GetObjectAtPath(path):
+                    _remove_spec(self._layer, path)
+                if existed:
+                    _copy_spec(self._backup, self._layer, path)
+        self._reserved = []
+
+
+def _copy_spec(src_layer, dst_layer, path):
+    parent_path = path.GetPrimPath() if path.IsPropertyPath() else path.GetParentPath()
+    if parent_path != Sdf.Path.absoluteRootPath:
+        Sdf.CreatePrimInLayer(dst_layer, parent_path)
+    Sdf.CopySpec(src_layer, path, dst_layer, path)
+
+
+def _remove_spec(layer, path):
+    if path.IsPropertyPath():
+        prim_spec = layer.GetPrimAtPath(path.GetPrimPath())
+        prim_spec.RemoveProperty(prim_spec.properties[path.name])
+    elif path.GetParentPath() == Sdf.Path.absoluteRootPath:
+        del layer.rootPrims[path.name]
+    else:
+        del layer.GetPrimAtPath(path.GetParentPath()).nameChildren[path.name]
+
+
+class _UsdCommand(Command):
+    """Base of the stand-ins for the USD commands of Kit, changes are undone through UsdLayerUndo"""
+
+    def __init__(self, stage=None, usd_context_name="", **kwargs):
+        self._stage = stage or sys.modules["omni.usd"].get_context(usd_context_name).get_stage()
+        self._kwargs = kwargs
+        self._usd_undo = None
+
+    def _begin(self, *paths):
+        self._usd_undo = UsdLayerUndo(self._stage.GetEditTarget().GetLayer())
+        for path in paths:
+            self._usd_undo.reserve(path)
+
+    def undo(self):
+        if self._usd_undo:
+            self._usd_undo.undo()
+            self._usd_undo = None
+
+
+class CreatePrimCommand(_UsdCommand):
+    def do(self):
+        prim_path = Sdf.Path(str(self._kwargs["prim_path"]))
+        self._begin(prim_path)
+        prim = self._stage.DefinePrim(prim_path, self._kwargs.get("prim_type", ""))
+        for name, (attr_type, value) in (self._kwargs.get("attributes") or {}).items():
+            prim.CreateAttribute(name, attr_type).Set(value)
+        return prim_path
+
+
+class CreateUsdAttributeOnPathCommand(_UsdCommand):
+    def do(self):
+        attr_path = Sdf.Path(str(self._kwargs["attr_path"]))
+        self._begin(attr_path)
+        prim = self._stage.GetPrimAtPath(attr_path.GetPrimPath())
+        attr = prim.CreateAttribute(
+            attr_path.name,
+            self._kwargs["attr_type"],
+            self._kwargs.get("custom", True),
+            self._kwargs.get("variability", Sdf.VariabilityVarying),
+        )
+        if self._kwargs.get("attr_value") is not None:
+            attr.Set(self._kwargs["attr_value"])
+        return True
+
+
+class ChangePropertyCommand(_UsdCommand):
+    def do(self):
+        prop_path = Sdf.Path(str(self._kwargs["prop_path"]))
+        self._begin(prop_path)
+        self._stage.GetAttributeAtPath(prop_path).Set(self._kwargs["value"])
+
+
+class RemovePropertyCommand(_UsdCommand):
+    def do(self):
+        prop_path = Sdf.Path(str(self._kwargs["prop_path"]))
+        self._begin(prop_path)
+        self._stage.GetPrimAtPath(prop_path.GetPrimPath()).RemoveProperty(prop_path.name)
+
+
+class DeletePrimsCommand(_UsdCommand):
+    def do(self):
+        paths = [Sdf.Path(str(path)) for path in self._kwargs["paths"]]
+        self._begin(*paths)
+        layer = self._stage.GetEditTarget().GetLayer()
+        with Sdf.ChangeBlock():
+            for path in paths:
+                if layer.GetPrimAtPath(path):
+                    _remove_spec(layer, path)
+
+
+class BindMaterialCommand(_UsdCommand):
+    def do(self):
+        from pxr import UsdShade
+
+        prim_path = Sdf.Path(str(self._kwargs["prim_path"]))
+        self._begin(prim_path)
+        material = UsdShade.Material(self._stage.GetPrimAtPath(str(self._kwargs["material_path"])))
+        UsdShade.MaterialBindingAPI.Apply(self._stage.GetPrimAtPath(prim_path)).Bind(material)
+
+
+# omni.usd ------------------------------------------------------------------------------------------------------------
+
+class StageEventType:
+    SAVED = 0
+    SAVE_FAILED = 1
+    OPENING = 2
+    OPENED = 3
+    OPEN_FAILED = 4
+    CLOSING = 5
+    CLOSED = 6
+    SELECTION_CHANGED = 7
+
+
+class _Selection:
+    def __init__(self):
+        self.paths = []
+
+    def get_selected_prim_paths(self):
+        return list(self.paths)
+
+    def set_selected_prim_paths(self, paths, expand_in_stage=False):
+        self.paths = [str(path) for path in paths]
+
+    def set_prim_path_selected(self, path, selected, *args):
+        if selected:
+            self.paths = [str(path)]
+
+
+class _EventStream:
+    def __init__(self):
+        self.subscribers = []
+
+    def create_subscription_to_pop(self, fn, name=""):
+        self.subscribers.append(fn)
+        return _Stub()
+
+
+class UsdContext:
+    def __init__(self):
+        self.stage = None
+        self.selection = _Selection()
+        self.events = _EventStream()
+
+    def get_stage(self):
+        return self.stage
+
+    def get_selection(self):
+        return self.selection
+
+    def get_stage_event_stream(self):
+        return self.events
+
+
+CONTEXT = UsdContext()
+
+
+# omni.kit.viewport.utility -------------------------------------------------------------------------------------------
+
+class _Viewport:
+    camera_path = "/OmniverseKit_Persp"
+    # Every prim is reported as visible unless it's listed here
+    hidden_paths = set()
+
+
+VIEWPORT = _Viewport()
+
+
+def _get_ui_position_for_prim(window, prim_path):
+    return (0.0, 0.0), Sdf.Path(str(prim_path)) not in VIEWPORT.hidden_paths
+
+
+# carb ----------------------------------------------------------------------------------------------------------------
+
+class _Settings:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, path):
+        return self.values.get(path)
+
+    def set(self, path, value):
+        self.values[path] = value
+
+    def set_default(self, path, value):
+        self.values.setdefault(path, value)
+
+
+SETTINGS = _Settings()
+LOG = {"info": 0, "warn": 0, "error": 0}
+
+
+def _log(level):
+    def log(message):
+        LOG[level] += 1
+
+    return log
+
+
+class _App:
+    class _ExtensionManager:
+        def get_extension_path_by_module(self, module):
+            return str(EXT_PATH)
+
+    def get_extension_manager(self):
+        return self._ExtensionManager()
+
+    async def next_update_async(self):
+        return 0
+
+
+APP = _App()
+
+
+def install():
+    """It puts the stand-ins into sys.modules and makes the extension importable"""
+    if getattr(sys.modules.get("omni.kit.commands"), "COMMANDS", None) is COMMANDS:
+        return
+
+    carb = _module("carb")
+    carb.log_info = _log("info")
+    carb.log_warn = _log("warn")
+    carb.log_error = _log("error")
+    _module("carb.settings").get_settings = lambda: SETTINGS
+    _module("carb.tokens").get_tokens_interface = lambda: _Stub()
+
+    _module("omni.ext").IExt = type("IExt", (), {})
+    _module("omni.kit.app").get_app = lambda: APP
+
+    kit_commands = _module("omni.kit.commands")
+    kit_commands.COMMANDS = COMMANDS
+    kit_commands.Command = Command
+    kit_commands.execute = COMMANDS.execute
+    kit_commands.register = COMMANDS.register
+    kit_commands.register_all_commands_in_module = COMMANDS.register_all_commands_in_module
+    kit_commands.unregister_module_commands = COMMANDS.unregister_module_commands
+    kit_commands.subscribe_on_change = COMMANDS.subscribers.append
+    kit_commands.unsubscribe_on_change = COMMANDS.subscribers.remove
+    for cls in (
+        CreatePrimCommand,
+        CreateUsdAttributeOnPathCommand,
+        ChangePropertyCommand,
+        RemovePropertyCommand,
+        DeletePrimsCommand,
+        BindMaterialCommand,
+    ):
+        COMMANDS.register(cls)
+
+    kit_undo = _module("omni.kit.undo")
+    kit_undo.group = COMMANDS.group
+    kit_undo.begin_group = COMMANDS.begin_group
+    kit_undo.end_group = COMMANDS.end_group
+    kit_undo.undo = COMMANDS.undo
+    kit_undo.get_history = lambda: COMMANDS.history
+    _module("omni.kit.usd_undo").UsdLayerUndo = UsdLayerUndo
+
+    omni_usd = _module("omni.usd")
+    omni_usd.get_context = lambda name="": CONTEXT
+    omni_usd.StageEventType = StageEventType
+    omni_usd.UsdContext = UsdContext
+
+    utility = _module("omni.kit.viewport.utility")
+    utility.get_active_viewport_camera_path = lambda *args, **kwargs: VIEWPORT.camera_path
+    utility.get_active_viewport_window = lambda *args, **kwargs: _Stub()
+    utility.get_ui_position_for_prim = _get_ui_position_for_prim
+
+    # omni.ui.scene and omni.ui.color are reached through the attributes of omni.ui
+    for name in ("omni.ui", "omni.kit.viewport_legacy"):
+        _module(name).__getattr__ = _stub_getattr
+
+    if str(EXT_PATH) not in sys.path:
+        sys.path.insert(0, str(EXT_PATH))
+
+
+def import_extension():
+    """It imports the extension package, install() has to be called first"""
+    return importlib.import_module(EXT_MODULE)
+
+
+def open_stage(stage, ext=None):
+    """It makes the stage current in the USD context and tells the extension about it"""
+    CONTEXT.stage = stage
+    if ext is not None:
+        event = types.SimpleNamespace(type=int(StageEventType.OPENED), payload={})
+        ext._on_stage_event(event)
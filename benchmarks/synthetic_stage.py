@@ -0,0 +1,73 @@
+"""
+Generates stages that look like the ones the extension works with: a default prim with models, every model has
+its meshes and a Looks folder with UsdPreviewSurface materials bound to them.
+
+    stage = build_stage(objects=20, meshes=50, materials=10)
+
+Variants are not generated here, they are created by the extension itself (add_variant), the way users do it.
+"""
+from pxr import Gf, Sdf, Usd, UsdGeom, UsdShade
+
+ROOT_PATH = Sdf.Path("/World")
+
+
+def get_object_path(index):
+    return ROOT_PATH.AppendChild(f"Object_{index}")
+
+
+def get_mesh_path(object_index, mesh_index):
+    return get_object_path(object_index).AppendPath(f"Geometry/Mesh_{mesh_index}")
+
+
+def get_material_path(object_index, material_index):
+    return get_object_path(object_index).AppendPath(f"Looks/Material_{material_index}")
+
+
+def _define_material(stage, path, seed):
+    material = UsdShade.Material.Define(stage, path)
+    shader = UsdShade.Shader.Define(stage, path.AppendChild("Shader"))
+    shader.CreateIdAttr("UsdPreviewSurface")
+    shader.CreateInput("diffuseColor", Sdf.ValueTypeNames.Color3f).Set(Gf.Vec3f(seed % 7 / 7, seed % 5 / 5, 0.5))
+    shader.CreateInput("roughness", Sdf.ValueTypeNames.Float).Set(0.5)
+    material.CreateSurfaceOutput().ConnectToSource(shader.ConnectableAPI(), "surface")
+    return material
+
+
+def build_stage(objects=10, meshes=20, materials=5, spacing=300.0):
+    """
+    It builds an in-memory stage
+
+    :param objects: The number of models, they are placed on a square grid
+    :param meshes: The number of meshes of every model
+    :param materials: The number of materials of every model, meshes use them in turn
+    :param spacing: The distance between neighbouring models
+    :return: Usd.Stage
+    """
+    stage = Usd.Stage.CreateInMemory()
+    UsdGeom.SetStageUpAxis(stage, UsdGeom.Tokens.y)
+    root = UsdGeom.Xform.Define(stage, ROOT_PATH)
+    stage.SetDefaultPrim(root.GetPrim())
+    columns = max(1, int(objects ** 0.5))
+    for i in range(objects):
+        model = UsdGeom.Xform.Define(stage, get_object_path(i))
+        model.AddTranslateOp().Set(Gf.Vec3d(i % columns * spacing, 0, i // columns * spacing))
+        UsdGeom.Scope.Define(stage, get_object_path(i).AppendChild("Looks"))
+        material_list = [_define_material(stage, get_material_path(i, j), i + j) for j in range(materials)]
+        for k in range(meshes):
+            mesh = UsdGeom.Mesh.Define(stage, get_mesh_path(i, k))
+            mesh.CreatePointsAttr([(0, 0, 0), (1, 0, 0), (1, 1, 0)])
+            mesh.CreateFaceVertexCountsAttr([3])
+            mesh.CreateFaceVertexIndicesAttr([0, 1, 2])
+            UsdShade.MaterialBindingAPI.Apply(mesh.GetPrim()).Bind(material_list[k % materials])
+    return stage
+
+
+def add_camera(stage, path="/OmniverseKit_Persp", position=(0.0, 100.0, 0.0)):
+    """
+    It adds a camera the roaming mode measures distances from
+
+    :return: The path of the camera.
+    """
+    camera = UsdGeom.Camera.Define(stage, path)
+    camera.AddTranslateOp().Set(Gf.Vec3d(*position))
+    return camera.GetPath()
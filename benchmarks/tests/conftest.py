@@ -0,0 +1,42 @@
+"""
+The tests load the modules of the extension with the stand-ins from kit_stubs.py, like the benchmarks do, so they
+need only pxr and numpy:
+
+    python -m pytest benchmarks/tests
+"""
+import asyncio
+import pathlib
+import sys
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+import kit_stubs  # noqa: E402
+
+kit_stubs.install()
+kit_stubs.import_extension()
+
+
+@pytest.fixture(autouse=True)
+def commands():
+    """The undo history and the log of every test start empty"""
+    kit_stubs.COMMANDS.reset()
+    for level in kit_stubs.LOG:
+        kit_stubs.LOG[level] = 0
+    yield kit_stubs.COMMANDS
+    kit_stubs.COMMANDS.level = 0
+
+
+@pytest.fixture
+def extension():
+    """The extension, started the way Kit does it. kit_stubs.open_stage(stage, extension) gives it a stage."""
+    # Tasks the extension schedules are only queued, the loop runs once at the end to let the cancelled ones finish
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    ext = kit_stubs.import_extension().MaterialManagerExtended()
+    ext.on_startup(kit_stubs.EXT_ID)
+    yield ext
+    ext.on_shutdown()
+    loop.run_until_complete(asyncio.sleep(0))
+    loop.close()
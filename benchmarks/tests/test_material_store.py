@@ -0,0 +1,143 @@
+import pytest
+from pxr import Gf, Sdf, Usd, UsdShade
+
+from karpenko.materialsmanager.ext.material_store import (STORE_NAME, get_material_fingerprint, get_store_path,
+                                                          get_unused_store_entries, share_materials)
+
+
+def _define_material(stage, path, color=(0.5, 0.5, 0.5)):
+    path = Sdf.Path(path)
+    material = UsdShade.Material.Define(stage, path)
+    shader = UsdShade.Shader.Define(stage, path.AppendChild("Shader"))
+    shader.CreateIdAttr("UsdPreviewSurface")
+    shader.CreateInput("diffuseColor", Sdf.ValueTypeNames.Color3f).Set(Gf.Vec3f(*color))
+    material.CreateSurfaceOutput().ConnectToSource(shader.ConnectableAPI(), "surface")
+    return material.GetPrim()
+
+
+@pytest.fixture
+def stage():
+    stage = Usd.Stage.CreateInMemory()
+    stage.SetDefaultPrim(stage.DefinePrim("/World", "Xform"))
+    _define_material(stage, "/World/Car/Looks/Red", (1.0, 0.0, 0.0))
+    _define_material(stage, "/World/Bike/Looks/Paint", (1.0, 0.0, 0.0))
+    _define_material(stage, "/World/Bike/Looks/Blue", (0.0, 0.0, 1.0))
+    # Variant folders, like the ones of the extension
+    for folder_name in ("Look_1", "Look_2"):
+        stage.DefinePrim(f"/World/Variants/{folder_name}", "Scope")
+    return stage
+
+
+def _get_entries(stage):
+    store = stage.GetPrimAtPath(get_store_path(stage))
+    return [entry.GetPath() for entry in store.GetChildren()] if store else []
+
+
+def test_store_path(stage):
+    assert get_store_path(stage) == Sdf.Path(f"/World/{STORE_NAME}")
+    assert get_store_path(Usd.Stage.CreateInMemory()) is None
+
+
+def test_fingerprint_ignores_names(stage):
+    red = get_material_fingerprint(stage.GetPrimAtPath("/World/Car/Looks/Red"))
+    assert red == get_material_fingerprint(stage.GetPrimAtPath("/World/Bike/Looks/Paint"))
+    assert red != get_material_fingerprint(stage.GetPrimAtPath("/World/Bike/Looks/Blue"))
+
+
+def test_fingerprint_of_a_network_with_outside_connections(stage):
+    material = stage.GetPrimAtPath("/World/Car/Looks/Red")
+    texture = UsdShade.Shader.Define(stage, "/World/Textures/Noise")
+    UsdShade.Shader(material.GetChild("Shader")).CreateInput("roughness", Sdf.ValueTypeNames.Float).ConnectToSource(
+        texture.ConnectableAPI(), "r"
+    )
+    assert get_material_fingerprint(material) is None
+    assert get_material_fingerprint(material, strict=False) is not None
+
+
+def test_identical_materials_share_one_entry(stage):
+    paths = [Sdf.Path("/World/Car/Looks/Red"), Sdf.Path("/World/Bike/Looks/Paint"), Sdf.Path("/World/Bike/Looks/Blue")]
+    paths_map = share_materials(stage, paths, Sdf.Path("/World/Variants/Look_1"))
+    assert paths_map == {path: Sdf.Path("/World/Variants/Look_1").AppendChild(path.name) for path in paths}
+    assert len(_get_entries(stage)) == 2
+
+    references = {}
+    for path in paths_map.values():
+        prim_spec = stage.GetRootLayer().GetPrimAtPath(path)
+        references[path.name] = prim_spec.referenceList.explicitItems[0].primPath
+    assert references["Red"] == references["Paint"]
+    assert references["Red"] != references["Blue"]
+    # The copies compose to the same network as the originals
+    for source_path, target_path in paths_map.items():
+        assert get_material_fingerprint(stage.GetPrimAtPath(target_path)) == get_material_fingerprint(
+            stage.GetPrimAtPath(source_path)
+        )
+
+    # Sharing the same materials again doesn't add entries
+    share_materials(stage, paths, Sdf.Path("/World/Variants/Look_2"))
+    assert len(_get_entries(stage)) == 2
+
+
+def test_materials_that_cant_be_shared_are_cloned(stage):
+    material = stage.GetPrimAtPath("/World/Car/Looks/Red")
+    material.CreateRelationship("extra").AddTarget("/World/Bike")
+    paths_map = share_materials(stage, [material.GetPath()], Sdf.Path("/World/Variants/Look_1"))
+    target_spec = stage.GetRootLayer().GetPrimAtPath(paths_map[material.GetPath()])
+    assert not target_spec.hasReferences
+    assert _get_entries(stage) == []
+
+
+def test_unused_entries(stage):
+    paths = [Sdf.Path("/World/Car/Looks/Red"), Sdf.Path("/World/Bike/Looks/Blue")]
+    paths_map = share_materials(stage, paths, Sdf.Path("/World/Variants/Look_1"))
+    assert get_unused_store_entries(stage, get_store_path(stage)) == []
+
+    stage.RemovePrim(paths_map[Sdf.Path("/World/Bike/Looks/Blue")])
+    unused = get_unused_store_entries(stage, get_store_path(stage))
+    assert len(unused) == 1
+    assert unused[0] in _get_entries(stage)
+    assert get_unused_store_entries(stage, Sdf.Path("/World/Missing")) == []
+
+
+def test_entries_referenced_from_other_layers_are_used(stage):
+    sublayer = Sdf.Layer.CreateAnonymous()
+    stage.GetRootLayer().subLayerPaths.append(sublayer.identifier)
+    paths_map = share_materials(stage, [Sdf.Path("/World/Car/Looks/Red")], Sdf.Path("/World/Variants/Look_1"))
+    # The variant is moved into the sublayer, e.g. it was created while the sublayer was the edit target
+    target_path = paths_map[Sdf.Path("/World/Car/Looks/Red")]
+    Sdf.CreatePrimInLayer(sublayer, target_path.GetParentPath())
+    Sdf.CopySpec(stage.GetRootLayer(), target_path, sublayer, target_path)
+    stage.RemovePrim(target_path)
+    assert stage.GetPrimAtPath(target_path)
+    assert get_unused_store_entries(stage, get_store_path(stage)) == []
+
+
+def test_entries_referenced_inside_variants_are_used(stage):
+    paths_map = share_materials(stage, [Sdf.Path("/World/Car/Looks/Red")], Sdf.Path("/World/Variants/Look_1"))
+    target_path = paths_map[Sdf.Path("/World/Car/Looks/Red")]
+    reference = stage.GetRootLayer().GetPrimAtPath(target_path).referenceList.explicitItems[0]
+
+    variant_set = stage.GetPrimAtPath("/World/Car").GetVariantSets().AddVariantSet("look")
+    variant_set.AddVariant("red")
+    variant_set.SetVariantSelection("red")
+    with variant_set.GetVariantEditContext():
+        stage.DefinePrim("/World/Car/Looks/RedCopy").GetReferences().AddInternalReference(reference.primPath)
+    variant_set.ClearVariantSelection()
+    stage.RemovePrim(target_path)
+    assert get_unused_store_entries(stage, get_store_path(stage)) == []
+
+
+def test_materials_with_the_same_name_get_their_own_prims(stage):
+    _define_material(stage, "/World/Bike/Looks/Red", (0.0, 1.0, 0.0))
+    clone = stage.GetPrimAtPath("/World/Bike/Looks/Blue")
+    clone.CreateRelationship("extra").AddTarget("/World/Bike")
+    _define_material(stage, "/World/Truck/Looks/Blue", (0.0, 0.0, 1.0))
+    paths = [Sdf.Path("/World/Car/Looks/Red"), Sdf.Path("/World/Bike/Looks/Red"), Sdf.Path("/World/Truck/Looks/Blue"),
+             clone.GetPath()]
+    paths_map = share_materials(stage, paths, Sdf.Path("/World/Variants/Look_1"))
+    # The material that can't be shared keeps its name
+    assert paths_map[clone.GetPath()].name == "Blue"
+    assert sorted(path.name for path in paths_map.values()) == ["Blue", "Blue_1", "Red", "Red_1"]
+    for source_path, target_path in paths_map.items():
+        assert get_material_fingerprint(stage.GetPrimAtPath(target_path), strict=False) == get_material_fingerprint(
+            stage.GetPrimAtPath(source_path), strict=False
+        )
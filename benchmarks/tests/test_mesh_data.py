@@ -0,0 +1,159 @@
+import kit_stubs
+import pytest
+import synthetic_stage
+from pxr import Sdf, Usd
+
+from karpenko.materialsmanager.ext.mesh_data import (INDICES_ATTR, LEGACY_ATTR, MATERIALS_ATTR, MESH_DATA_VERSION,
+                                                     MESHES_ATTR, VERSION_ATTR, decode_legacy_mesh_data,
+                                                     encode_legacy_mesh_data, encode_mesh_data,
+                                                     encode_mesh_data_changes, has_legacy_mesh_data,
+                                                     read_mesh_data, write_mesh_data)
+
+MESH_MATERIALS = [
+    {"mesh": "/World/Car/Body", "path": "/World/Car/Looks/Paint"},
+    {"mesh": "/World/Car/Door", "path": "/World/Car/Looks/Paint"},
+    {"mesh": "/World/Car/Wheel", "path": "/World/Car/Looks/Rubber"},
+]
+PAIRS = [(mat_data["mesh"], mat_data["path"]) for mat_data in MESH_MATERIALS]
+
+
+@pytest.fixture
+def stage():
+    return Usd.Stage.CreateInMemory()
+
+
+@pytest.fixture
+def folder(stage):
+    return stage.DefinePrim("/World/Car/Looks/MME/Look_1", "Scope")
+
+
+def _apply(prim, values):
+    for name, (type_name, value) in values.items():
+        prim.CreateAttribute(name, type_name, custom=True).Set(value)
+
+
+def test_encode_deduplicates_materials():
+    values = encode_mesh_data(MESH_MATERIALS)
+    assert values[VERSION_ATTR][1] == MESH_DATA_VERSION
+    assert values[MESHES_ATTR][1] == ["/World/Car/Body", "/World/Car/Door", "/World/Car/Wheel"]
+    assert values[MATERIALS_ATTR][1] == ["/World/Car/Looks/Paint", "/World/Car/Looks/Rubber"]
+    assert values[INDICES_ATTR][1] == [0, 0, 1]
+
+
+def test_write_and_read(folder):
+    write_mesh_data(folder, MESH_MATERIALS)
+    assert read_mesh_data(folder) == PAIRS
+    assert not has_legacy_mesh_data(folder)
+
+
+def test_read_without_data(folder):
+    assert read_mesh_data(folder) is None
+    assert read_mesh_data(None) is None
+    assert not has_legacy_mesh_data(folder)
+
+
+def test_legacy_round_trip():
+    assert decode_legacy_mesh_data(encode_legacy_mesh_data(MESH_MATERIALS)) == PAIRS
+
+
+def test_legacy_data_is_read_without_writing(stage, folder):
+    folder.CreateAttribute(LEGACY_ATTR, Sdf.ValueTypeNames.StringArray, custom=True).Set(
+        [item.decode() for item in encode_legacy_mesh_data(MESH_MATERIALS)]
+    )
+    layer = stage.GetRootLayer()
+    before = layer.ExportToString()
+    assert has_legacy_mesh_data(folder)
+    assert read_mesh_data(folder) == PAIRS
+    assert layer.ExportToString() == before
+
+
+def test_write_replaces_legacy_data(folder):
+    folder.CreateAttribute(LEGACY_ATTR, Sdf.ValueTypeNames.StringArray, custom=True).Set(
+        [item.decode() for item in encode_legacy_mesh_data(MESH_MATERIALS[:1])]
+    )
+    write_mesh_data(folder, MESH_MATERIALS)
+    assert not folder.GetAttribute(LEGACY_ATTR)
+    assert not has_legacy_mesh_data(folder)
+    assert read_mesh_data(folder) == PAIRS
+
+
+def test_unsupported_version(folder):
+    folder.CreateAttribute(VERSION_ATTR, Sdf.ValueTypeNames.Int, custom=True).Set(MESH_DATA_VERSION + 1)
+    assert read_mesh_data(folder) is None
+    assert kit_stubs.LOG["warn"] == 1
+
+
+def test_changes_reuse_the_slot_of_a_material_nothing_else_uses(folder):
+    write_mesh_data(folder, MESH_MATERIALS)
+    changes = encode_mesh_data_changes(folder, {Sdf.Path("/World/Car/Wheel"): "/World/Car/Looks/Chrome"})
+    # Only the materials change, the indices stay the same
+    assert set(changes) == {MATERIALS_ATTR}
+    assert changes[MATERIALS_ATTR][1] == ["/World/Car/Looks/Paint", "/World/Car/Looks/Chrome"]
+    _apply(folder, changes)
+    assert read_mesh_data(folder)[2] == ("/World/Car/Wheel", "/World/Car/Looks/Chrome")
+
+
+def test_changes_append_a_material_when_the_slot_is_shared(folder):
+    write_mesh_data(folder, MESH_MATERIALS)
+    changes = encode_mesh_data_changes(folder, {"/World/Car/Door": "/World/Car/Looks/Chrome"})
+    assert changes[MATERIALS_ATTR][1] == [
+        "/World/Car/Looks/Paint", "/World/Car/Looks/Rubber", "/World/Car/Looks/Chrome"
+    ]
+    assert changes[INDICES_ATTR][1] == [0, 2, 1]
+    _apply(folder, changes)
+    assert read_mesh_data(folder) == [PAIRS[0], ("/World/Car/Door", "/World/Car/Looks/Chrome"), PAIRS[2]]
+
+
+def test_changes_to_a_known_material_only_change_indices(folder):
+    write_mesh_data(folder, MESH_MATERIALS)
+    changes = encode_mesh_data_changes(folder, {"/World/Car/Body": "/World/Car/Looks/Rubber"})
+    assert set(changes) == {INDICES_ATTR}
+    assert changes[INDICES_ATTR][1] == [1, 0, 1]
+
+
+def test_changes_without_effect(folder):
+    write_mesh_data(folder, MESH_MATERIALS)
+    assert encode_mesh_data_changes(folder, {"/World/Car/Body": "/World/Car/Looks/Paint"}) == {}
+    assert encode_mesh_data_changes(folder, {"/World/Car/Missing": "/World/Car/Looks/Paint"}) == {}
+
+
+def test_changes_need_version_2_data(folder):
+    assert encode_mesh_data_changes(folder, {"/World/Car/Body": "/World/Car/Looks/Paint"}) is None
+    folder.CreateAttribute(LEGACY_ATTR, Sdf.ValueTypeNames.StringArray, custom=True).Set(
+        [item.decode() for item in encode_legacy_mesh_data(MESH_MATERIALS)]
+    )
+    assert encode_mesh_data_changes(folder, {"/World/Car/Body": "/World/Car/Looks/Paint"}) is None
+
+
+def _write_legacy_data(folder, pairs):
+    """It replaces the data with the format older versions of the extension wrote"""
+    for name in (VERSION_ATTR, MESHES_ATTR, MATERIALS_ATTR, INDICES_ATTR):
+        folder.RemoveProperty(name)
+    mesh_materials = [{"mesh": mesh, "path": path} for mesh, path in pairs]
+    folder.CreateAttribute(LEGACY_ATTR, Sdf.ValueTypeNames.StringArray, custom=True).Set(
+        [item.decode() for item in encode_legacy_mesh_data(mesh_materials)]
+    )
+
+
+def test_enabling_a_variant_migrates_legacy_data_with_commands(extension, commands):
+    stage = synthetic_stage.build_stage(1, 4, 2)
+    kit_stubs.open_stage(stage, extension)
+    parent_prim = stage.GetPrimAtPath(synthetic_stage.get_object_path(0))
+    looks = parent_prim.GetPrimAtPath("Looks")
+    extension.add_variant(looks, parent_prim)
+    folders = [looks.GetPrimAtPath("MME"), looks.GetPrimAtPath("MME/Look_1")]
+    expected = [read_mesh_data(folder) for folder in folders]
+    for folder, pairs in zip(folders, expected):
+        _write_legacy_data(folder, pairs)
+    commands.reset()
+
+    extension.enable_variant(None, looks, parent_prim)
+    assert [has_legacy_mesh_data(folder) for folder in folders] == [False, False]
+    assert [read_mesh_data(folder) for folder in folders] == expected
+    assert commands.counts["RemoveProperty"] == 2
+
+    # The migration is a part of the undo step of enabling the variant
+    commands.undo()
+    assert not commands.history
+    assert [has_legacy_mesh_data(folder) for folder in folders] == [True, True]
+    assert [read_mesh_data(folder) for folder in folders] == expected
@@ -0,0 +1,74 @@
+import kit_stubs
+import pytest
+import synthetic_stage
+from pxr import Sdf, Usd
+
+from karpenko.materialsmanager.ext.presets import (encode_preset, get_preset_attr_names, get_preset_display_name,
+                                                   get_preset_key, get_preset_keys, read_preset)
+
+
+@pytest.fixture
+def stage():
+    stage = Usd.Stage.CreateInMemory()
+    stage.SetDefaultPrim(stage.DefinePrim("/World", "Xform"))
+    return stage
+
+
+def _write_preset(prim, name, active_variants):
+    key = get_preset_key(prim, name, create=True)
+    objects_attr_name, variants_attr_name, name_attr_name = get_preset_attr_names(key)
+    objects, variants = encode_preset(active_variants)
+    prim.CreateAttribute(objects_attr_name, Sdf.ValueTypeNames.StringArray, custom=True).Set(objects)
+    prim.CreateAttribute(variants_attr_name, Sdf.ValueTypeNames.StringArray, custom=True).Set(variants)
+    prim.CreateAttribute(name_attr_name, Sdf.ValueTypeNames.String, custom=True).Set(name)
+    return key
+
+
+def test_names_that_make_the_same_identifier_get_their_own_keys(stage):
+    prim = stage.GetDefaultPrim()
+    assert _write_preset(prim, "Car-A", {Sdf.Path("/World/Car"): "Look_1"}) == "Car_A"
+    assert _write_preset(prim, "Car_A", {Sdf.Path("/World/Car"): None}) == "Car_A_1"
+    assert get_preset_keys(prim) == ["Car_A", "Car_A_1"]
+    assert [get_preset_display_name(prim, key) for key in get_preset_keys(prim)] == ["Car-A", "Car_A"]
+    # Saving under an existing name updates the preset
+    assert get_preset_key(prim, "Car_A", create=True) == "Car_A_1"
+    assert get_preset_key(prim, "Car B") is None
+
+
+def test_read_preset_takes_keys_only(stage):
+    prim = stage.GetDefaultPrim()
+    _write_preset(prim, "Car-A", {Sdf.Path("/World/Car"): "Look_1"})
+    _write_preset(prim, "Car_A", {Sdf.Path("/World/Car"): None})
+    assert read_preset(prim, "Car_A") == {Sdf.Path("/World/Car"): "Look_1"}
+    assert read_preset(prim, "Car_A_1") == {Sdf.Path("/World/Car"): None}
+    # A name is not a key, even when it would be made the same identifier
+    assert read_preset(prim, "Car-A") is None
+    assert read_preset(None, "Car_A") is None
+
+
+def test_presets_saved_without_a_name_show_the_key(stage):
+    prim = stage.GetDefaultPrim()
+    objects_attr_name, variants_attr_name, _ = get_preset_attr_names("Old")
+    prim.CreateAttribute(objects_attr_name, Sdf.ValueTypeNames.StringArray, custom=True).Set(["/World/Car"])
+    prim.CreateAttribute(variants_attr_name, Sdf.ValueTypeNames.StringArray, custom=True).Set([""])
+    assert get_preset_display_name(prim, "Old") == "Old"
+    assert get_preset_key(prim, "Old") == "Old"
+    assert read_preset(prim, "Old") == {Sdf.Path("/World/Car"): None}
+
+
+def test_the_extension_acts_on_the_preset_of_the_key(extension):
+    stage = synthetic_stage.build_stage(1, 4, 2)
+    kit_stubs.open_stage(stage, extension)
+    default_prim = stage.GetDefaultPrim()
+    extension.save_preset("Car-A")
+    extension.save_preset("Car_A")
+    assert get_preset_keys(default_prim) == ["Car_A", "Car_A_1"]
+
+    # The key of "Car-A" is also the name of the other preset
+    extension.delete_preset("Car_A")
+    assert get_preset_keys(default_prim) == ["Car_A_1"]
+    assert get_preset_display_name(default_prim, "Car_A_1") == "Car_A"
+    extension.delete_preset("Car-A")
+    assert get_preset_keys(default_prim) == ["Car_A_1"]
+    assert extension.apply_preset("Car_A") is None
+    assert kit_stubs.LOG["warn"] == 1
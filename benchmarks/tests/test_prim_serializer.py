@@ -0,0 +1,95 @@
+import pytest
+from pxr import Gf, Sdf, Usd, UsdShade
+
+from karpenko.materialsmanager.ext.prim_serializer import clone_prims, extract_prims_to_layer, get_unique_name
+
+
+def _define_material(stage, path, color=(0.5, 0.5, 0.5)):
+    path = Sdf.Path(path)
+    material = UsdShade.Material.Define(stage, path)
+    shader = UsdShade.Shader.Define(stage, path.AppendChild("Shader"))
+    shader.CreateIdAttr("UsdPreviewSurface")
+    shader.CreateInput("diffuseColor", Sdf.ValueTypeNames.Color3f).Set(Gf.Vec3f(*color))
+    material.CreateSurfaceOutput().ConnectToSource(shader.ConnectableAPI(), "surface")
+    return material.GetPrim()
+
+
+def _get_color(stage, material_path):
+    return UsdShade.Shader(stage.GetPrimAtPath(material_path.AppendChild("Shader"))).GetInput("diffuseColor").Get()
+
+
+@pytest.fixture
+def stage():
+    stage = Usd.Stage.CreateInMemory()
+    stage.SetDefaultPrim(stage.DefinePrim("/World", "Xform"))
+    _define_material(stage, "/World/Car/Looks/Paint", (1.0, 0.0, 0.0))
+    _define_material(stage, "/World/Bike/Looks/Paint", (0.0, 0.0, 1.0))
+    _define_material(stage, "/World/Bike/Looks/Paint_1", (0.0, 1.0, 0.0))
+    return stage
+
+
+def test_unique_name():
+    assert get_unique_name("Paint", set()) == "Paint"
+    assert get_unique_name("Paint", {"Paint", "Paint_1"}) == "Paint_2"
+    assert get_unique_name("Car-Paint", set()) == "Car_Paint"
+
+
+def test_prims_with_the_same_name_get_their_own_copies(stage):
+    paths = [Sdf.Path("/World/Car/Looks/Paint"), Sdf.Path("/World/Bike/Looks/Paint"),
+             Sdf.Path("/World/Bike/Looks/Paint_1"), Sdf.Path("/World/Car/Looks/Paint")]
+    paths_map = clone_prims(stage, paths, Sdf.Path("/World/Variants/Look_1"))
+    assert paths_map == {
+        Sdf.Path("/World/Car/Looks/Paint"): Sdf.Path("/World/Variants/Look_1/Paint"),
+        Sdf.Path("/World/Bike/Looks/Paint"): Sdf.Path("/World/Variants/Look_1/Paint_1"),
+        Sdf.Path("/World/Bike/Looks/Paint_1"): Sdf.Path("/World/Variants/Look_1/Paint_1_1"),
+    }
+    for source_path, target_path in paths_map.items():
+        assert _get_color(stage, target_path) == _get_color(stage, source_path)
+        # The connections of every copy lead to its own shader
+        output = UsdShade.Material(stage.GetPrimAtPath(target_path)).GetSurfaceOutput()
+        assert output.GetConnectedSources()[0][0].source.GetPath() == target_path.AppendChild("Shader")
+
+
+def _connect(stage, shader_path, input_name, source_path):
+    source = UsdShade.Shader.Get(stage, source_path) or UsdShade.Shader.Define(stage, source_path)
+    UsdShade.Shader.Get(stage, shader_path).CreateInput(input_name, Sdf.ValueTypeNames.Float).ConnectToSource(
+        source.ConnectableAPI(), "r"
+    )
+
+
+def test_extract_copies_the_prims_the_materials_are_connected_to(stage):
+    # A texture both materials share, which is itself connected to a coordinate reader
+    _connect(stage, "/World/Car/Looks/Paint/Shader", "roughness", "/World/Textures/Noise")
+    _connect(stage, "/World/Bike/Looks/Paint/Shader", "roughness", "/World/Textures/Noise")
+    _connect(stage, "/World/Textures/Noise", "st", "/World/Textures/UV")
+    # A connection to a prim that doesn't exist is left as it is
+    UsdShade.Shader.Get(stage, "/World/Bike/Looks/Paint/Shader").CreateInput(
+        "metallic", Sdf.ValueTypeNames.Float
+    ).GetAttr().AddConnection("/World/Missing.outputs:r")
+
+    layer, paths_map = extract_prims_to_layer(stage, [Sdf.Path("/World/Car/Looks/Paint"),
+                                                      Sdf.Path("/World/Bike/Looks/Paint")])
+    assert paths_map == {
+        Sdf.Path("/World/Car/Looks/Paint"): Sdf.Path("/Item_00/Paint"),
+        Sdf.Path("/World/Bike/Looks/Paint"): Sdf.Path("/Item_01/Paint"),
+        Sdf.Path("/World/Textures/Noise"): Sdf.Path("/Item_02/Noise"),
+        Sdf.Path("/World/Textures/UV"): Sdf.Path("/Item_03/UV"),
+    }
+    for item_name in ("Item_00", "Item_01"):
+        roughness = layer.GetAttributeAtPath(f"/{item_name}/Paint/Shader.inputs:roughness")
+        assert list(roughness.connectionPathList.explicitItems) == [Sdf.Path("/Item_02/Noise.outputs:r")]
+    st = layer.GetAttributeAtPath("/Item_02/Noise.inputs:st")
+    assert list(st.connectionPathList.explicitItems) == [Sdf.Path("/Item_03/UV.outputs:r")]
+    metallic = layer.GetAttributeAtPath("/Item_01/Paint/Shader.inputs:metallic")
+    assert list(metallic.connectionPathList.explicitItems) == [Sdf.Path("/World/Missing.outputs:r")]
+
+
+def test_extract_doesnt_copy_prims_twice(stage):
+    # The material connects to a shader inside of itself and to its own parent
+    stage.DefinePrim("/World/Car/Looks", "NodeGraph")
+    _connect(stage, "/World/Car/Looks/Paint/Shader", "roughness", "/World/Car/Looks/Paint/Shader")
+    UsdShade.Shader.Get(stage, "/World/Car/Looks/Paint/Shader").CreateInput(
+        "metallic", Sdf.ValueTypeNames.Float
+    ).GetAttr().AddConnection("/World/Car/Looks.outputs:r")
+    _, paths_map = extract_prims_to_layer(stage, [Sdf.Path("/World/Car/Looks/Paint")])
+    assert list(paths_map) == [Sdf.Path("/World/Car/Looks/Paint")]
@@ -0,0 +1,265 @@
+import asyncio
+import time
+
+import kit_stubs
+import pytest
+import synthetic_stage
+
+from karpenko.materialsmanager.ext.scheduler import FrameBudgetScheduler, Job
+
+
+class RecordCommand(kit_stubs.Command):
+    """Appends the value to the list, undo removes it"""
+
+    def __init__(self, values, value):
+        self._values = values
+        self._value = value
+
+    def do(self):
+        self._values.append(self._value)
+
+    def undo(self):
+        self._values.remove(self._value)
+
+
+@pytest.fixture(autouse=True)
+def record_command(commands):
+    commands.register(RecordCommand)
+
+
+def _steps(count, commit=None, log=None):
+    for i in range(count):
+        if log is not None:
+            log.append(i)
+        yield (i + 1) / count
+    return commit
+
+
+def _commit_steps(values, count):
+    for i in range(count):
+        kit_stubs.COMMANDS.execute("Record", values=values, value=i)
+        yield
+    return len(values)
+
+
+def _expired():
+    # A deadline that has already passed, every slice runs one step
+    return time.perf_counter()
+
+
+def test_run_to_the_end_commits_in_one_group(commands):
+    values = []
+    done = []
+
+    def commit():
+        commands.execute("Record", values=values, value="a")
+        commands.execute("Record", values=values, value="b")
+        return "result"
+
+    job = Job("job", _steps(5, commit), on_done=done.append)
+    assert job.run_slice(None)
+    assert (job.state, job.result, job.progress) == (Job.DONE, "result", 1.0)
+    assert done == [job]
+    assert commands.groups == [(0, 2)]
+    commands.undo()
+    assert values == []
+
+
+def test_slices_stop_at_the_deadline():
+    log = []
+    job = Job("job", _steps(3, None, log))
+    assert not job.run_slice(_expired())
+    assert (job.state, log, job.progress) == (Job.RUNNING, [0], pytest.approx(1 / 3))
+    assert not job.run_slice(_expired())
+    assert not job.run_slice(_expired())
+    assert job.run_slice(_expired())
+    assert job.state == Job.DONE
+    assert job.run_slice(None)
+
+
+def test_cancel_before_the_commit(commands):
+    committed = []
+    job = Job("job", _steps(3, lambda: committed.append(True)))
+    job.run_slice(_expired())
+    job.cancel()
+    assert job.state == Job.CANCELLED
+    assert job.is_finished
+    assert job.run_slice(None)
+    assert committed == []
+    assert not commands.history
+
+
+def test_failing_steps(commands):
+    def steps():
+        yield
+        raise ValueError("broken")
+
+    job = Job("job", steps())
+    assert job.run_slice(None)
+    assert job.state == Job.FAILED
+    assert kit_stubs.LOG["error"] == 1
+
+
+def test_failing_commit_closes_the_group(commands):
+    def commit():
+        raise ValueError("broken")
+
+    job = Job("job", _steps(1, commit))
+    assert job.run_slice(None)
+    assert job.state == Job.FAILED
+    assert commands.level == 0
+
+
+def test_commit_steps_run_to_the_end_are_one_group(commands):
+    values = []
+    job = Job("job", _steps(2, lambda: _commit_steps(values, 3)))
+    assert job.run_slice(None)
+    assert (job.state, job.result) == (Job.DONE, 3)
+    assert commands.groups == [(0, 3)]
+
+
+def test_commit_over_several_slices_leaves_no_group_open(commands):
+    values = []
+    job = Job("job", _steps(0, lambda: _commit_steps(values, 3)))
+    # The steps are done, the commit starts in the next slice
+    assert not job.run_slice(_expired())
+    assert job.state == Job.COMMITTING
+    assert not job.run_slice(_expired())
+    assert values == [0]
+    assert commands.level == 0
+    # A command of the user between the frames isn't a part of the undo groups of the job
+    commands.execute("Record", values=values, value="user")
+    while not job.run_slice(_expired()):
+        pass
+    assert (job.state, job.result) == (Job.DONE, 4)
+    assert commands.groups == [(0, 1), (2, 3), (3, 4)]
+
+
+def test_cancel_during_the_commit_undoes_it(commands):
+    values = []
+    commands.execute("Record", values=values, value="before")
+    job = Job("job", _steps(0, lambda: _commit_steps(values, 3)))
+    job.run_slice(_expired())
+    job.run_slice(_expired())
+    job.run_slice(_expired())
+    assert values == ["before", 0, 1]
+    job.cancel()
+    assert job.state == Job.CANCELLED
+    assert values == ["before"]
+    assert commands.level == 0
+    assert len(commands.history) == 1
+
+
+def test_cancel_before_the_first_chunk_undoes_nothing(commands):
+    values = []
+    commands.execute("Record", values=values, value="before")
+    job = Job("job", _steps(0, lambda: _commit_steps(values, 3)))
+    job.run_slice(_expired())
+    assert job.state == Job.COMMITTING
+    job.cancel()
+    assert job.state == Job.CANCELLED
+    assert values == ["before"]
+    assert len(commands.history) == 1
+
+
+def test_cancel_keeps_commands_of_the_user(commands):
+    values = []
+    job = Job("job", _steps(0, lambda: _commit_steps(values, 3)))
+    job.run_slice(_expired())
+    job.run_slice(_expired())
+    commands.execute("Record", values=values, value="user")
+    job.run_slice(_expired())
+    assert values == [0, "user", 1]
+    job.cancel()
+    # Only the chunk after the command of the user can be undone without undoing the command
+    assert values == [0, "user"]
+    assert kit_stubs.LOG["warn"] == 1
+
+
+def test_failing_commit_steps_close_the_group(commands):
+    def commit_steps():
+        yield
+        raise ValueError("broken")
+
+    job = Job("job", _steps(1, commit_steps))
+    assert job.run_slice(None)
+    assert job.state == Job.FAILED
+    assert commands.level == 0
+
+
+@pytest.mark.parametrize("budget", [None, "fast", -5])
+def test_invalid_budgets_fall_back_to_the_default(budget):
+    scheduler = FrameBudgetScheduler(lambda: budget)
+    remaining = scheduler._get_deadline() - time.perf_counter()
+    if budget == -5:
+        assert remaining <= 0.0
+    else:
+        assert 0.0 < remaining <= FrameBudgetScheduler.DEFAULT_BUDGET_MS / 1000.0
+
+
+def test_scheduler_run_finishes_right_away():
+    scheduler = FrameBudgetScheduler(lambda: 0.0)
+    job = scheduler.run("job", _steps(10, lambda: "result"))
+    assert (job.state, job.result) == (Job.DONE, "result")
+    assert scheduler.jobs == []
+
+
+def test_submit_finishes_jobs_that_fit_into_the_budget():
+    progress = []
+    scheduler = FrameBudgetScheduler(lambda: 1000.0, lambda: progress.append(True))
+    job = scheduler.submit("job", _steps(3, lambda: "result"))
+    assert job.state == Job.DONE
+    assert scheduler.jobs == []
+    assert progress == []
+
+
+def test_submitted_jobs_run_one_slice_per_frame():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    scheduler = FrameBudgetScheduler(lambda: 0.0)
+    first = scheduler.submit("first", _steps(3, lambda: 1))
+    second = scheduler.submit("second", _steps(2, lambda: 2))
+    assert scheduler.jobs == [first, second]
+    # Only the first job started, the second waits for it
+    assert (first.state, second.state) == (Job.RUNNING, Job.PENDING)
+    loop.run_until_complete(scheduler._task)
+    assert (first.result, second.result) == (1, 2)
+    assert scheduler.jobs == []
+    loop.close()
+
+
+def test_cancel_all():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    scheduler = FrameBudgetScheduler(lambda: 0.0)
+    jobs = [scheduler.submit(name, _steps(3)) for name in ("first", "second")]
+    scheduler.cancel_all()
+    assert [job.state for job in jobs] == [Job.CANCELLED, Job.CANCELLED]
+    assert scheduler.jobs == []
+    # The cancelled task of the scheduler finishes
+    loop.run_until_complete(asyncio.sleep(0))
+    loop.close()
+
+
+def test_a_variant_added_in_the_background_binds_meshes_in_chunks(extension, commands):
+    stage = synthetic_stage.build_stage(1, 200, 4)
+    kit_stubs.open_stage(stage, extension)
+    parent_prim = stage.GetPrimAtPath(synthetic_stage.get_object_path(0))
+    before = stage.GetRootLayer().ExportToString()
+    commands.reset()
+
+    job = extension.add_variant(parent_prim.GetPrimAtPath("Looks"), parent_prim, background=True)
+    while not job.run_slice(_expired()):
+        pass
+    extension.jobs.cancel(job)
+    assert (job.state, job.result) == (Job.DONE, "Look_1")
+    assert commands.counts["BindMaterialsBatch"] == 4
+    mesh = stage.GetPrimAtPath(synthetic_stage.get_mesh_path(0, 199))
+    assert str(mesh.GetRelationship("material:binding").GetTargets()[0]).startswith(
+        f"{parent_prim.GetPath()}/Looks/MME/Look_1/"
+    )
+    # Every frame is an undo step of its own
+    assert len(commands.groups) > 1
+    while commands.history:
+        commands.undo()
+    assert stage.GetRootLayer().ExportToString() == before
@@ -0,0 +1,85 @@
+import kit_stubs
+import pytest
+from pxr import Sdf, Tf, Usd
+
+from karpenko.materialsmanager.ext.settings import SESSION_LAYER_SETTING, SceneSettings
+
+
+@pytest.fixture
+def stage():
+    stage = Usd.Stage.CreateInMemory()
+    stage.SetDefaultPrim(stage.DefinePrim("/World", "Xform"))
+    return stage
+
+
+@pytest.fixture
+def settings(stage):
+    settings = SceneSettings()
+    changed = []
+    listener = Tf.Notice.Register(
+        Usd.Notice.ObjectsChanged, lambda notice, sender: changed.append(settings.on_objects_changed(notice)), stage
+    )
+    settings.load(stage)
+    settings.changed = changed
+    yield settings
+    listener.Revoke()
+
+
+def _set(prim, name, type_name, value):
+    prim.CreateAttribute(name, type_name, custom=True).Set(value)
+
+
+def test_only_settings_are_loaded(stage):
+    prim = stage.GetDefaultPrim()
+    _set(prim, "MMEDeduplicateMaterials", Sdf.ValueTypeNames.Bool, True)
+    _set(prim, "MMEPreset:Car:objects", Sdf.ValueTypeNames.StringArray, ["/World/Car"])
+    settings = SceneSettings()
+    settings.load(stage)
+    assert settings.get("MMEDeduplicateMaterials") is True
+    assert settings.get("MMEPreset:Car:objects") is None
+
+
+def test_changes_of_settings_are_reported(stage, settings):
+    prim = stage.GetDefaultPrim()
+    _set(prim, "MMEMaxVisibleDistance", Sdf.ValueTypeNames.Double, 250.0)
+    assert settings.get("MMEMaxVisibleDistance") == 250.0
+    _set(prim, "MMEPreset:Car:objects", Sdf.ValueTypeNames.StringArray, ["/World/Car"])
+    assert settings.get("MMEPreset:Car:objects") is None
+    assert set().union(*settings.changed) == {"MMEMaxVisibleDistance"}
+
+
+@pytest.fixture
+def session_layer_option(monkeypatch):
+    monkeypatch.setitem(kit_stubs.SETTINGS.values, SESSION_LAYER_SETTING, True)
+
+
+def test_values_left_in_the_session_layer_dont_override_the_scene(extension, stage, commands, session_layer_option):
+    kit_stubs.open_stage(stage, extension)
+    extension.set_setting(True, "MMEDeduplicateMaterials")
+    assert not stage.GetRootLayer().GetAttributeAtPath("/World.MMEDeduplicateMaterials")
+
+    kit_stubs.SETTINGS.set(SESSION_LAYER_SETTING, False)
+    extension.set_setting(False, "MMEDeduplicateMaterials")
+    assert not stage.GetSessionLayer().GetAttributeAtPath("/World.MMEDeduplicateMaterials")
+    assert stage.GetRootLayer().GetAttributeAtPath("/World.MMEDeduplicateMaterials").default is False
+    assert extension.get_setting("MMEDeduplicateMaterials") is False
+
+    extension.set_setting(250.0, "MMEMaxVisibleDistance")
+    extension.set_setting(400.0, "MMEMaxVisibleDistance")
+    assert commands.history[len(commands.history) - 1].kwargs["prev"] == 250.0
+
+
+def test_switching_the_option_off_moves_the_settings_into_the_scene(extension, stage, commands, session_layer_option):
+    kit_stubs.open_stage(stage, extension)
+    extension.set_setting(True, "MMEDeduplicateMaterials")
+    extension.set_setting(250.0, "MMEMaxVisibleDistance")
+    commands.reset()
+
+    extension.set_settings_in_session_layer(False)
+    assert not kit_stubs.SETTINGS.get(SESSION_LAYER_SETTING)
+    assert not stage.GetSessionLayer().GetPrimAtPath("/World").properties
+    root_prim_spec = stage.GetRootLayer().GetPrimAtPath("/World")
+    assert {name: spec.default for name, spec in root_prim_spec.properties.items()} == {
+        "MMEDeduplicateMaterials": True, "MMEMaxVisibleDistance": 250.0
+    }
+    assert commands.groups == [(0, 2)]
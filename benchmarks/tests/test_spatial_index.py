@@ -0,0 +1,156 @@
+import numpy as np
+import pytest
+from pxr import Gf
+
+from karpenko.materialsmanager.ext.spatial_index import SpatialIndex, get_frustum_planes
+
+
+def _brute_force(positions, point, radius):
+    result = []
+    for key, position in positions.items():
+        distance = float(np.linalg.norm(np.asarray(position) - np.asarray(point)))
+        if distance <= radius:
+            result.append((key, distance))
+    return sorted(result, key=lambda item: item[1])
+
+
+@pytest.fixture
+def positions():
+    rng = np.random.default_rng(7)
+    return {f"/World/Object_{i}": tuple(rng.uniform(-2000.0, 2000.0, 3)) for i in range(300)}
+
+
+@pytest.fixture
+def index(positions):
+    index = SpatialIndex(cell_size=250.0)
+    for key, position in positions.items():
+        index.update(key, position)
+    return index
+
+
+@pytest.mark.parametrize("radius", [0.0, 100.0, 600.0, 5000.0])
+def test_query_radius_matches_brute_force(index, positions, radius):
+    for point in [(0.0, 0.0, 0.0), (1500.0, -700.0, 300.0), positions["/World/Object_3"]]:
+        result = index.query_radius(point, radius)
+        expected = _brute_force(positions, point, radius)
+        assert [key for key, _ in result] == [key for key, _ in expected]
+        assert [distance for _, distance in result] == pytest.approx([distance for _, distance in expected])
+
+
+def test_nearest_matches_brute_force(index, positions):
+    point = (120.0, 40.0, -900.0)
+    expected = _brute_force(positions, point, 1000.0)
+    key, distance = index.nearest(point, 1000.0)
+    assert key == expected[0][0]
+    assert distance == pytest.approx(expected[0][1])
+
+
+def test_nearest_respects_max_distance():
+    index = SpatialIndex(cell_size=10.0)
+    index.update("a", (100.0, 0.0, 0.0))
+    assert index.nearest((0.0, 0.0, 0.0), 99.0) == (None, None)
+    assert index.nearest((0.0, 0.0, 0.0), 100.0) == ("a", 100.0)
+    assert index.nearest((0.0, 0.0, 0.0), -1.0) == (None, None)
+    assert SpatialIndex().nearest((0.0, 0.0, 0.0), 100.0) == (None, None)
+
+
+def test_candidate_mask_skips_objects():
+    index = SpatialIndex(cell_size=10.0)
+    index.update("a", (1.0, 0.0, 0.0))
+    index.update("b", (5.0, 0.0, 0.0))
+    mask = np.ones(len(index), dtype=bool)
+    mask[index.get_row("a")] = False
+    assert index.nearest((0.0, 0.0, 0.0), 10.0, mask)[0] == "b"
+    assert [key for key, _ in index.query_radius((0.0, 0.0, 0.0), 10.0, mask)] == ["b"]
+
+
+def test_update_moves_the_object_between_cells():
+    index = SpatialIndex(cell_size=10.0)
+    index.update("a", (0.0, 0.0, 0.0))
+    index.update("a", (1000.0, 0.0, 0.0))
+    assert len(index) == 1
+    assert index.query_radius((0.0, 0.0, 0.0), 50.0) == []
+    assert index.nearest((1000.0, 0.0, 0.0), 1.0) == ("a", 0.0)
+
+
+def test_remove_keeps_the_other_rows(index, positions):
+    for key in list(positions)[::3]:
+        index.remove(key)
+        del positions[key]
+    index.remove("/World/Missing")
+    assert len(index) == len(positions)
+    assert sorted(index.keys) == sorted(positions)
+    for key, position in positions.items():
+        assert tuple(index.positions[index.get_row(key)]) == pytest.approx(position)
+    point = (300.0, 300.0, 300.0)
+    assert [key for key, _ in index.query_radius(point, 800.0)] == [
+        key for key, _ in _brute_force(positions, point, 800.0)
+    ]
+
+
+def test_set_cell_size_rehashes(index, positions):
+    point = (-500.0, 250.0, 0.0)
+    expected = [key for key, _ in _brute_force(positions, point, 700.0)]
+    for cell_size in (40.0, 3000.0):
+        index.set_cell_size(cell_size)
+        assert index.cell_size == cell_size
+        assert [key for key, _ in index.query_radius(point, 700.0)] == expected
+
+
+def test_grows_past_the_initial_capacity():
+    index = SpatialIndex(cell_size=1.0)
+    for i in range(100):
+        index.update(i, (float(i), 0.0, 0.0))
+    assert len(index) == 100
+    assert index.nearest((73.2, 0.0, 0.0), 1.0) == (73, pytest.approx(0.2))
+
+
+def test_clear():
+    index = SpatialIndex()
+    index.update("a", (0.0, 0.0, 0.0))
+    index.clear()
+    assert len(index) == 0
+    assert "a" not in index
+    assert index.nearest((0.0, 0.0, 0.0), 10.0) == (None, None)
+
+
+@pytest.fixture
+def planes():
+    # A camera at the origin looking down -Z, like the default camera of Gf.Frustum
+    frustum = Gf.Frustum()
+    frustum.SetPerspective(90.0, 2.0, 1.0, 1000.0)
+    return get_frustum_planes(frustum.ComputeViewMatrix() * frustum.ComputeProjectionMatrix())
+
+
+def test_frustum_planes_have_unit_normals(planes):
+    assert planes.shape == (6, 4)
+    assert np.linalg.norm(planes[:, :3], axis=1) == pytest.approx(np.ones(6))
+
+
+@pytest.mark.parametrize("position, radius, visible", [
+    ((0.0, 0.0, -10.0), 0.0, True),
+    # Behind the camera and past the far plane
+    ((0.0, 0.0, 10.0), 0.0, False),
+    ((0.0, 0.0, -1100.0), 0.0, False),
+    # The aspect ratio is 2, the frustum is twice as wide as it's tall
+    ((15.0, 0.0, -10.0), 0.0, True),
+    ((0.0, 15.0, -10.0), 0.0, False),
+    # Bounds that are partly inside
+    ((0.0, 15.0, -10.0), 6.0, True),
+    ((0.0, 0.0, 5.0), 10.0, True),
+])
+def test_visible_mask(planes, position, radius, visible):
+    index = SpatialIndex()
+    index.update("a", position, (position, radius))
+    assert index.get_visible_mask(planes).tolist() == [visible]
+
+
+def test_visible_mask_follows_removed_rows(planes):
+    index = SpatialIndex()
+    index.update("behind", (0.0, 0.0, 10.0))
+    index.update("inside", (0.0, 0.0, -10.0))
+    index.update("far", (0.0, 0.0, -5000.0))
+    index.remove("behind")
+    mask = index.get_visible_mask(planes)
+    assert dict(zip(index.keys, mask.tolist())) == {"inside": True, "far": False}
+    assert index.nearest((0.0, 0.0, 0.0), 10000.0, mask)[0] == "inside"
@@ -0,0 +1,220 @@
+__all__ = [
+    "VariantMaterialIndex",
+    "MeshDataCache",
+    "WorldTransformCache",
+    "compute_world_position",
+    "is_transform_property",
+]
+
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from pxr import Gf, Sdf, Usd, UsdGeom
+
+from .mesh_data import MESH_DATA_ATTRS, read_mesh_data
+
+
+class VariantMaterialIndex:
+    """
+    Caches the contents of variant folders as a material name -> material path map, so binding a variant
+    doesn't need to search through the folder for every mesh. A folder is indexed on the first request and
+    dropped from the cache when its children change.
+    """
+
+    def __init__(self):
+        self._folders: Dict[Sdf.Path, Dict[str, Sdf.Path]] = {}
+
+    def get(self, folder_prim) -> Dict[str, Sdf.Path]:
+        """
+        It returns a map of material names to material paths for the given variant folder
+
+        :param folder_prim: The variant folder prim
+        :return: A dictionary, empty if the folder is not valid.
+        """
+        if not folder_prim:
+            return {}
+        folder_path = folder_prim.GetPath()
+        materials = self._folders.get(folder_path)
+        if materials is None:
+            materials = {}
+            for child in folder_prim.GetChildren():
+                materials.setdefault(child.GetName(), child.GetPath())
+            self._folders[folder_path] = materials
+        return materials
+
+    def invalidate(self, folder_path):
+        self._folders.pop(Sdf.Path(str(folder_path)), None)
+
+    def clear(self):
+        self._folders.clear()
+
+    def on_objects_changed(self, notice):
+        """
+        Called by Tf.Notice. It drops folders whose children were added, removed or renamed.
+
+        :param notice: Usd.Notice.ObjectsChanged
+        """
+        if not self._folders:
+            return
+        for path in notice.GetResyncedPaths():
+            if not (path.IsPrimPath() or path.IsAbsoluteRootPath()):
+                continue
+            parent_path = path.GetParentPath()
+            if parent_path in self._folders:
+                # A material was added, removed or renamed
+                del self._folders[parent_path]
+            stale = [folder_path for folder_path in self._folders if folder_path.HasPrefix(path)]
+            for folder_path in stale:
+                del self._folders[folder_path]
+
+
+class MeshDataCache:
+    """
+    A bounded LRU cache of decoded mesh data, keyed by the path of the variant (or MME) folder.
+    An entry is dropped as soon as any of the mesh data attributes of its folder changes, so switching back and
+    forth between variants decodes each of them only once.
+
+    :param max_size: The maximum number of folders to keep
+    """
+
+    def __init__(self, max_size: int = 64):
+        self._max_size = max_size
+        self._entries: "OrderedDict[Sdf.Path, Optional[Tuple[Tuple[str, str], ...]]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, folder_prim) -> Optional[Tuple[Tuple[str, str], ...]]:
+        """
+        It returns the decoded mesh data of the folder, reading it from the stage only on a cache miss
+
+        :param folder_prim: The variant folder prim
+        :return: A tuple of (mesh path, material path) tuples, None if there is no data.
+        """
+        if not folder_prim:
+            return None
+        folder_path = folder_prim.GetPath()
+        if folder_path in self._entries:
+            self._entries.move_to_end(folder_path)
+            return self._entries[folder_path]
+        entries = read_mesh_data(folder_prim)
+        entries = tuple(entries) if entries is not None else None
+        self._entries[folder_path] = entries
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+        return entries
+
+    def invalidate(self, folder_path):
+        self._entries.pop(Sdf.Path(str(folder_path)), None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def on_objects_changed(self, notice):
+        """
+        Called by Tf.Notice. It drops folders whose mesh data attributes were changed, or which were removed.
+
+        :param notice: Usd.Notice.ObjectsChanged
+        """
+        if not self._entries:
+            return
+        for path in notice.GetChangedInfoOnlyPaths():
+            if path.IsPropertyPath() and path.name in MESH_DATA_ATTRS:
+                self._entries.pop(path.GetPrimPath(), None)
+        for path in notice.GetResyncedPaths():
+            if path.IsPropertyPath():
+                if path.name in MESH_DATA_ATTRS:
+                    self._entries.pop(path.GetPrimPath(), None)
+                continue
+            stale = [folder_path for folder_path in self._entries if folder_path.HasPrefix(path)]
+            for folder_path in stale:
+                del self._entries[folder_path]
+
+
+def is_transform_property(path) -> bool:
+    """It checks if the property path points to an attribute that defines the local transform of the prim"""
+    return path.IsPropertyPath() and (path.name.startswith("xformOp:") or path.name == "xformOpOrder")
+
+
+def compute_world_position(prim) -> Optional[Gf.Vec3d]:
+    """
+    It computes the world-space position of the prim without caching, e.g. for the camera that moves all the time
+
+    :param prim: The prim
+    :return: The position or None if the prim is not transformable.
+    """
+    if not prim or not prim.IsA(UsdGeom.Xformable):
+        return None
+    return UsdGeom.Xformable(prim).ComputeLocalToWorldTransform(Usd.TimeCode.Default()).ExtractTranslation()
+
+
+class WorldTransformCache:
+    """
+    Caches world-space positions and bounds of prims. They are computed with a UsdGeom.XformCache and a
+    UsdGeom.BBoxCache, so transforms of shared ancestors are computed once for all objects under them, and kept per
+    prim between roaming ticks. When a prim moves (itself or with one of its ancestors) or its geometry changes, only
+    its values are invalidated, the values of the other prims stay cached.
+    """
+
+    def __init__(self):
+        self._cache = UsdGeom.XformCache(Usd.TimeCode.Default())
+        self._bbox_cache = UsdGeom.BBoxCache(Usd.TimeCode.Default(), includedPurposes=[UsdGeom.Tokens.default_])
+        self._positions: Dict[Sdf.Path, Gf.Vec3d] = {}
+        self._bounds: Dict[Sdf.Path, Optional[Tuple[Gf.Vec3d, float]]] = {}
+
+    def get_position(self, prim) -> Optional[Gf.Vec3d]:
+        """
+        It returns the world-space position of the prim
+
+        :param prim: The prim
+        :return: The position or None if the prim is not transformable.
+        """
+        if not prim or not prim.IsA(UsdGeom.Xformable):
+            return None
+        path = prim.GetPath()
+        position = self._positions.get(path)
+        if position is None:
+            position = self._cache.GetLocalToWorldTransform(prim).ExtractTranslation()
+            self._positions[path] = position
+        return position
+
+    def get_bounds(self, prim) -> Optional[Tuple[Gf.Vec3d, float]]:
+        """
+        It returns the world-space bounding sphere of the prim
+
+        :param prim: The prim
+        :return: A (center, radius) tuple, None if the prim has no bounds.
+        """
+        if not prim or not prim.IsA(UsdGeom.Imageable):
+            return None
+        path = prim.GetPath()
+        if path not in self._bounds:
+            bounds = self._bbox_cache.ComputeWorldBound(prim).ComputeAlignedRange()
+            self._bounds[path] = (
+                None if bounds.IsEmpty() else (bounds.GetMidpoint(), bounds.GetSize().GetLength() * 0.5)
+            )
+        return self._bounds[path]
+
+    def invalidate(self, paths: Iterable[Sdf.Path]):
+        """
+        It drops the cached position and bounds of the prims, e.g. of objects that have moved. The USD caches can't
+        drop single prims, they are cleared, so the ancestor transforms are computed again, but only for prims that
+        are asked for again.
+
+        :param paths: The paths of the prims
+        """
+        invalidated = False
+        for path in paths:
+            path = Sdf.Path(str(path))
+            self._positions.pop(path, None)
+            self._bounds.pop(path, None)
+            invalidated = True
+        if invalidated:
+            self._cache.Clear()
+            self._bbox_cache.Clear()
+
+    def clear(self):
+        self._positions.clear()
+        self._bounds.clear()
+        self._cache.Clear()
+        self._bbox_cache.Clear()
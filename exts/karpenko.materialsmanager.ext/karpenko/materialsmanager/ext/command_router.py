@@ -0,0 +1,110 @@
+__all__ = ["CommandRouter", "HandlerStats"]
+
+import time
+from typing import Callable, Dict, Iterable, List
+
+
+class HandlerStats:
+    """Timing counters of one handler"""
+
+    __slots__ = ("calls", "total_time", "max_time")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def add(self, elapsed):
+        self.calls += 1
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "total_s": self.total_time,
+            "mean_s": self.total_time / self.calls if self.calls else 0.0,
+            "max_s": self.max_time,
+        }
+
+
+class CommandRouter:
+    """
+    Dispatches executed Kit commands to the handlers registered for their names.
+    Commands without a handler are rejected with a single dictionary lookup, so the extension costs next to nothing
+    while other tools are being used. Every handler call is timed, see get_stats.
+    """
+
+    def __init__(self):
+        # Command name -> name of the handler
+        self._routes: Dict[str, str] = {}
+        # Name of the handler -> handler
+        self._handlers: Dict[str, Callable] = {}
+        self._stats: Dict[str, HandlerStats] = {}
+        self.rejected = 0
+
+    def register(self, name: str, command_names: Iterable[str], handler: Callable):
+        """
+        It registers the handler for the commands, a command can have only one handler
+
+        :param name: The name of the handler, used in the statistics
+        :param command_names: The names of the commands the handler is called for
+        :param handler: Called with the history entry of the command
+        """
+        self._handlers[name] = handler
+        self._stats.setdefault(name, HandlerStats())
+        for command_name in command_names:
+            self._routes[command_name] = name
+
+    def unregister(self, name: str):
+        """It removes the handler and all its routes"""
+        self._handlers.pop(name, None)
+        self._stats.pop(name, None)
+        for command_name in [c for c, handler_name in self._routes.items() if handler_name == name]:
+            del self._routes[command_name]
+
+    def clear(self):
+        self._routes.clear()
+        self._handlers.clear()
+        self._stats.clear()
+        self.rejected = 0
+
+    def handles(self, command_name: str) -> bool:
+        return command_name in self._routes
+
+    def get_command_names(self) -> List[str]:
+        return list(self._routes)
+
+    def dispatch(self, latest_action) -> bool:
+        """
+        It calls the handler registered for the command of the history entry
+
+        :param latest_action: The history entry of the executed command
+        :return: True if the command has a handler.
+        """
+        name = self._routes.get(latest_action.name)
+        if name is None:
+            self.rejected += 1
+            return False
+        start = time.perf_counter()
+        try:
+            self._handlers[name](latest_action)
+        finally:
+            self._stats[name].add(time.perf_counter() - start)
+        return True
+
+    def get_stats(self) -> Dict[str, dict]:
+        """
+        It returns the timing counters of all handlers
+
+        :return: Handler name -> {"calls", "total_s", "mean_s", "max_s"}, plus the number of rejected commands.
+        """
+        result = {name: stats.as_dict() for name, stats in self._stats.items()}
+        result["rejected"] = {"calls": self.rejected}
+        return result
+
+    def reset_stats(self):
+        for name in self._stats:
+            self._stats[name] = HandlerStats()
+        self.rejected = 0
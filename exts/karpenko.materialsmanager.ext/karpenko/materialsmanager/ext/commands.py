@@ -0,0 +1,650 @@
+__all__ = [
+    "CloneMaterialsCommand",
+    "ShareMaterialsCommand",
+    "CreateMMEVariantsCommand",
+    "LinkMMEVariantLibraryCommand",
+    "LoadMMEVariantsCommand",
+    "BindMaterialsBatchCommand",
+    "SetMMEActiveFlagsCommand",
+    "SetMMEVariantsActiveCommand",
+    "SetMMELookVariantsCommand",
+    "SetMMELookSelectionCommand",
+]
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import omni.kit.commands
+import omni.kit.usd_undo
+import omni.usd
+from pxr import Sdf, UsdShade
+
+from .material_store import get_store_path, share_materials
+from .prim_serializer import clone_prims
+from .variant_sets import LOOK_VARIANT_SET, author_look_variants, remove_look_variants
+
+BINDING_REL_NAME = "material:binding"
+BINDING_API_NAME = "MaterialBindingAPI"
+ACTIVE_FLAG_NAME = "MMEisActive"
+
+
+class CloneMaterialsCommand(omni.kit.commands.Command):
+    """
+    Copies materials (or any other prims) under the given root prim in a single change block.
+    Unlike ImportLayer, specs are copied directly from the source layers, without a round trip through USDA text.
+
+    :param paths: The paths of the prims to copy
+    :param root: The path of the prim the copies will be placed under
+    :param stage: The stage to work with, defaults to the stage of the usd context (optional)
+    :param usd_context_name: The name of the usd context (optional)
+    """
+
+    def __init__(self, paths: List[Sdf.Path], root: Sdf.Path, stage=None, usd_context_name: str = ""):
+        self._stage = stage or omni.usd.get_context(usd_context_name).get_stage()
+        self._paths = [Sdf.Path(str(path)) for path in paths]
+        self._root = Sdf.Path(str(root))
+        self._usd_undo = None
+
+    def do(self):
+        layer = self._stage.GetEditTarget().GetLayer()
+        self._usd_undo = omni.kit.usd_undo.UsdLayerUndo(layer)
+        if not layer.GetPrimAtPath(self._root):
+            self._usd_undo.reserve(self._root)
+        for path in self._paths:
+            self._usd_undo.reserve(self._root.AppendChild(path.name))
+        return clone_prims(self._stage, self._paths, self._root, layer)
+
+    def undo(self):
+        if self._usd_undo:
+            self._usd_undo.undo()
+            self._usd_undo = None
+
+
+class ShareMaterialsCommand(omni.kit.commands.Command):
+    """
+    Places materials under the given root prim as references to shared copies in the material store, see
+    share_materials. New entries of the store are removed on undo.
+
+    :param paths: The paths of the materials
+    :param root: The path of the prim the materials will be placed under
+    :param stage: The stage to work with, defaults to the stage of the usd context (optional)
+    :param usd_context_name: The name of the usd context (optional)
+    """
+
+    def __init__(self, paths: List[Sdf.Path], root: Sdf.Path, stage=None, usd_context_name: str = ""):
+        self._stage = stage or omni.usd.get_context(usd_context_name).get_stage()
+        self._paths = [Sdf.Path(str(path)) for path in paths]
+        self._root = Sdf.Path(str(root))
+        self._layer = None
+        self._usd_undo = None
+        self._created_entries = []
+
+    def do(self):
+        self._layer = self._stage.GetEditTarget().GetLayer()
+        self._usd_undo = omni.kit.usd_undo.UsdLayerUndo(self._layer)
+        if not self._layer.GetPrimAtPath(self._root):
+            self._usd_undo.reserve(self._root)
+        for path in self._paths:
+            self._usd_undo.reserve(self._root.AppendChild(path.name))
+        store_path = get_store_path(self._stage)
+        created_store = store_path is not None and not self._layer.GetPrimAtPath(store_path)
+        existing_entries = set()
+        if store_path is not None and not created_store:
+            existing_entries = {entry.path for entry in self._layer.GetPrimAtPath(store_path).nameChildren}
+        paths_map = share_materials(self._stage, self._paths, self._root, self._layer)
+        if created_store and self._layer.GetPrimAtPath(store_path):
+            self._created_entries = [store_path]
+        elif store_path is not None:
+            self._created_entries = [
+                entry.path for entry in self._layer.GetPrimAtPath(store_path).nameChildren
+                if entry.path not in existing_entries
+            ]
+        return paths_map
+
+    def undo(self):
+        if self._usd_undo:
+            self._usd_undo.undo()
+            self._usd_undo = None
+        with Sdf.ChangeBlock():
+            for path in self._created_entries:
+                _remove_prim_spec(self._layer, path)
+        self._created_entries = []
+
+
+class CreateMMEVariantsCommand(omni.kit.commands.Command):
+    """
+    Creates new variant folders of many objects at once: the MME folder of objects that don't have one yet, the
+    variant folders with their MMEisActive flags and mesh data, and the copies of the materials in the variant
+    folders. Everything is authored in one change block and recorded as a single undo entry.
+
+    :param variants: Variant folder path -> (paths of the materials to copy, mesh data attributes), the attributes
+        are name -> (type, value), see encode_mesh_data. New variant folders are marked as active
+    :param mme_folders: MME folder path -> mesh data attributes of the original materials, for objects that don't
+        have an MME folder yet (optional)
+    :param share: If True, the variant folders get references to shared copies of the materials from the material
+        store instead of copies, see share_materials (optional)
+    :param stage: The stage to work with, defaults to the stage of the usd context (optional)
+    :param usd_context_name: The name of the usd context (optional)
+    """
+
+    def __init__(
+        self,
+        variants: Dict[Sdf.Path, Tuple[List[Sdf.Path], dict]],
+        mme_folders: Optional[Dict[Sdf.Path, dict]] = None,
+        share: bool = False,
+        stage=None,
+        usd_context_name: str = "",
+    ):
+        self._stage = stage or omni.usd.get_context(usd_context_name).get_stage()
+        self._variants = {Sdf.Path(str(path)): value for path, value in variants.items()}
+        self._mme_folders = {Sdf.Path(str(path)): value for path, value in (mme_folders or {}).items()}
+        self._share = share
+        self._layer = None
+        self._usd_undo = None
+        self._created_entries = []
+
+    def _author_folder(self, folder_path: Sdf.Path, is_active: bool, attributes: dict):
+        prim_spec = Sdf.CreatePrimInLayer(self._layer, folder_path)
+        prim_spec.specifier = Sdf.SpecifierDef
+        prim_spec.typeName = "Scope"
+        values = {ACTIVE_FLAG_NAME: (Sdf.ValueTypeNames.Bool, is_active)}
+        values.update(attributes)
+        for attr_name, (attr_type, attr_value) in values.items():
+            attr_spec = prim_spec.attributes.get(attr_name)
+            if not attr_spec:
+                attr_spec = Sdf.AttributeSpec(prim_spec, attr_name, attr_type, Sdf.VariabilityVarying, True)
+            attr_spec.default = attr_value
+
+    def do(self):
+        self._layer = self._stage.GetEditTarget().GetLayer()
+        self._usd_undo = omni.kit.usd_undo.UsdLayerUndo(self._layer)
+        # The whole MME folder is reserved if it's new, otherwise only the variant folder
+        for folder_path in self._mme_folders:
+            self._usd_undo.reserve(folder_path)
+        for folder_path in self._variants:
+            if folder_path.GetParentPath() not in self._mme_folders:
+                self._usd_undo.reserve(folder_path)
+        store_path = get_store_path(self._stage) if self._share else None
+        existing_entries = _get_child_paths(self._layer, store_path)
+
+        paths_maps = {}
+        with Sdf.ChangeBlock():
+            for folder_path, attributes in self._mme_folders.items():
+                self._author_folder(folder_path, False, attributes)
+            for folder_path, (material_paths, attributes) in self._variants.items():
+                self._author_folder(folder_path, True, attributes)
+                if self._share:
+                    paths_maps[folder_path] = share_materials(self._stage, material_paths, folder_path, self._layer)
+                else:
+                    paths_maps[folder_path] = clone_prims(self._stage, material_paths, folder_path, self._layer)
+
+        if store_path is not None:
+            if existing_entries is None:
+                # The store itself is new
+                self._created_entries = [store_path] if self._layer.GetPrimAtPath(store_path) else []
+            else:
+                self._created_entries = [
+                    path for path in _get_child_paths(self._layer, store_path) if path not in existing_entries
+                ]
+        return paths_maps
+
+    def undo(self):
+        if self._usd_undo:
+            self._usd_undo.undo()
+            self._usd_undo = None
+        with Sdf.ChangeBlock():
+            for path in self._created_entries:
+                _remove_prim_spec(self._layer, path)
+        self._created_entries = []
+
+
+class LinkMMEVariantLibraryCommand(omni.kit.commands.Command):
+    """
+    Replaces variant folders with folders that take their materials from a variant library, see
+    export_variant_library. By default the library is added as a payload, so the materials are composed only while
+    the payload is loaded. The flag and the mesh data are authored on the folder itself.
+
+    :param file_path: The path of the library file
+    :param asset_path: The asset path of the payloads, e.g. relative to the scene
+    :param folders: Folder path -> (path of the variant folder in the library, attributes of the folder), the
+        attributes are name -> (type, value)
+    :param inline: If True, the materials are copied from the library into the folders instead (optional)
+    :param stage: The stage to work with, defaults to the stage of the usd context (optional)
+    :param usd_context_name: The name of the usd context (optional)
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        asset_path: str,
+        folders: Dict[Sdf.Path, Tuple[Sdf.Path, dict]],
+        inline: bool = False,
+        stage=None,
+        usd_context_name: str = "",
+    ):
+        self._stage = stage or omni.usd.get_context(usd_context_name).get_stage()
+        self._file_path = file_path
+        self._asset_path = asset_path
+        self._folders = {Sdf.Path(str(path)): value for path, value in folders.items()}
+        self._inline = inline
+        self._usd_undo = None
+
+    def do(self):
+        layer = self._stage.GetEditTarget().GetLayer()
+        library = Sdf.Layer.FindOrOpen(self._file_path) if self._inline else None
+        if self._inline and not library:
+            raise RuntimeError(f"Unable to open the variant library {self._file_path}")
+        self._usd_undo = omni.kit.usd_undo.UsdLayerUndo(layer)
+        for folder_path in self._folders:
+            self._usd_undo.reserve(folder_path)
+        with Sdf.ChangeBlock():
+            for folder_path, (library_path, attributes) in self._folders.items():
+                # The previous content of the folder is replaced, e.g. materials copied into it
+                _remove_prim_spec(layer, folder_path)
+                prim_spec = Sdf.CreatePrimInLayer(layer, folder_path)
+                if library:
+                    Sdf.CopySpec(library, library_path, layer, folder_path)
+                else:
+                    prim_spec.payloadList.ClearEditsAndMakeExplicit()
+                    prim_spec.payloadList.explicitItems = [Sdf.Payload(self._asset_path, library_path)]
+                prim_spec.specifier = Sdf.SpecifierDef
+                prim_spec.typeName = "Scope"
+                for attr_name, (attr_type, attr_value) in attributes.items():
+                    attr_spec = prim_spec.attributes.get(attr_name)
+                    if not attr_spec:
+                        attr_spec = Sdf.AttributeSpec(prim_spec, attr_name, attr_type, Sdf.VariabilityVarying, True)
+                    attr_spec.default = attr_value
+
+    def undo(self):
+        if self._usd_undo:
+            self._usd_undo.undo()
+            self._usd_undo = None
+
+
+class LoadMMEVariantsCommand(omni.kit.commands.Command):
+    """
+    Loads and unloads payloads of variant folders, e.g. so that only the active variant of a variant library is
+    composed. The load state isn't stored in layers, the command makes it part of the undo history, so undoing a
+    switch loads the previous variant back.
+
+    :param load: The paths of the folders to load
+    :param unload: The paths of the folders to unload
+    :param stage: The stage to work with, defaults to the stage of the usd context (optional)
+    :param usd_context_name: The name of the usd context (optional)
+    """
+
+    def __init__(
+        self, load: Iterable[Sdf.Path] = (), unload: Iterable[Sdf.Path] = (), stage=None, usd_context_name: str = ""
+    ):
+        self._stage = stage or omni.usd.get_context(usd_context_name).get_stage()
+        self._load = [Sdf.Path(str(path)) for path in load]
+        self._unload = [Sdf.Path(str(path)) for path in unload]
+        self._loaded = []
+        self._unloaded = []
+
+    def do(self):
+        loaded_paths = set(self._stage.GetLoadSet())
+        self._loaded = [path for path in self._load if path not in loaded_paths]
+        self._unloaded = [path for path in self._unload if path in loaded_paths]
+        if self._loaded or self._unloaded:
+            self._stage.LoadAndUnload(self._loaded, self._unloaded)
+
+    def undo(self):
+        if self._loaded or self._unloaded:
+            self._stage.LoadAndUnload(self._unloaded, self._loaded)
+        self._loaded = []
+        self._unloaded = []
+
+
+def _get_child_paths(layer: Sdf.Layer, path: Optional[Sdf.Path]):
+    """It returns the set of paths of the children of the prim spec, or None if there is no spec at path"""
+    if path is None:
+        return None
+    prim_spec = layer.GetPrimAtPath(path)
+    if not prim_spec:
+        return None
+    return {child.path for child in prim_spec.nameChildren}
+
+
+def _remove_prim_spec(layer: Sdf.Layer, path: Sdf.Path):
+    """It removes the prim spec at path from the layer"""
+    if not layer.GetPrimAtPath(path):
+        return
+    parent_path = path.GetParentPath()
+    if parent_path == Sdf.Path.absoluteRootPath:
+        del layer.rootPrims[path.name]
+    else:
+        del layer.GetPrimAtPath(parent_path).nameChildren[path.name]
+
+
+def _get_created_root(layer: Sdf.Layer, path: Sdf.Path):
+    """
+    If there is no spec at path in the layer, it returns the topmost ancestor that will be created along with it,
+    it's enough to remove it on undo. Otherwise, returns None.
+    """
+    if layer.GetPrimAtPath(path):
+        return None
+    created_path = path
+    while created_path.GetParentPath() != Sdf.Path.absoluteRootPath and \
+            not layer.GetPrimAtPath(created_path.GetParentPath()):
+        created_path = created_path.GetParentPath()
+    return created_path
+
+
+def _get_list_state(list_proxy):
+    """It returns a copy of the path list edits, the list op itself can't be set back on read-only fields"""
+    if list_proxy.isExplicit:
+        return True, list(list_proxy.explicitItems)
+    return False, (list(list_proxy.prependedItems), list(list_proxy.appendedItems), list(list_proxy.deletedItems))
+
+
+def _set_list_state(list_proxy, state):
+    is_explicit, items = state
+    if is_explicit:
+        list_proxy.ClearEditsAndMakeExplicit()
+        list_proxy.explicitItems = items
+    else:
+        list_proxy.ClearEdits()
+        list_proxy.prependedItems, list_proxy.appendedItems, list_proxy.deletedItems = items
+
+
+class BindMaterialsBatchCommand(omni.kit.commands.Command):
+    """
+    Binds materials to many prims at once. All bindings are authored on the Sdf level inside one change block,
+    so the stage is recomposed once, and the command is recorded as a single undo entry that only remembers
+    the previous state of the binding relationships.
+
+    :param bindings: A list of (prim_path, material_path) tuples, the last binding wins for repeated prims
+    :param strength: The binding strength, weakerThanDescendants or strongerThanDescendants (optional)
+    :param stage: The stage to work with, defaults to the stage of the usd context (optional)
+    :param usd_context_name: The name of the usd context (optional)
+    """
+
+    def __init__(
+        self,
+        bindings: List[Tuple[Sdf.Path, Sdf.Path]],
+        strength: str = UsdShade.Tokens.weakerThanDescendants,
+        stage=None,
+        usd_context_name: str = "",
+    ):
+        self._stage = stage or omni.usd.get_context(usd_context_name).get_stage()
+        self._bindings = {}
+        for prim_path, material_path in bindings:
+            if prim_path and material_path:
+                self._bindings[Sdf.Path(str(prim_path))] = Sdf.Path(str(material_path))
+        self._strength = strength[0] if isinstance(strength, (list, tuple)) else strength
+        self._layer = None
+        self._undo_records = []
+
+    def _save_state(self, prim_path: Sdf.Path):
+        """It remembers everything the binding is going to change on the prim"""
+        layer = self._layer
+        created_path = _get_created_root(layer, prim_path)
+        if created_path:
+            return (prim_path, created_path, None, None)
+        prim_spec = layer.GetPrimAtPath(prim_path)
+        schemas = prim_spec.GetInfo("apiSchemas") if prim_spec.HasInfo("apiSchemas") else None
+        rel_spec = layer.GetRelationshipAtPath(prim_path.AppendProperty(BINDING_REL_NAME))
+        rel_state = None
+        if rel_spec:
+            strength = rel_spec.GetInfo("bindMaterialAs") if rel_spec.HasInfo("bindMaterialAs") else None
+            rel_state = (_get_list_state(rel_spec.targetPathList), strength)
+        return (prim_path, None, schemas, rel_state)
+
+    def _author_binding(self, prim_path: Sdf.Path, material_path: Sdf.Path):
+        prim_spec = Sdf.CreatePrimInLayer(self._layer, prim_path)
+        schemas = prim_spec.GetInfo("apiSchemas") if prim_spec.HasInfo("apiSchemas") else Sdf.TokenListOp()
+        if BINDING_API_NAME not in schemas.GetAddedOrExplicitItems():
+            if schemas.isExplicit:
+                schemas.explicitItems = list(schemas.explicitItems) + [BINDING_API_NAME]
+            else:
+                schemas.prependedItems = list(schemas.prependedItems) + [BINDING_API_NAME]
+            prim_spec.SetInfo("apiSchemas", schemas)
+
+        rel_spec = self._layer.GetRelationshipAtPath(prim_path.AppendProperty(BINDING_REL_NAME))
+        if not rel_spec:
+            rel_spec = Sdf.RelationshipSpec(prim_spec, BINDING_REL_NAME, False)
+        rel_spec.targetPathList.ClearEditsAndMakeExplicit()
+        rel_spec.targetPathList.explicitItems = [material_path]
+        if self._strength == UsdShade.Tokens.strongerThanDescendants:
+            rel_spec.SetInfo("bindMaterialAs", self._strength)
+        elif rel_spec.HasInfo("bindMaterialAs"):
+            rel_spec.ClearInfo("bindMaterialAs")
+
+    def do(self):
+        self._layer = self._stage.GetEditTarget().GetLayer()
+        self._undo_records = []
+        with Sdf.ChangeBlock():
+            for prim_path, material_path in self._bindings.items():
+                self._undo_records.append(self._save_state(prim_path))
+                self._author_binding(prim_path, material_path)
+
+    def undo(self):
+        if not self._layer:
+            return
+        layer = self._layer
+        with Sdf.ChangeBlock():
+            for prim_path, created_path, schemas, rel_state in reversed(self._undo_records):
+                if created_path:
+                    _remove_prim_spec(layer, created_path)
+                    continue
+                prim_spec = layer.GetPrimAtPath(prim_path)
+                if not prim_spec:
+                    continue
+                if schemas is None:
+                    prim_spec.ClearInfo("apiSchemas")
+                else:
+                    prim_spec.SetInfo("apiSchemas", schemas)
+                rel_spec = layer.GetRelationshipAtPath(prim_path.AppendProperty(BINDING_REL_NAME))
+                if rel_state is None:
+                    if rel_spec:
+                        prim_spec.RemoveProperty(rel_spec)
+                    continue
+                if not rel_spec:
+                    rel_spec = Sdf.RelationshipSpec(prim_spec, BINDING_REL_NAME, False)
+                targets, strength = rel_state
+                _set_list_state(rel_spec.targetPathList, targets)
+                if strength is None:
+                    rel_spec.ClearInfo("bindMaterialAs")
+                else:
+                    rel_spec.SetInfo("bindMaterialAs", strength)
+        self._undo_records = []
+
+
+class SetMMEActiveFlagsCommand(omni.kit.commands.Command):
+    """
+    Sets MMEisActive flags of many variant folders (and MME folders) at once, inside one change block and
+    as a single undo entry.
+
+    :param flags: A dictionary of folder path -> value of the flag
+    :param stage: The stage to work with, defaults to the stage of the usd context (optional)
+    :param usd_context_name: The name of the usd context (optional)
+    """
+
+    def __init__(self, flags: Dict[Sdf.Path, bool], stage=None, usd_context_name: str = ""):
+        self._stage = stage or omni.usd.get_context(usd_context_name).get_stage()
+        self._flags = {Sdf.Path(str(path)): bool(value) for path, value in flags.items()}
+        self._layer = None
+        self._undo_records = []
+
+    def do(self):
+        self._layer = self._stage.GetEditTarget().GetLayer()
+        self._undo_records = []
+        with Sdf.ChangeBlock():
+            for folder_path, value in self._flags.items():
+                attr_path = folder_path.AppendProperty(ACTIVE_FLAG_NAME)
+                attr_spec = self._layer.GetAttributeAtPath(attr_path)
+                if attr_spec:
+                    if attr_spec.HasDefaultValue() and attr_spec.default == value:
+                        continue
+                    previous = attr_spec.default if attr_spec.HasDefaultValue() else None
+                    self._undo_records.append((attr_path, None, True, previous))
+                else:
+                    created_path = _get_created_root(self._layer, folder_path)
+                    self._undo_records.append((attr_path, created_path, False, None))
+                    prim_spec = Sdf.CreatePrimInLayer(self._layer, folder_path)
+                    attr_spec = Sdf.AttributeSpec(
+                        prim_spec, ACTIVE_FLAG_NAME, Sdf.ValueTypeNames.Bool, Sdf.VariabilityVarying, True
+                    )
+                attr_spec.default = value
+
+    def undo(self):
+        if not self._layer:
+            return
+        layer = self._layer
+        with Sdf.ChangeBlock():
+            for attr_path, created_path, had_spec, previous in reversed(self._undo_records):
+                if created_path:
+                    _remove_prim_spec(layer, created_path)
+                    continue
+                attr_spec = layer.GetAttributeAtPath(attr_path)
+                if not attr_spec:
+                    continue
+                if not had_spec:
+                    layer.GetPrimAtPath(attr_path.GetPrimPath()).RemoveProperty(attr_spec)
+                elif previous is None:
+                    attr_spec.ClearDefaultValue()
+                else:
+                    attr_spec.default = previous
+        self._undo_records = []
+
+
+class SetMMEVariantsActiveCommand(omni.kit.commands.Command):
+    """
+    Activates and deactivates variant folders (Usd.Prim.SetActive) at once, inside one change block and as a single
+    undo entry. Children of an inactive folder aren't composed at all, but its own attributes (the flag and the mesh
+    data) can still be read.
+
+    :param active: A dictionary of folder path -> True to activate the folder, False to deactivate it
+    :param stage: The stage to work with, defaults to the stage of the usd context (optional)
+    :param usd_context_name: The name of the usd context (optional)
+    """
+
+    def __init__(self, active: Dict[Sdf.Path, bool], stage=None, usd_context_name: str = ""):
+        self._stage = stage or omni.usd.get_context(usd_context_name).get_stage()
+        self._active = {Sdf.Path(str(path)): bool(value) for path, value in active.items()}
+        self._layer = None
+        self._undo_records = []
+
+    def do(self):
+        self._layer = self._stage.GetEditTarget().GetLayer()
+        self._undo_records = []
+        with Sdf.ChangeBlock():
+            for folder_path, value in self._active.items():
+                created_path = _get_created_root(self._layer, folder_path)
+                prim_spec = Sdf.CreatePrimInLayer(self._layer, folder_path)
+                previous = prim_spec.GetInfo("active") if prim_spec.HasInfo("active") else None
+                if value and previous is False:
+                    # The folder was deactivated in this layer, the opinion is removed instead of being flipped
+                    prim_spec.ClearInfo("active")
+                elif previous != value:
+                    prim_spec.active = value
+                else:
+                    continue
+                self._undo_records.append((folder_path, created_path, previous))
+
+    def undo(self):
+        if not self._layer:
+            return
+        layer = self._layer
+        with Sdf.ChangeBlock():
+            for folder_path, created_path, previous in reversed(self._undo_records):
+                if created_path:
+                    _remove_prim_spec(layer, created_path)
+                    continue
+                prim_spec = layer.GetPrimAtPath(folder_path)
+                if not prim_spec:
+                    continue
+                if previous is None:
+                    prim_spec.ClearInfo("active")
+                else:
+                    prim_spec.active = previous
+        self._undo_records = []
+
+
+class SetMMELookVariantsCommand(omni.kit.commands.Command):
+    """
+    Creates (or rebuilds) the MMELook variant set of an object, so its looks can be switched by the variant
+    selection instead of rebinding every mesh. Passing None as looks removes the variant set.
+
+    :param prim_path: The path of the object root
+    :param looks: Variant name -> (path of the folder with materials, list of (mesh path, material path)), or None
+    :param selection: The name of the variant to select (optional)
+    :param stage: The stage to work with, defaults to the stage of the usd context (optional)
+    :param usd_context_name: The name of the usd context (optional)
+    """
+
+    def __init__(
+        self,
+        prim_path: Sdf.Path,
+        looks: Optional[Dict[str, Tuple[Sdf.Path, List[Tuple[Sdf.Path, Sdf.Path]]]]],
+        selection: str = "",
+        stage=None,
+        usd_context_name: str = "",
+    ):
+        self._stage = stage or omni.usd.get_context(usd_context_name).get_stage()
+        self._prim_path = Sdf.Path(str(prim_path))
+        self._looks = looks
+        self._selection = selection
+        self._usd_undo = None
+
+    def do(self):
+        layer = self._stage.GetEditTarget().GetLayer()
+        self._usd_undo = omni.kit.usd_undo.UsdLayerUndo(layer)
+        # Local bindings and flags of the whole object are moved, so the whole object is reserved
+        self._usd_undo.reserve(self._prim_path)
+        if self._looks is None:
+            remove_look_variants(layer, self._prim_path)
+        else:
+            author_look_variants(layer, self._prim_path, self._looks, self._selection)
+
+    def undo(self):
+        if self._usd_undo:
+            self._usd_undo.undo()
+            self._usd_undo = None
+
+
+class SetMMELookSelectionCommand(omni.kit.commands.Command):
+    """
+    Selects variants of the MMELook variant sets of many objects at once, in one change block.
+
+    :param selections: A dictionary of object path -> name of the variant
+    :param stage: The stage to work with, defaults to the stage of the usd context (optional)
+    :param usd_context_name: The name of the usd context (optional)
+    """
+
+    def __init__(self, selections: Dict[Sdf.Path, str], stage=None, usd_context_name: str = ""):
+        self._stage = stage or omni.usd.get_context(usd_context_name).get_stage()
+        self._selections = {Sdf.Path(str(path)): name for path, name in selections.items()}
+        self._layer = None
+        self._undo_records = []
+
+    def do(self):
+        self._layer = self._stage.GetEditTarget().GetLayer()
+        self._undo_records = []
+        with Sdf.ChangeBlock():
+            for prim_path, variant_name in self._selections.items():
+                created_path = _get_created_root(self._layer, prim_path)
+                prim_spec = Sdf.CreatePrimInLayer(self._layer, prim_path)
+                previous = prim_spec.variantSelections.get(LOOK_VARIANT_SET)
+                if previous == variant_name:
+                    continue
+                self._undo_records.append((prim_path, created_path, previous))
+                prim_spec.variantSelections[LOOK_VARIANT_SET] = variant_name
+
+    def undo(self):
+        if not self._layer:
+            return
+        layer = self._layer
+        with Sdf.ChangeBlock():
+            for prim_path, created_path, previous in reversed(self._undo_records):
+                if created_path:
+                    _remove_prim_spec(layer, created_path)
+                    continue
+                prim_spec = layer.GetPrimAtPath(prim_path)
+                if not prim_spec:
+                    continue
+                if previous is None:
+                    del prim_spec.variantSelections[LOOK_VARIANT_SET]
+                else:
+                    prim_spec.variantSelections[LOOK_VARIANT_SET] = previous
+        self._undo_records = []
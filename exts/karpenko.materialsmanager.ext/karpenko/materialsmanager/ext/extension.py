@@ -1,9 +1,9 @@
 import asyncio
-import base64
-import json
-import math
+import os
 
 import carb
+import carb.settings
+import carb.tokens
 import omni.ext
 import omni.kit.commands
 import omni.ui as ui
@@ -11,9 +11,28 @@ import omni.usd
 from omni.kit.viewport.utility import (get_active_viewport_camera_path,
                                        get_active_viewport_window,
                                        get_ui_position_for_prim)
-from pxr import Sdf
-
-from .prim_serializer import get_prim_as_text, text_to_stage
+import numpy as np
+from pxr import Gf, Sdf, Tf, Usd, UsdGeom
+
+from . import commands
+from .caches import (MeshDataCache, VariantMaterialIndex, WorldTransformCache, compute_world_position,
+                     is_transform_property)
+from .command_router import CommandRouter
+from .list_models import PrimListDelegate, PrimListModel
+from .mesh_data import LEGACY_ATTR, encode_mesh_data, encode_mesh_data_changes, has_legacy_mesh_data
+from .material_store import get_store_path, get_unused_store_entries
+from .mme_index import MMEObjectIndex
+from .presets import (encode_preset, get_preset_attr_names, get_preset_display_name, get_preset_key,
+                      get_preset_keys, read_preset)
+from .roaming import RoamingController
+from .scheduler import FRAME_BUDGET_SETTING, FrameBudgetScheduler
+from .settings import SESSION_LAYER_SETTING, SETTINGS_TYPES, SceneSettings, get_setting_type
+from .spatial_index import SpatialIndex, get_frustum_planes
+from .variant_library import (LIBRARY_ROOT, export_variant_library, get_library_asset_path, get_library_loads,
+                              get_library_payloads, get_library_variants, is_linked_library, read_library_mesh_data)
+from .variant_sets import ORIGINAL_LOOK, get_look_variant_name, get_look_variant_names, has_look_variants
+from .thumbnails import (THUMBNAIL_CACHE_DIR_SETTING, THUMBNAIL_CACHE_SIZE_SETTING, THUMBNAIL_SIZE_SETTING,
+                         ThumbnailDiskCache, ThumbnailService)
 from .style import materialsmanager_window_style as _style
 from .viewport_ui.widget_info_scene import WidgetInfoScene
 
@@ -22,6 +41,8 @@ class MaterialManagerExtended(omni.ext.IExt):
     WINDOW_NAME = "Material Manager Extended"
     SCENE_SETTINGS_WINDOW_NAME = "Material Manager Settings"
     MENU_PATH = "Window/" + WINDOW_NAME
+    # Bindings written by one command when a job commits, the job yields after every command (see Job)
+    BIND_CHUNK_SIZE = 64
 
     def on_startup(self, ext_id):
         print("[karpenko.materialsmanager.ext] MaterialManagerExtended startup")
@@ -31,13 +52,22 @@ class MaterialManagerExtended(omni.ext.IExt):
         self.variants_frame_original = None
         self.variants_frame = None
         self.active_objects_frame = None
+        self.presets_frame = None
+        self.preset_name_field = None
+        self.library_path_field = None
+        self.materials_model = PrimListModel()
+        self.materials_delegate = PrimListDelegate(self.select_material, preview_fn=self.get_material_preview)
+        self._materials_frame_layout = None
+        self.active_objects_model = PrimListModel()
+        self.active_objects_delegate = PrimListDelegate(self.select_prim)
+        self._active_objects_frame_layout = None
+        self.current_object = None
         self._window = None
         self._window_scenemanager = None
         self.materials_frame = None
         self.main_frame = None
         self.ignore_change = False
         self.ignore_settings_update = False
-        self.roaming_timer = None
         self.ext_id = ext_id
         self._widget_info_viewport = None
         self.current_ui = "default"
@@ -45,20 +75,38 @@ class MaterialManagerExtended(omni.ext.IExt):
         self.ignore_next_select = False
         self.last_roaming_prim = None
         self.reticle = None
+        self._stage_listener = None
+        self.settings = SceneSettings()
+        self.mme_index = MMEObjectIndex()
+        self.spatial_index = SpatialIndex()
+        self.variant_materials = VariantMaterialIndex()
+        self.mesh_data_cache = MeshDataCache()
+        self.transforms = WorldTransformCache()
+        self.roaming = RoamingController(self.get_closest_mme_object, self.get_setting)
+        self.thumbnails = self._create_thumbnail_service()
+        # Long operations (adding variants, applying presets, scanning the stage) run in slices of the frame budget
+        self.jobs = FrameBudgetScheduler(
+            lambda: carb.settings.get_settings().get(FRAME_BUDGET_SETTING), on_progress=self._on_jobs_progress
+        )
+        self.progress_frame = None
+        self._progress_models = {}
+        self._progress_jobs = []
         self.stage = self._usd_context.get_stage()
+        if self.stage:
+            self._attach_stage()
+        self._stage_event_sub = self._usd_context.get_stage_event_stream().create_subscription_to_pop(
+            self._on_stage_event, name="Material Manager Extended stage events"
+        )
 
-        self.allowed_commands = [
-            "SelectPrimsCommand",
-            "SelectPrims",
-            "CreatePrimCommand",
-            "DeletePrims",
-            "TransformPrimCommand",
-            "Undo",
-            "BindMaterial",
-            "BindMaterialCommand",
-            "MovePrims",
-            "MovePrim",
-        ]
+        # Only these commands are handled by on_change, everything else is rejected right away
+        self.command_router = CommandRouter()
+        self.command_router.register("bind", ["BindMaterial", "BindMaterialCommand"], self._on_bind_command)
+        self.command_router.register("select", ["SelectPrimsCommand", "SelectPrims", "Undo"], self._on_select_command)
+        self.command_router.register(
+            "move", ["MovePrims", "MovePrim", "TransformPrimCommand"], self._on_select_command
+        )
+        self.command_router.register("delete", ["DeletePrims"], self._on_select_command)
+        self.command_router.register("create", ["CreatePrimCommand"], self._on_select_command)
         self.is_settings_window_open = False
         self.render_default_layout()
         # show the window in the usual way if the stage is loaded
@@ -67,16 +115,23 @@ class MaterialManagerExtended(omni.ext.IExt):
         else:
             # otherwise, show the window after the stage is loaded
             self._setup_window_task = asyncio.ensure_future(self._dock_window())
+        omni.kit.commands.register_all_commands_in_module(commands)
         omni.kit.commands.subscribe_on_change(self.on_change)
-        self.roaming_timer = asyncio.ensure_future(self.enable_roaming_timer())
+        self.update_roaming_state()
 
     def on_shutdown(self):
         """
         This function is called when the addon is disabled
         """
         omni.kit.commands.unsubscribe_on_change(self.on_change)
-        if self.roaming_timer:
-            self.disable_roaming_timer()
+        omni.kit.commands.unregister_module_commands(commands)
+        self.command_router.clear()
+        self.roaming.stop()
+        self.thumbnails.cancel()
+        self._stage_event_sub = None
+        self._detach_stage()
+        self.progress_frame = None
+        self._progress_models = {}
         # Deregister the function that shows the window from omni.ui
         ui.Workspace.set_show_window_fn(self.WINDOW_NAME, None)
         if self._window:
@@ -97,6 +152,221 @@ class MaterialManagerExtended(omni.ext.IExt):
             self.reticle = None
         print("[karpenko.materialsmanager.ext] MaterialManagerExtended shutdown")
 
+    def _on_stage_event(self, event):
+        """
+        Called by stage_event_stream. Keeps the stage-level caches in sync with the opened stage.
+        """
+        if event.type == int(omni.usd.StageEventType.OPENED):
+            self.stage = self._usd_context.get_stage()
+            self._attach_stage(background=True)
+            self.update_roaming_state()
+        elif event.type == int(omni.usd.StageEventType.CLOSING):
+            self.roaming.stop()
+            self._detach_stage()
+            self.stage = None
+
+    def _attach_stage(self, background=False):
+        """
+        It builds the index of MME objects for the current stage and starts listening to its changes
+
+        :param background: If True, the stage is scanned over several frames, e.g. right after it's opened
+        """
+        self._detach_stage()
+        if not self.stage:
+            return
+        self.settings.load(self.stage)
+        # Changes made while the stage is being scanned are picked up by the listener
+        self._stage_listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_objects_changed, self.stage)
+        self._start_job(
+            "Looking for objects with variants",
+            self.mme_index.rebuild_steps(self.stage),
+            on_done=self._on_stage_indexed,
+            background=background,
+        )
+
+    def _on_stage_indexed(self, job):
+        load = set()
+        unload = set()
+        for object_path in self.mme_index.get_object_paths():
+            self._update_object_position(object_path)
+            looks = self.get_looks_folder(self.stage.GetPrimAtPath(object_path))
+            if looks:
+                object_load, object_unload = self.get_variant_loads(looks, self.get_active_folder_name(looks))
+                load.update(object_load)
+                unload.update(object_unload)
+        if load or unload:
+            # Only the active variants from libraries are kept loaded, whatever the stage was opened with.
+            # It's not an edit of the scene, so it isn't recorded in the undo history.
+            self.stage.LoadAndUnload(load, unload)
+        self.roaming.mark_dirty()
+        if self.active_objects_frame:
+            self.render_active_objects_frame()
+
+    def _detach_stage(self):
+        # The jobs work with the prims of this stage
+        self.jobs.cancel_all()
+        if self._stage_listener:
+            self._stage_listener.Revoke()
+            self._stage_listener = None
+        self.settings.clear()
+        self.mme_index.clear()
+        self.spatial_index.clear()
+        self.variant_materials.clear()
+        self.mesh_data_cache.clear()
+        self.transforms.clear()
+        self.thumbnails.clear()
+
+    def _on_objects_changed(self, notice, stage):
+        """Called by Tf.Notice"""
+        if stage != self.stage:
+            return
+        changed_settings = self.settings.on_objects_changed(notice)
+        if "MMEEnableRoamingMode" in changed_settings:
+            self.update_roaming_state()
+        self.variant_materials.on_objects_changed(notice)
+        self.mesh_data_cache.on_objects_changed(notice)
+        self.thumbnails.on_objects_changed(notice)
+        added, removed = self.mme_index.on_objects_changed(notice)
+        for object_path in removed:
+            self.spatial_index.remove(object_path)
+        # Objects that were moved, directly or with one of their ancestors
+        moved = set()
+        for path in notice.GetChangedInfoOnlyPaths():
+            if is_transform_property(path):
+                moved.update(self.mme_index.get_object_paths_under(path.GetPrimPath()))
+            if is_transform_property(path) or path.IsPropertyPath() and path.name in ("points", "extent", "visibility"):
+                # The bounds of the object have changed, e.g. one of its meshes moved
+                object_path = self.mme_index.get_object_path_of(path.GetPrimPath())
+                if object_path:
+                    moved.add(object_path)
+        for path in notice.GetResyncedPaths():
+            if is_transform_property(path) or path.IsPrimPath():
+                moved.update(self.mme_index.get_object_paths_under(path.GetPrimPath()))
+        moved.update(added)
+        # Only the moved objects compute their transforms again
+        self.transforms.invalidate(moved)
+        # Keep positions of moved objects up to date
+        for object_path in moved:
+            self._update_object_position(object_path)
+        if added or removed:
+            self.roaming.mark_dirty()
+        self.roaming.on_objects_changed(notice)
+
+    def _get_object_position(self, prim):
+        """
+        It returns the world-space position of the object that is used to find the closest object to the camera.
+        Transforms are served from the transform cache, an object's entry is invalidated when it or its ancestors move.
+
+        :param prim: The prim of the object
+        :return: The position or None if the prim has no position.
+        """
+        return self.transforms.get_position(prim)
+
+    def _update_object_position(self, object_path):
+        """It updates the position and the bounds of the object in the spatial index"""
+        prim = self.stage.GetPrimAtPath(object_path)
+        position = self._get_object_position(prim)
+        if position is None:
+            self.spatial_index.remove(object_path)
+        else:
+            self.spatial_index.update(object_path, position, self.transforms.get_bounds(prim))
+
+    def get_view_projection(self, window, camera_prim):
+        """
+        It returns the view-projection matrix the viewport renders with, or the one of the camera if the viewport
+        doesn't provide it
+
+        :param window: The viewport window
+        :param camera_prim: The active camera
+        :return: A 4x4 NumPy array that transforms row vectors, None if it can't be computed.
+        """
+        viewport_api = getattr(window, "viewport_api", None) if window else None
+        view = getattr(viewport_api, "view", None)
+        projection = getattr(viewport_api, "projection", None)
+        if isinstance(view, Gf.Matrix4d) and isinstance(projection, Gf.Matrix4d):
+            return np.array(view * projection)
+        if camera_prim and camera_prim.IsA(UsdGeom.Camera):
+            camera = UsdGeom.Camera(camera_prim).GetCamera(Usd.TimeCode.Default())
+            aspect_ratio = self.get_viewport_aspect_ratio(window)
+            if aspect_ratio:
+                # The viewport keeps the horizontal aperture and fits the vertical one to its own aspect ratio
+                camera.verticalAperture = camera.horizontalAperture / aspect_ratio
+            frustum = camera.frustum
+            return np.array(frustum.ComputeViewMatrix() * frustum.ComputeProjectionMatrix())
+        return None
+
+    def get_viewport_aspect_ratio(self, window):
+        """
+        It returns the aspect ratio the viewport renders with: of its render resolution, or of the window
+
+        :param window: The viewport window
+        :return: Width / height, None if it's unknown.
+        """
+        viewport_api = getattr(window, "viewport_api", None) if window else None
+        resolution = getattr(viewport_api, "resolution", None)
+        try:
+            width, height = resolution if resolution else (window.width, window.height)
+            width, height = float(width), float(height)
+        except (AttributeError, TypeError, ValueError):
+            return None
+        return width / height if width > 0 and height > 0 else None
+
+    def _start_job(self, name, steps, on_done=None, background=False):
+        """
+        It runs the steps of a long operation, see FrameBudgetScheduler
+
+        :param name: The name of the operation, shown next to its progress bar
+        :param steps: The generator of the operation
+        :param on_done: Called with the job when it's finished (optional)
+        :param background: If True, the job is run in slices of the frame budget, otherwise it's finished right away
+        :return: The job.
+        """
+        if background:
+            return self.jobs.submit(name, steps, on_done=on_done)
+        return self.jobs.run(name, steps, on_done=on_done)
+
+    def _on_jobs_progress(self):
+        """Called by the scheduler, it builds the progress bars again only if the list of jobs has changed"""
+        if not self.progress_frame:
+            return
+        jobs = self.jobs.jobs
+        if jobs != self._progress_jobs:
+            self.render_progress_frame()
+            return
+        for job in jobs:
+            model = self._progress_models.get(job)
+            if model:
+                model.set_value(job.progress)
+
+    def _create_thumbnail_service(self):
+        """
+        It creates the material thumbnail pipeline configured by the thumbnail* settings of the extension
+        """
+        settings = carb.settings.get_settings()
+        cache_dir = carb.tokens.get_tokens_interface().resolve(
+            settings.get(THUMBNAIL_CACHE_DIR_SETTING) or "${cache}/karpenko.materialsmanager.ext/thumbnails"
+        )
+        cache_size = settings.get(THUMBNAIL_CACHE_SIZE_SETTING) or 64
+        return ThumbnailService(
+            ThumbnailDiskCache(cache_dir, cache_size * 1024 * 1024),
+            size=settings.get(THUMBNAIL_SIZE_SETTING) or 64,
+        )
+
+    def get_material_preview(self, material_path):
+        """
+        It returns the thumbnail of the material for the list of active materials. If it's not rendered yet,
+        rendering is scheduled and the row is built again once the thumbnail is ready.
+
+        :param material_path: The path of the material
+        :return: The path of the thumbnail file, None if it's not available yet.
+        """
+        material_prim = self.stage.GetPrimAtPath(material_path) if self.stage else None
+        if not material_prim:
+            return None
+        return self.thumbnails.request(
+            material_prim, lambda _, path=material_path: self.materials_model.refresh_path(path)
+        )
+
     async def _dock_window(self):
         """
         It waits for the property window to appear, then docks the window to it
@@ -121,13 +391,14 @@ class MaterialManagerExtended(omni.ext.IExt):
             self._window.deferred_dock_in("Property")
         self._setup_window_task = None
 
-    async def enable_roaming_timer(self):
-        while True:
-            await asyncio.sleep(1.0)
-            self.get_closest_mme_object()
-
-    def disable_roaming_timer(self):
-        self.roaming_timer = None
+    def update_roaming_state(self):
+        """
+        It starts or stops listening to the camera, depending on the MMEEnableRoamingMode setting
+        """
+        if self.stage and self.get_setting("MMEEnableRoamingMode", False):
+            self.roaming.start()
+        else:
+            self.roaming.stop()
 
     def get_latest_version(self, looks):
         """
@@ -138,7 +409,7 @@ class MaterialManagerExtended(omni.ext.IExt):
         """
         latest_version = 1
         versions = []
-        for look in looks.GetChildren():
+        for look in looks.GetAllChildren():
             look_path = look.GetPath()
             if look_path.name.startswith("Look_"):
                 version = int(look_path.name.split("_")[-1])
@@ -151,44 +422,89 @@ class MaterialManagerExtended(omni.ext.IExt):
                 latest_version += 1
         return latest_version
 
-    def add_variant(self, looks, parent_prim):
+    def add_variant(self, looks, parent_prim, background=False):
         """
         It creates a new folder under the Looks folder, copies all materials attached to the meshes and re-binds them
         so the user can tweak copies instead of the original ones.
+        The materials of the meshes are collected step by step, the stage is changed only once everything is
+        collected. The bindings are written in chunks: right away it's one undo group, in the background the chunks
+        of every frame are an undo group of their own (see Job).
 
         :param looks: The looks folder
         :param parent_prim: The prim that contains the meshes that need to be assigned the new materials
+        :param background: If True, the work is spread over several frames and can be cancelled
+        :return: The job, its result is the name of the new variant.
+        """
+        parent_path = parent_prim.GetPath()
+        return self._start_job(
+            f"Adding a variant to {parent_prim.GetName()}",
+            self._add_variant_steps(parent_prim),
+            on_done=lambda job: self._on_variant_added(parent_path),
+            background=background,
+        )
+
+    def _add_variant_steps(self, parent_prim):
+        """
+        The steps of add_variant, see _collect_materials_steps
+
+        :param parent_prim: The prim that contains the meshes
+        :return: The function that creates the variant.
+        """
+        parent_path = parent_prim.GetPath()
+        all_materials = yield from self._collect_materials_steps(parent_prim)
+        return lambda: self._create_variant_steps(parent_path, all_materials)
+
+    def _collect_materials_steps(self, parent_prim, start=0.0, span=1.0):
+        """
+        It looks for the meshes of the object and collects their materials one prim at a time, the same way as
+        get_meshes_from_prim and get_data_from_meshes do
+
+        :param parent_prim: The prim that contains the meshes
+        :param start: The progress reported before the first mesh
+        :param span: How much the progress grows by the time the last mesh is done
+        :return: A list of dictionaries containing the material path and the mesh path.
+        """
+        all_meshes = []
+        # The same order as get_all_children_of_prim
+        pending = list(reversed(parent_prim.GetChildren()))
+        while pending:
+            prim = pending.pop()
+            if not prim.IsValid():
+                continue
+            if prim.GetTypeName() == "Mesh":
+                all_meshes.append(prim)
+            pending.extend(reversed(prim.GetChildren()))
+            yield None
+        all_materials = []
+        for index, mesh in enumerate(all_meshes):
+            if mesh.IsValid():
+                all_materials.extend(self.get_data_from_meshes([mesh]))
+            yield start + span * (index + 1) / len(all_meshes)
+        return all_materials
+
+    def _create_variant_steps(self, parent_path, all_materials):
+        """
+        It creates the folder of a new variant with copies of the materials and binds them to the meshes. It's the
+        commit of add_variant, it yields after the folder is created and after every chunk of bindings.
+
+        :param parent_path: The path of the prim that contains the meshes
+        :param all_materials: A list of dictionaries containing the material path and the mesh path
+        :return: The name of the new variant folder.
         """
-        looks = parent_prim.GetPrimAtPath("Looks")
+        parent_prim = self.stage.GetPrimAtPath(parent_path) if self.stage else None
+        looks = parent_prim.GetPrimAtPath("Looks") if parent_prim else None
+        if not looks:
+            carb.log_warn(f"Can't add a variant, {parent_path} or its Looks folder no longer exists.")
+            return None
         looks_path = looks.GetPath()
 
         self.ignore_change = True
-        # group all commands so it can be undone at once
-        with omni.kit.undo.group():
-            all_meshes = self.get_meshes_from_prim(parent_prim)
-            all_materials = self.get_data_from_meshes(all_meshes)
+        try:
             # Check if folder (prim, Scope) MME already exist
             if not looks.GetPrimAtPath("MME"):
-                # Create a folder called MME under the looks folder, it will contain all the materials for all variants
-                omni.kit.commands.execute(
-                    "CreatePrim",
-                    prim_path=f"{looks_path}/MME",
-                    prim_type="Scope",
-                    attributes={},
-                    select_new_prim=False
-                )
-
-                is_active_attr_path = Sdf.Path(f"{looks_path}/MME.MMEisActive")
-
-                omni.kit.commands.execute(
-                    'CreateUsdAttributeOnPath',
-                    attr_path=is_active_attr_path,
-                    attr_type=Sdf.ValueTypeNames.Bool,
-                    custom=True,
-                    attr_value=False,
-                    variability=Sdf.VariabilityVarying
-                )
-                self.set_mesh_data(all_materials, looks_path, None)
+                self._create_mme_folder(looks, all_materials)
+            else:
+                self.migrate_mesh_data(looks)
 
             # Generate a new name for the variant based on the quantity of previous ones
             folder_name = f"Look_{self.get_latest_version(looks.GetPrimAtPath('MME'))}"
@@ -219,14 +535,27 @@ class MaterialManagerExtended(omni.ext.IExt):
             materials_to_copy = [mat_data["path"] for mat_data in all_materials]
             # remove duplicates
             materials_to_copy = list(set(materials_to_copy))
-            # Copy material's prim as text
-            usd_code = get_prim_as_text(self.stage, materials_to_copy)
-            # put the clone material into the scene
-            text_to_stage(self.stage, usd_code, new_looks_folder_path)
+            # put the clone materials into the scene
+            self.copy_materials(materials_to_copy, new_looks_folder_path)
+        finally:
+            self.ignore_change = False
+        yield
+
+        # The bindings of a chunk are resolved right before they are written, so it doesn't take a frame of its own
+        for start in range(0, len(all_materials), self.BIND_CHUNK_SIZE):
+            chunk = all_materials[start:start + self.BIND_CHUNK_SIZE]
+            yield from self._bind_materials_steps(self.get_bindings(chunk, new_looks_folder_path))
 
-            self.bind_materials(all_materials, new_looks_folder_path)
+        self.ignore_change = True
+        try:
             self.set_mesh_data(all_materials, looks_path, folder_name)
-            self.deactivate_all_variants(looks)
+        finally:
+            self.ignore_change = False
+        yield
+
+        self.ignore_change = True
+        try:
+            self.deactivate_all_variants(looks, keep=folder_name)
             # Set current variant as active
             omni.kit.commands.execute(
                 'ChangeProperty',
@@ -234,10 +563,464 @@ class MaterialManagerExtended(omni.ext.IExt):
                 value=True,
                 prev=False,
             )
-        self.ignore_change = False
-        if not self.ignore_settings_update:
-            self.render_active_objects_frame()
+            if has_look_variants(parent_prim):
+                # The new variant has to be added to the variant set as well
+                self.sync_look_variants(parent_prim, looks)
+        finally:
+            self.ignore_change = False
+        return folder_name
+
+    def _bind_materials_steps(self, bindings):
+        """
+        It authors the bindings by one BindMaterialsBatch command per BIND_CHUNK_SIZE meshes and yields after every
+        command, so a job that commits over several frames doesn't bind all meshes in one frame
+
+        :param bindings: A list of (mesh path, material path) tuples
+        """
+        for start in range(0, len(bindings), self.BIND_CHUNK_SIZE):
+            self.ignore_change = True
+            try:
+                omni.kit.commands.execute(
+                    "BindMaterialsBatch",
+                    bindings=bindings[start:start + self.BIND_CHUNK_SIZE],
+                    strength="weakerThanDescendants",
+                    stage=self.stage,
+                )
+            finally:
+                self.ignore_change = False
+            yield
+
+    def _create_mme_folder(self, looks, all_materials):
+        """
+        It creates the MME folder of the object, it remembers the original materials of the meshes
+
+        :param looks: The looks prim
+        :param all_materials: A list of dictionaries containing the material path and the mesh path
+        """
+        # Create a folder called MME under the looks folder, it will contain all the materials for all variants
+        omni.kit.commands.execute(
+            "CreatePrim",
+            prim_path=f"{looks.GetPath()}/MME",
+            prim_type="Scope",
+            attributes={},
+            select_new_prim=False
+        )
+
+        is_active_attr_path = Sdf.Path(f"{looks.GetPath()}/MME.MMEisActive")
+
+        omni.kit.commands.execute(
+            'CreateUsdAttributeOnPath',
+            attr_path=is_active_attr_path,
+            attr_type=Sdf.ValueTypeNames.Bool,
+            custom=True,
+            attr_value=False,
+            variability=Sdf.VariabilityVarying
+        )
+        self.set_mesh_data(all_materials, looks.GetPath(), None)
+
+    def _on_variant_added(self, parent_path):
+        if self.ignore_settings_update or not self.stage:
+            return
+        parent_prim = self.stage.GetPrimAtPath(parent_path)
+        if not parent_prim:
+            return
+        self.render_active_objects_frame()
+        self.render_variants_frame(parent_prim.GetPrimAtPath("Looks"), parent_prim)
+
+    def add_variants(self, parent_prims, background=False):
+        """
+        It adds a new variant to every given object, see add_variant. The materials of all objects are collected
+        first. Then the variant folders of all objects are created with copies of their materials and the flags
+        are written by one command each, in one change block. The bindings follow in chunks, see add_variant.
+        The undo groups are the same as in add_variant and the UI is refreshed once at the end.
+
+        :param parent_prims: The objects, e.g. the selected ones (see get_selected_objects)
+        :param background: If True, the work is spread over several frames and can be cancelled
+        :return: The job, its result is a dictionary of object path -> name of the new variant. None if no object
+        has a Looks folder.
+        """
+        parent_paths = list(dict.fromkeys(
+            prim.GetPath() for prim in parent_prims if prim and prim.GetPrimAtPath("Looks")
+        ))
+        if not parent_paths:
+            carb.log_warn("None of the objects has a Looks folder, no variants were added.")
+            return None
+        return self._start_job(
+            f"Adding variants to {len(parent_paths)} objects",
+            self._add_variants_steps(parent_paths),
+            on_done=self._on_variants_added,
+            background=background,
+        )
+
+    def add_variants_to_selection(self, background=False):
+        """It adds a new variant to every object that has a selected prim, see add_variants"""
+        self._check_context()
+        if not self.stage:
+            return None
+        return self.add_variants(self.get_selected_objects(), background=background)
+
+    def add_variants_to_preset(self, key, background=False):
+        """
+        It adds a new variant to every object remembered in the preset, see add_variants
+
+        :param key: The key of the preset, see get_preset_keys
+        """
+        self.check_stage()
+        default_prim = self.stage.GetDefaultPrim() if self.stage else None
+        preset = read_preset(default_prim, key)
+        if preset is None:
+            carb.log_warn(f"Look preset {key} was not found.")
+            return None
+        return self.add_variants(
+            [self.stage.GetPrimAtPath(object_path) for object_path in preset], background=background
+        )
+
+    def get_selected_objects(self):
+        """
+        It returns the objects the selected prims belong to: the prim itself if it has a Looks folder, otherwise the
+        nearest ancestor that has one
+
+        :return: A list of object prims without duplicates.
+        """
+        objects = {}
+        for path in self._selection.get_selected_prim_paths():
+            prim = self.stage.GetPrimAtPath(path)
+            if not prim:
+                continue
+            if not prim.GetPrimAtPath("Looks"):
+                prim = self.get_parent_from_mesh(prim)
+            if prim and not prim.IsPseudoRoot() and prim.GetPrimAtPath("Looks"):
+                objects[prim.GetPath()] = prim
+        return list(objects.values())
+
+    def _add_variants_steps(self, parent_paths):
+        """
+        The steps of add_variants: it collects the materials of the objects one by one
+
+        :param parent_paths: The paths of the objects
+        :return: The function that creates the variants.
+        """
+        entries = {}
+        for index, parent_path in enumerate(parent_paths):
+            parent_prim = self.stage.GetPrimAtPath(parent_path)
+            if not parent_prim:
+                continue
+            entries[parent_path] = yield from self._collect_materials_steps(
+                parent_prim, index / len(parent_paths), 1 / len(parent_paths)
+            )
+        return lambda: self._create_variants_steps(entries)
+
+    def _create_variants_steps(self, entries):
+        """
+        It creates a new variant of every object with copies of its materials and binds them to the meshes. It's the
+        commit of add_variants, it yields after the folders are created and after every chunk of bindings.
+
+        :param entries: A dictionary of object path -> list of dictionaries containing the material path and the
+        mesh path
+        :return: A dictionary of object path -> name of the new variant folder.
+        """
+        variants = {}
+        mme_folders = {}
+        flags = {}
+        unload = set()
+        activations = {}
+        created = {}
+        for parent_path, all_materials in entries.items():
+            parent_prim = self.stage.GetPrimAtPath(parent_path)
+            looks = parent_prim.GetPrimAtPath("Looks") if parent_prim else None
+            if not looks:
+                carb.log_warn(f"Can't add a variant, {parent_path} or its Looks folder no longer exists.")
+                continue
+            mesh_data = encode_mesh_data(all_materials)
+            mme_folder = looks.GetPrimAtPath("MME")
+            if mme_folder:
+                folder_name = f"Look_{self.get_latest_version(mme_folder)}"
+                # The new variant becomes the only active one
+                flags.update(self.get_variant_flags(looks, False))
+                unload.update(self.get_variant_loads(looks, False)[1])
+                activations.update(self.get_variant_activations(looks, False))
+            else:
+                folder_name = "Look_1"
+                # The original materials are remembered as well, the same way add_variant does it
+                mme_folders[self.get_mesh_data_folder_path(looks.GetPath(), None)] = mesh_data
+            folder_path = self.get_mesh_data_folder_path(looks.GetPath(), folder_name)
+            materials_to_copy = list(dict.fromkeys(Sdf.Path(str(mat_data["path"])) for mat_data in all_materials))
+            variants[folder_path] = (materials_to_copy, mesh_data)
+            created[parent_path] = (folder_name, folder_path, all_materials)
+        if not variants:
+            return {}
+
+        self.ignore_change = True
+        try:
+            with Sdf.ChangeBlock():
+                result = omni.kit.commands.execute(
+                    "CreateMMEVariants",
+                    variants=variants,
+                    mme_folders=mme_folders,
+                    share=self.get_setting("MMEDeduplicateMaterials", False),
+                    stage=self.stage,
+                )
+                # execute returns (success, result) tuple
+                paths_maps = result[1] if result and result[0] else {}
+                bindings = []
+                for folder_name, folder_path, all_materials in created.values():
+                    paths_map = paths_maps.get(folder_path, {})
+                    for mat_data in all_materials:
+                        copy_path = paths_map.get(Sdf.Path(str(mat_data["path"])))
+                        if copy_path and mat_data["mesh"]:
+                            bindings.append((mat_data["mesh"], copy_path))
+                if flags:
+                    omni.kit.commands.execute("SetMMEActiveFlags", flags=flags, stage=self.stage)
+        finally:
+            self.ignore_change = False
+        yield
+
+        yield from self._bind_materials_steps(bindings)
+
+        self.ignore_change = True
+        try:
+            self.activate_variants(activations)
+            self.load_variants((), unload)
+            # The variant sets are built from the composed variant folders, so only after the change block
+            for parent_path in created:
+                parent_prim = self.stage.GetPrimAtPath(parent_path)
+                if has_look_variants(parent_prim):
+                    self.sync_look_variants(parent_prim, parent_prim.GetPrimAtPath("Looks"))
+        finally:
+            self.ignore_change = False
+        return {parent_path: folder_name for parent_path, (folder_name, _, _) in created.items()}
+
+    def _on_variants_added(self, job):
+        if self.ignore_settings_update or not job.result:
+            return
+        self.render_active_objects_frame()
+        current_object = self.current_object
+        if current_object and current_object.IsValid() and current_object.GetPath() in job.result:
+            self.render_variants_frame(current_object.GetPrimAtPath("Looks"), current_object)
+
+    def export_variants(self, parent_prim, file_path, link=True, overwrite=False):
+        """
+        It writes all variants of the object into a variant library file, see export_variant_library.
+        If link is True, the variant folders in the scene are replaced with payloads of the library, so only the
+        active variant is loaded, and the materials of the others take no memory.
+        An existing file is replaced only if it's already a library of the object, or if overwrite is True.
+
+        :param parent_prim: The object
+        :param file_path: The path of the library file, e.g. car_looks.usd
+        :param link: Replace the variants in the scene with payloads of the library (optional)
+        :param overwrite: Replace any existing file (optional)
+        :return: The names of the exported variant folders, None if nothing was exported.
+        """
+        self.check_stage()
+        looks = self.get_looks_folder(parent_prim)
+        mme_folder = looks.GetPrimAtPath("MME") if looks else None
+        if not mme_folder:
+            carb.log_warn(f"{parent_prim.GetPath()} has no variants to export.")
+            return None
+        if self.uses_look_variants(parent_prim):
+            carb.log_warn(
+                f"Variants of {parent_prim.GetPath()} are switched with the USD variant set, "
+                "turn it off to export them."
+            )
+            return None
+        folders = [folder for folder in mme_folder.GetAllChildren() if folder.GetTypeName() == "Scope"]
+        if not folders:
+            carb.log_warn(f"{parent_prim.GetPath()} has no variants to export.")
+            return None
+        if os.path.exists(file_path) and not overwrite and not is_linked_library(mme_folder, file_path):
+            carb.log_warn(
+                f"{file_path} already exists and it's not a variant library of {parent_prim.GetPath()}, "
+                "choose another file."
+            )
+            return None
+        folder_names = [folder.GetName() for folder in folders]
+        self.ignore_change = True
+        try:
+            with omni.kit.undo.group():
+                # Deactivated variants are activated for the export, variants that are already in a library are
+                # loaded
+                self.activate_variants({folder.GetPath(): True for folder in folders if not folder.IsActive()})
+                folders = [self.stage.GetPrimAtPath(folder.GetPath()) for folder in folders]
+                self.stage.LoadAndUnload({folder.GetPath() for folder in folders if not folder.IsLoaded()}, set())
+                folder_paths = [folder.GetPath() for folder in folders]
+                if not export_variant_library(
+                    self.stage, parent_prim.GetPath(), folder_paths, file_path, overwrite=True
+                ):
+                    carb.log_error(f"Unable to write the variant library {file_path}")
+                    folder_names = None
+                if folder_names and link:
+                    self._link_library(
+                        looks,
+                        file_path,
+                        {name: (name, self._get_folder_attributes(looks, name)) for name in folder_names},
+                    )
+                else:
+                    self.activate_variants(self.get_variant_activations(looks, self.get_active_folder_name(looks)))
+        finally:
+            self.ignore_change = False
+        if folder_names and link and self.current_object and self.current_object.GetPath() == parent_prim.GetPath():
             self.render_variants_frame(looks, parent_prim)
+        return folder_names
+
+    def import_variants(self, parent_prim, file_path, lazy=True):
+        """
+        It adds the variants of a variant library to the object. The mesh data of the library is resolved against
+        the object, so a library exported from another object with the same hierarchy can be used.
+        Variants that already come from this library are replaced, e.g. to bring them back into the scene.
+
+        :param parent_prim: The object
+        :param file_path: The path of the library file
+        :param lazy: If True, the variants are added as payloads that are loaded only while the variant is active,
+        otherwise the materials are copied into the scene (optional)
+        :return: The names of the imported variant folders, None if nothing was imported.
+        """
+        self.check_stage()
+        looks = self.get_looks_folder(parent_prim)
+        library = Sdf.Layer.FindOrOpen(file_path)
+        library_paths = get_library_variants(library)
+        if not looks or not library_paths:
+            carb.log_warn(f"Unable to import variants from {file_path} into {parent_prim.GetPath()}.")
+            return None
+        mme_folder = looks.GetPrimAtPath("MME")
+        asset_path = get_library_asset_path(self.stage, file_path)
+        taken = {folder.GetName() for folder in mme_folder.GetAllChildren()} if mme_folder else set()
+        folders = {}
+        for library_path in library_paths:
+            folder = mme_folder.GetChild(library_path.name) if mme_folder else None
+            if folder and get_library_payloads(folder).get(asset_path) == library_path:
+                # The variant comes from this library already, it's replaced
+                folder_name = library_path.name
+                attributes = self._get_folder_attributes(looks, folder_name)
+            else:
+                folder_name = library_path.name if library_path.name not in taken else self._get_free_look_name(taken)
+                attributes = {"MMEisActive": (Sdf.ValueTypeNames.Bool, False)}
+            taken.add(folder_name)
+            mesh_data = read_library_mesh_data(library, library_path, parent_prim.GetPath())
+            attributes.update(encode_mesh_data(mesh_data))
+            folders[folder_name] = (library_path.name, attributes)
+
+        self.ignore_change = True
+        try:
+            with omni.kit.undo.group():
+                if not mme_folder:
+                    self._create_mme_folder(looks, self.get_data_from_meshes(self.get_meshes_from_prim(parent_prim)))
+                self._link_library(looks, file_path, folders, inline=not lazy)
+                active_name = self.get_active_folder_name(looks)
+                self.load_variants(*self.get_variant_loads(looks, active_name))
+                if has_look_variants(parent_prim):
+                    self.sync_look_variants(parent_prim, looks)
+        finally:
+            self.ignore_change = False
+        if self.current_object and self.current_object.GetPath() == parent_prim.GetPath():
+            self.render_variants_frame(looks, parent_prim)
+        return list(folders)
+
+    def _get_folder_attributes(self, looks, folder_name):
+        """It returns the flag and the mesh data of the variant folder, to be authored on its replacement"""
+        folder_prim = looks.GetPrimAtPath(f"MME/{folder_name}")
+        is_active_attr = folder_prim.GetAttribute("MMEisActive")
+        attributes = {"MMEisActive": (Sdf.ValueTypeNames.Bool, bool(is_active_attr and is_active_attr.Get()))}
+        attributes.update(encode_mesh_data(self.get_mesh_data(looks.GetPath(), folder_name) or []))
+        return attributes
+
+    def _get_free_look_name(self, taken):
+        version = 1
+        while f"Look_{version}" in taken:
+            version += 1
+        return f"Look_{version}"
+
+    def _link_library(self, looks, file_path, folders, inline=False):
+        """
+        It replaces the variant folders with folders that take their materials from the library
+
+        :param looks: The looks prim
+        :param file_path: The path of the library file
+        :param folders: A dictionary of folder name -> (name of the variant in the library, folder attributes)
+        :param inline: Copy the materials from the library instead of adding it as a payload (optional)
+        """
+        root_path = Sdf.Path.absoluteRootPath.AppendChild(LIBRARY_ROOT)
+        omni.kit.commands.execute(
+            "LinkMMEVariantLibrary",
+            file_path=file_path,
+            asset_path=get_library_asset_path(self.stage, file_path),
+            folders={
+                self.get_mesh_data_folder_path(looks.GetPath(), folder_name): (root_path.AppendChild(name), attributes)
+                for folder_name, (name, attributes) in folders.items()
+            },
+            inline=inline,
+            stage=self.stage,
+        )
+        active_name = self.get_active_folder_name(looks)
+        # The linked folders are active again
+        self.activate_variants(self.get_variant_activations(looks, active_name))
+        if not inline:
+            self.load_variants(*self.get_variant_loads(looks, active_name))
+
+    def get_default_library_path(self, parent_prim):
+        """It suggests a library file next to the scene, named after the object"""
+        root_layer = self.stage.GetRootLayer() if self.stage else None
+        if not root_layer or root_layer.anonymous or not root_layer.realPath:
+            return ""
+        return os.path.join(os.path.dirname(root_layer.realPath), f"{parent_prim.GetName()}_looks.usd")
+
+    def update_mesh_data(self, changes, mesh_materials, looks_path, folder_name):
+        """
+        It changes materials of some meshes in the stored mesh data, only the attributes whose values have changed
+        are written. If the folder has data in an older format, the whole data is written instead.
+
+        :param changes: A dictionary of mesh path -> new material path
+        :param mesh_materials: The complete updated list of dictionaries containing the keys path and mesh
+        :param looks_path: The path to the looks prim
+        :param folder_name: The name of the folder that contains the mesh data
+        """
+        folder_path = self.get_mesh_data_folder_path(looks_path, folder_name)
+        folder_prim = self.stage.GetPrimAtPath(folder_path)
+        values = encode_mesh_data_changes(folder_prim, changes)
+        if values is None:
+            self.set_mesh_data(mesh_materials, looks_path, folder_name)
+            return
+        with omni.kit.undo.group():
+            for attr_name, (_, attr_value) in values.items():
+                attr_path = folder_path.AppendProperty(attr_name)
+                omni.kit.commands.execute(
+                    'ChangeProperty',
+                    prop_path=attr_path,
+                    value=attr_value,
+                    prev=self.stage.GetAttributeAtPath(attr_path).Get(),
+                )
+
+    def copy_materials(self, material_paths, folder_path):
+        """
+        It copies the materials into the variant folder, specs are copied directly from the layers they are
+        defined in, so there is no need to serialize them to text and parse them back.
+        If MMEDeduplicateMaterials is enabled, the folder gets references to shared copies from the material store
+        instead, identical materials are stored only once.
+
+        :param material_paths: The paths of the materials to copy
+        :param folder_path: The path to the variant folder
+        :return: A map of the original material paths to the paths of the copies.
+        """
+        if not material_paths:
+            return {}
+        result = omni.kit.commands.execute(
+            "ShareMaterials" if self.get_setting("MMEDeduplicateMaterials", False) else "CloneMaterials",
+            paths=material_paths,
+            root=folder_path,
+            stage=self.stage,
+        )
+        # execute returns (success, result) tuple
+        return result[1] if result and result[0] else {}
+
+    def prune_material_store(self):
+        """
+        It deletes the shared materials that are not referenced from any layer of the stage anymore
+        """
+        store_path = get_store_path(self.stage)
+        if store_path is None or not self.stage.GetPrimAtPath(store_path):
+            return
+        unused_entries = get_unused_store_entries(self.stage, store_path)
+        if unused_entries:
+            omni.kit.commands.execute('DeletePrims', paths=unused_entries)
 
     def get_meshes_from_prim(self, parent_prim):
         """
@@ -283,71 +1066,165 @@ class MaterialManagerExtended(omni.ext.IExt):
         Look through all the materials and bind them to the meshes.
         If variant_folder_path is empty, then just binds passed materials. If not, looks for the materials in the
         variant folder and binds them instead using all_materials as a reference.
+        All bindings are authored by a single BindMaterialsBatch command, so they are undone at once.
 
         :param all_materials: A list of dictionaries containing the material path and the mesh path
         :param variant_folder_path: The path to the variant folder
         """
+        bindings = self.get_bindings(all_materials, variant_folder_path)
+        if bindings:
+            omni.kit.commands.execute(
+                "BindMaterialsBatch",
+                bindings=bindings,
+                strength="weakerThanDescendants",
+                stage=self.stage,
+            )
+
+    def get_bindings(self, all_materials, variant_folder_path):
+        """
+        It resolves which material has to be bound to which mesh, see bind_materials
+
+        :param all_materials: A list of dictionaries containing the material path and the mesh path
+        :param variant_folder_path: The path to the variant folder
+        :return: A list of (mesh path, material path) tuples.
+        """
+        if not all_materials:
+            return []
         # Check if there is a variant folder where new materials are stored
+        variant_materials = None
         if variant_folder_path:
             variant_materials_prim = self.stage.GetPrimAtPath(variant_folder_path)
-        with omni.kit.undo.group():
-            # loop through all passed materials
-            for mat_data in all_materials:
-                if variant_folder_path and variant_materials_prim:
-                    # loop throug all materials in the variant folder
-                    for var_mat in variant_materials_prim.GetChildren():
-                        # If found material matches with the one in the all_materials list, bind it to the mesh
-                        if var_mat.GetName() == str(mat_data["path"]).split("/")[-1]:
-                            omni.kit.commands.execute(
-                                "BindMaterialCommand",
-                                prim_path=mat_data["mesh"],
-                                material_path=var_mat.GetPath(),
-                                strength=['weakerThanDescendants']
-                            )
-                            break
-                else:
-                    if mat_data["mesh"] and mat_data["path"]:
-                        # If there's no variant folder, then just bind passed material to the mesh
-                        omni.kit.commands.execute(
-                            'BindMaterialCommand',
-                            material_path=mat_data["path"],
-                            prim_path=mat_data["mesh"],
-                            strength=['weakerThanDescendants']
-                        )
+            if variant_materials_prim and not (variant_materials_prim.IsActive() and variant_materials_prim.IsLoaded()):
+                # A deactivated variant or a variant from a library that is going to be composed, its materials keep
+                # their names
+                variant_folder_path = Sdf.Path(str(variant_folder_path))
+                variant_materials = {}
+                for mat_data in all_materials:
+                    name = Sdf.Path(str(mat_data["path"])).name
+                    variant_materials[name] = variant_folder_path.AppendChild(name)
+            elif variant_materials_prim:
+                # Material name -> path of its copy in the variant folder
+                variant_materials = self.variant_materials.get(variant_materials_prim)
+        bindings = []
+        # loop through all passed materials
+        for mat_data in all_materials:
+            if variant_materials is not None:
+                # If the material from the all_materials list is found in the variant folder, bind it to the mesh
+                var_mat_path = variant_materials.get(Sdf.Path(str(mat_data["path"])).name)
+                if var_mat_path:
+                    bindings.append((mat_data["mesh"], var_mat_path))
+            else:
+                if mat_data["mesh"] and mat_data["path"]:
+                    # If there's no variant folder, then just bind passed material to the mesh
+                    bindings.append((mat_data["mesh"], mat_data["path"]))
+        return bindings
 
-    def deactivate_all_variants(self, looks):
+    def get_variant_flags(self, looks, folder_name):
         """
-        It deactivates all variants in a given looks prim
+        It returns the MMEisActive flags that have to be changed to make the variant the only active one
 
         :param looks: The looks prim
+        :param folder_name: The name of the variant folder, None for the original materials, or False to
+        deactivate everything
+        :return: A dictionary of folder path -> new value of the flag.
         """
-        looks_path = looks.GetPath()
+        flags = {}
         mme_folder = looks.GetPrimAtPath("MME")
         # Check if mme folder exists
-        if mme_folder:
-            # MMEisActive also present in MME folder, so we need to set it to False as well.
-            mme_folder_prop_path = Sdf.Path(f"{looks_path}/MME.MMEisActive")
-            mme_is_active = self.stage.GetAttributeAtPath(mme_folder_prop_path).Get()
-            if mme_is_active:
-                omni.kit.commands.execute(
-                    'ChangeProperty',
-                    prop_path=mme_folder_prop_path,
-                    value=False,
-                    prev=True,
-                )
-            # Loop through all variants in the MME folder and deactivate them
-            for look in mme_folder.GetChildren():
-                p_type = look.GetTypeName()
-                if p_type == "Scope":
-                    look_is_active_path = Sdf.Path(f"{looks_path}/MME/{look.GetName()}.MMEisActive")
-                    look_is_active = self.stage.GetAttributeAtPath(look_is_active_path).Get()
-                    if look_is_active:
-                        omni.kit.commands.execute(
-                            'ChangeProperty',
-                            prop_path=look_is_active_path,
-                            value=False,
-                            prev=True,
-                        )
+        if not mme_folder:
+            return flags
+        # MMEisActive also present in MME folder, it means the original materials are active
+        folders = [(mme_folder, folder_name is None)]
+        for look in mme_folder.GetAllChildren():
+            if look.GetTypeName() == "Scope":
+                folders.append((look, folder_name is not None and look.GetName() == folder_name))
+        for folder, value in folders:
+            is_active_attr = folder.GetAttribute("MMEisActive")
+            if bool(is_active_attr and is_active_attr.Get()) != value:
+                flags[folder.GetPath()] = value
+        return flags
+
+    def get_variant_edits(self, looks, folder_name):
+        """
+        It returns the MMEisActive flags and the material bindings that make the variant active
+
+        :param looks: The looks prim
+        :param folder_name: The name of the variant folder, None for the original materials
+        :return: A tuple of flags (folder path -> value) and bindings (list of (mesh path, material path)).
+        """
+        folder_path = self.get_mesh_data_folder_path(looks.GetPath(), folder_name)
+        flags = self.get_variant_flags(looks, folder_name)
+        # The flag of the enabled folder is always written, even if it's already active
+        flags[folder_path] = True
+        all_materials = self.get_mesh_data(looks.GetPath(), folder_name)
+        bindings = self.get_bindings(all_materials, None if folder_name is None else folder_path)
+        return flags, bindings
+
+    def get_variant_loads(self, looks, folder_name):
+        """
+        It returns the variants from libraries that have to be loaded and unloaded, so that only the enabled one is
+        composed, see get_library_loads
+
+        :param looks: The looks prim
+        :param folder_name: The name of the variant folder, None for the original materials, or False to
+        deactivate everything
+        :return: A tuple of the folder paths to load and to unload.
+        """
+        return get_library_loads(looks.GetPrimAtPath("MME"), folder_name)
+
+    def load_variants(self, load, unload):
+        """
+        It loads and unloads variants from libraries with an undoable command
+
+        :param load: The paths of the variant folders to load
+        :param unload: The paths of the variant folders to unload
+        """
+        if load or unload:
+            omni.kit.commands.execute("LoadMMEVariants", load=load, unload=unload, stage=self.stage)
+
+    def get_variant_activations(self, looks, folder_name):
+        """
+        It returns the variant folders whose active metadata has to change when the variant is enabled.
+        If MMEDeactivateVariants is enabled, every folder but the enabled one is deactivated, so the materials of the
+        other looks are not composed at all. Otherwise, and on objects that switch looks with the variant set,
+        deactivated folders are activated again.
+
+        :param looks: The looks prim
+        :param folder_name: The name of the variant folder, None for the original materials, or False to
+        deactivate everything
+        :return: A dictionary of folder path -> active.
+        """
+        deactivate = self.get_setting("MMEDeactivateVariants", False) and not self.uses_look_variants(looks.GetParent())
+        activations = {}
+        for folder in self.get_all_materials_variants(looks):
+            value = not deactivate or folder.GetName() == folder_name
+            if folder.IsActive() != value:
+                activations[folder.GetPath()] = value
+        return activations
+
+    def activate_variants(self, activations):
+        """
+        It activates and deactivates variant folders with an undoable command
+
+        :param activations: A dictionary of folder path -> active, see get_variant_activations
+        """
+        if activations:
+            omni.kit.commands.execute("SetMMEVariantsActive", active=activations, stage=self.stage)
+
+    def deactivate_all_variants(self, looks, keep=None):
+        """
+        It deactivates all variants in a given looks prim
+
+        :param looks: The looks prim
+        :param keep: The name of a variant folder that stays composed, e.g. a new one that is going to be enabled
+        (optional)
+        """
+        flags = self.get_variant_flags(looks, False)
+        if flags:
+            omni.kit.commands.execute("SetMMEActiveFlags", flags=flags, stage=self.stage)
+        load, unload = self.get_variant_loads(looks, keep or False)
+        self.activate_variants(self.get_variant_activations(looks, keep or False))
+        self.load_variants(load, unload)
 
     def get_parent_from_mesh(self, mesh_prim):
         """
@@ -410,18 +1287,26 @@ class MaterialManagerExtended(omni.ext.IExt):
         mme_folder = looks.GetPrimAtPath("MME")
         if mme_folder:
             if mme_folder.GetTypeName() == "Scope":
-                for look in mme_folder.GetChildren():
+                for look in mme_folder.GetAllChildren():
                     if look.GetTypeName() == "Scope":
                         is_active_attr = look.GetAttribute("MMEisActive")
                         if is_active_attr and is_active_attr.Get():
                             return look
         return None
 
+    def get_active_folder_name(self, looks):
+        """
+        It returns the name of the active variant folder, see get_currently_active_folder
+
+        :param looks: The looks prim
+        :return: The name of the folder, None if the original materials are active.
+        """
+        active_folder = self.get_currently_active_folder(looks)
+        return active_folder.GetName() if active_folder else None
+
     def update_material_data(self, latest_action):
         """
         It updates the material data in the looks folder when a material is changed using data from the latest action.
-        All data is converted into string and encrypted into base64 to prevent it from being seen or modified
-        by the user.
 
         :param latest_action: The latest action that was performed in the scene
         :return: The return value is a list of dictionaries.
@@ -451,93 +1336,126 @@ class MaterialManagerExtended(omni.ext.IExt):
                     return
                 folder_name = active_folder.GetName()
             mesh_data = self.get_mesh_data(looks_path, folder_name)
+            if not mesh_data:
+                return
+            # Only the entries of the rebound mesh are touched, the cost doesn't depend on the size of the variant
+            prim_path = str(prim_path)
+            new_material_path = str(new_material_path)
             mesh_data_to_update = []
-
-            previous_mats = []
-            unique_mats = []
-            mesh_mats = {}
-            if mesh_data:
-                for mat_data in mesh_data:
-                    material_prim = self.stage.GetPrimAtPath(new_material_path)
-                    mat_name = material_prim.GetName()
-                    if mat_data["mesh"] == prim_path and mat_data["path"] != new_material_path:
-                        carb.log_warn("Material changes detected. Updating material data...")
-                        if mat_data["path"] in previous_mats:
-                            unique_mats.append(mat_data["path"])
-                            mesh_mats[mat_name] = True
-                        else:
-                            mesh_mats[mat_name] = False
-                        previous_mats.append(mat_data["path"])
-                        mat_data["path"] = new_material_path
-                        mesh_data_to_update.append(mat_data)
-                    else:
-                        mesh_mats[mat_name] = False
-
-                if not is_original_active and folder_name:
-                    active_folder_path = active_folder.GetPath()
-                    # Copy material's prim as text
-                    usd_code = get_prim_as_text(
-                        self.stage,
-                        [Sdf.Path(i["path"]) for i in mesh_data if i["path"] not in unique_mats]
-                    )
-                    mats_to_delete = [i.GetPath() for i in active_folder.GetChildren() if str(i.GetPath()) not in unique_mats and not mesh_mats.get(i.GetName(), False)]
+            previous_mats = set()
+            for mat_data in mesh_data:
+                if mat_data["mesh"] == prim_path and mat_data["path"] != new_material_path:
+                    previous_mats.add(mat_data["path"])
+                    mat_data["path"] = new_material_path
+                    mesh_data_to_update.append(mat_data)
+            if not mesh_data_to_update:
+                return
+            carb.log_warn("Material changes detected. Updating material data...")
+
+            if not is_original_active and folder_name:
+                active_folder_path = active_folder.GetPath()
+                new_material_name = Sdf.Path(new_material_path).name
+                # Copies in the variant folder are matched by name, see get_bindings
+                used_names = set(mat_data["path"].rpartition("/")[2] for mat_data in mesh_data)
+                mats_to_delete = [
+                    active_folder_path.AppendChild(name)
+                    for name in set(path.rpartition("/")[2] for path in previous_mats) - used_names
+                    if active_folder.GetChild(name)
+                ]
+                # Shared materials may become unused only if references to them are deleted
+                is_store_affected = any(
+                    self.stage.GetPrimAtPath(path).HasAuthoredReferences() for path in mats_to_delete
+                )
+                self.ignore_change = True
+                try:
                     if mats_to_delete:
                         omni.kit.commands.execute(
                             'DeletePrims',
                             paths=mats_to_delete,
                         )
-                    # put the clone material into the scene
-                    text_to_stage(self.stage, usd_code, active_folder_path)
-                    self.ignore_change = True
+                    if not active_folder.GetChild(new_material_name):
+                        # put the clone of the new material into the scene
+                        self.copy_materials([Sdf.Path(new_material_path)], active_folder_path)
+                    if is_store_affected:
+                        self.prune_material_store()
                     self.bind_materials(mesh_data_to_update, active_folder_path)
+                finally:
+                    self.ignore_change = False
+            self.update_mesh_data(
+                {mat_data["mesh"]: mat_data["path"] for mat_data in mesh_data_to_update},
+                mesh_data,
+                looks_path,
+                folder_name,
+            )
+            if has_look_variants(parent_mesh):
+                # The new binding was authored locally, it's moved into the variant
+                self.ignore_change = True
+                try:
+                    self.sync_look_variants(parent_mesh, looks)
+                finally:
                     self.ignore_change = False
-                self.set_mesh_data(mesh_data, looks_path, folder_name)
-                self.render_current_materials_frame(parent_mesh)
+            self.render_current_materials_frame(parent_mesh)
 
     def on_change(self):
         """
-        Everytime the user changes the scene, this method is called.
-        Method does the following:
-        It checks if the user has changed the material, and if so, it updates the material data in the apropriate
-        variant folder or save it into the MME folder if the variant is set to \"original\".
-        It checks if the selected object has a material, and if it does, it renders a new window with the material's
-        properties of the selected object.
-        If the selected object doesn't have a material, it renders a new window with a prompt to select an object with
-        a material.
+        Everytime the user executes a command, this method is called.
+        The latest command is passed to the handler registered for it in the command router, commands that are not
+        handled by the extension are rejected right away, before anything else is done:
+        Binding a material updates the material data in the apropriate variant folder or saves it into the MME
+        folder if the variant is set to \"original\", see _on_bind_command.
+        Selecting, moving, creating or deleting prims re-renders the window for the selected object, see
+        _on_select_command.
 
         :return: None
         """
-        if not self.stage:
-            self._usd_context = omni.usd.get_context()
-            self._selection = self._usd_context.get_selection()
-            self.stage = self._usd_context.get_stage()
-        # Get history of commands
+        # Get the latest command, the history is an ordered dictionary so this doesn't depend on its length
         current_history = reversed(omni.kit.undo.get_history().values())
-        # Get the latest one
-        try:
-            latest_action = next(current_history)
-        except StopIteration:
+        latest_action = next(current_history, None)
+        if latest_action is None:
             return
 
         if latest_action.name == "ChangePrimVarCommand" and latest_action.level == 1:
-            latest_action = next(current_history)
+            latest_action = next(current_history, None)
+            if latest_action is None:
+                return
 
-        if self.ignore_next_select and latest_action.name == "SelectPrimsCommand":
-            self.ignore_next_select = False
-            omni.kit.commands.execute('Undo')
-        else:
+        if self.ignore_next_select:
             self.ignore_next_select = False
+            if latest_action.name == "SelectPrimsCommand":
+                omni.kit.commands.execute('Undo')
 
-        if latest_action.name not in self.allowed_commands:
-            return
         # To skip the changes made by the addon
         if self.ignore_change:
             return
-        show_default_layout = True
+        self.command_router.dispatch(latest_action)
+
+    def _check_context(self):
+        """
+        It gets the stage and the selection from the USD context if the stage is not known yet
+        """
+        if not self.stage:
+            self._usd_context = omni.usd.get_context()
+            self._selection = self._usd_context.get_selection()
+            self.stage = self._usd_context.get_stage()
 
-        if latest_action.name in ["BindMaterial", "BindMaterialCommand"]:
+    def _on_bind_command(self, latest_action):
+        """Called by the command router when a material is bound"""
+        self._check_context()
+        if self.stage:
             self.update_material_data(latest_action)
+
+    def _on_select_command(self, latest_action):
+        """
+        Called by the command router when the selection or the hierarchy may have changed.
+        It checks if the selected object has variants, and if it does, it renders the window with the materials and
+        variants of the selected object. Otherwise, it renders the window with a prompt to select an object.
+
+        :param latest_action: The history entry of the command
+        """
+        self._check_context()
+        if not self.stage:
             return
+        show_default_layout = True
 
         # Get the top-level prim (World)
         default_prim = self.stage.GetDefaultPrim()
@@ -629,61 +1547,79 @@ class MaterialManagerExtended(omni.ext.IExt):
         variants = []
         mme_folder = looks_prim.GetPrimAtPath("MME")
         if mme_folder:
-            for child in mme_folder.GetChildren():
+            for child in mme_folder.GetAllChildren():
                 if child.GetTypeName() == "Scope":
                     variants.append(child)
         return variants
 
+    def get_mesh_data_folder_path(self, looks_path, folder_name):
+        """
+        It returns the path to the folder that holds the mesh data: the variant folder or the MME folder for the
+        original materials
+
+        :param looks_path: The path to the looks prim
+        :param folder_name: The name of the variant folder, None for the original materials
+        :return: The path to the folder.
+        """
+        if folder_name:
+            return Sdf.Path(f"{looks_path}/MME/{folder_name}")
+        return Sdf.Path(f"{looks_path}/MME")
+
     def get_mesh_data(self, looks_path, folder_name):
         """
         It gets the mesh data from the folder you pass as a parameter.
-        It does decode it back from base64 and returns it as a dictionary.
+        Data saved by older versions of the extension (base64 encoded JSON) is decoded as well, it's migrated to the
+        current format by migrate_mesh_data. Decoded data is cached until the attributes change.
 
         :param looks_path: The path to the looks prim
         :param folder_name: The name of the folder that contains the mesh data
         :return: A list of dictionaries.
         """
-        if folder_name:
-            data_attr_path = Sdf.Path(f"{looks_path}/MME/{folder_name}.MMEMeshData")
-        else:
-            data_attr_path = Sdf.Path(f"{looks_path}/MME.MMEMeshData")
-        data_attr = self.stage.GetAttributeAtPath(data_attr_path)
-        if data_attr:
-            attr_value = data_attr.Get()
-            if attr_value:
-                result = []
-                # decode base64 string and load json
-                for item in attr_value:
-                    result.append(json.loads(base64.b64decode(item).decode("utf-8")))
-                return result
+        folder_prim = self.stage.GetPrimAtPath(self.get_mesh_data_folder_path(looks_path, folder_name))
+        entries = self.mesh_data_cache.get(folder_prim)
+        if entries:
+            return [{"path": material_path, "mesh": mesh_path} for mesh_path, material_path in entries]
 
     def set_mesh_data(self, mesh_materials, looks_path, folder_name):
         """
-        It creates a custom attribute on a USD prim, and sets the value of that attribute to a list of base64
-        encoded JSON strings
+        It stores the mesh/material pairs on the folder as parallel arrays of mesh paths and indices into the list
+        of unique material paths
 
         :param mesh_materials: A list of dictionaries containing the following keys: path, mesh
         :param looks_path: The path to the looks prim
         :param folder_name: The name of the folder that contains the mesh data
         """
-        # Convert every Path to string in mesh_materials to be able to pass it into JSON
-        all_materials = [{
-            "path": str(mat_data["path"]),
-            "mesh": str(mat_data["mesh"]),
-        } for mat_data in mesh_materials]
+        folder_path = self.get_mesh_data_folder_path(looks_path, folder_name)
+        with omni.kit.undo.group():
+            for attr_name, (attr_type, attr_value) in encode_mesh_data(mesh_materials).items():
+                omni.kit.commands.execute(
+                    'CreateUsdAttributeOnPath',
+                    attr_path=folder_path.AppendProperty(attr_name),
+                    attr_type=attr_type,
+                    custom=True,
+                    variability=Sdf.VariabilityVarying,
+                    attr_value=attr_value,
+                )
+            legacy_attr_path = folder_path.AppendProperty(LEGACY_ATTR)
+            if self.stage.GetAttributeAtPath(legacy_attr_path):
+                omni.kit.commands.execute('RemoveProperty', prop_path=legacy_attr_path)
 
-        if folder_name:
-            data_attr_path = Sdf.Path(f"{looks_path}/MME/{folder_name}.MMEMeshData")
-        else:
-            data_attr_path = Sdf.Path(f"{looks_path}/MME.MMEMeshData")
-        omni.kit.commands.execute(
-            'CreateUsdAttributeOnPath',
-            attr_path=data_attr_path,
-            attr_type=Sdf.ValueTypeNames.StringArray,
-            custom=True,
-            variability=Sdf.VariabilityVarying,
-            attr_value=[base64.b64encode(json.dumps(i).encode()) for i in all_materials],
-        )
+    def migrate_mesh_data(self, looks):
+        """
+        It rewrites the mesh data of all folders of the object that is still stored in the format of older versions
+        of the extension. It's done with undoable commands when the object is edited anyway (a variant is enabled or
+        added), reading the data never writes.
+
+        :param looks: The looks prim
+        """
+        mme_folder = looks.GetPrimAtPath("MME")
+        if not mme_folder:
+            return
+        for folder in [mme_folder] + self.get_all_materials_variants(looks):
+            if has_legacy_mesh_data(folder):
+                folder_name = None if folder == mme_folder else folder.GetName()
+                mesh_materials = self.get_mesh_data(looks.GetPath(), folder_name) or []
+                self.set_mesh_data(mesh_materials, looks.GetPath(), folder_name)
 
     def delete_variant(self, prim_path, looks, parent_prim):
         """
@@ -693,7 +1629,11 @@ class MaterialManagerExtended(omni.ext.IExt):
         :param looks: a list of all the looks in the current scene
         :param parent_prim: The prim path of the parent prim of the variant set
         """
-        omni.kit.commands.execute('DeletePrims', paths=[prim_path, ])
+        with omni.kit.undo.group():
+            omni.kit.commands.execute('DeletePrims', paths=[prim_path, ])
+            self.prune_material_store()
+            if has_look_variants(parent_prim):
+                self.sync_look_variants(parent_prim, looks)
         self.render_variants_frame(looks, parent_prim)
 
     def enable_variant(self, folder_name, looks, parent_prim, ignore_changes=True, ignore_select=False):
@@ -707,27 +1647,34 @@ class MaterialManagerExtended(omni.ext.IExt):
         """
         if ignore_changes:
             self.ignore_change = True
-        if folder_name is None:
-            new_looks_folder = looks.GetPrimAtPath("MME")
-        else:
-            new_looks_folder = looks.GetPrimAtPath(f"MME/{folder_name}")
-        new_looks_folder_path = new_looks_folder.GetPath()
-        all_materials = self.get_mesh_data(looks.GetPath(), folder_name)
-        self.deactivate_all_variants(looks)
-        is_active_attr_path = Sdf.Path(f"{new_looks_folder_path}.MMEisActive")
-        omni.kit.commands.execute(
-                'ChangeProperty',
-                prop_path=is_active_attr_path,
-                value=True,
-                prev=False,
-            )
-        self.bind_materials(all_materials, None if folder_name is None else new_looks_folder_path)
-        if ignore_select:
-            self.ignore_next_select = True
-        self.render_variants_frame(looks, parent_prim, ignore_widget=True)
-        self.render_current_materials_frame(parent_prim)
-        if ignore_changes:
-            self.ignore_change = False
+        try:
+            with omni.kit.undo.group():
+                self.migrate_mesh_data(looks)
+                if self.uses_look_variants(parent_prim):
+                    # Switching is a single variant selection edit
+                    self.select_look_variants({parent_prim.GetPath(): folder_name})
+                else:
+                    # The materials of the variant have to be composed before they are bound, a payload can only be
+                    # loaded once the folder is active
+                    load, unload = self.get_variant_loads(looks, folder_name)
+                    self.activate_variants(self.get_variant_activations(looks, folder_name))
+                    self.load_variants(load, unload)
+                    flags, bindings = self.get_variant_edits(looks, folder_name)
+                    omni.kit.commands.execute("SetMMEActiveFlags", flags=flags, stage=self.stage)
+                    if bindings:
+                        omni.kit.commands.execute(
+                            "BindMaterialsBatch",
+                            bindings=bindings,
+                            strength="weakerThanDescendants",
+                            stage=self.stage,
+                        )
+            if ignore_select:
+                self.ignore_next_select = True
+            self.render_variants_frame(looks, parent_prim, ignore_widget=True)
+            self.render_current_materials_frame(parent_prim)
+        finally:
+            if ignore_changes:
+                self.ignore_change = False
 
     def select_material(self, associated_mesh):
         """
@@ -861,31 +1808,34 @@ class MaterialManagerExtended(omni.ext.IExt):
         if not self.get_setting("MMEEnableRoamingMode", False):
             return False
         camera_prim = self.stage.GetPrimAtPath(get_active_viewport_camera_path())
-        camera_position = camera_prim.GetAttribute("xformOp:translate").Get()
+        # The camera moves all the time, its position is not cached
+        camera_position = compute_world_position(camera_prim)
+        if camera_position is None:
+            return None
         window = get_active_viewport_window()
-        mme_objects = self.get_mme_valid_objects_on_stage()
-        all_visible_prims = []
-        for prim in mme_objects:
-            ui_position, is_visible = get_ui_position_for_prim(window, prim.GetPath())
-            if is_visible:
-                all_visible_prims.append(prim)
-        
+        if self.mme_index.stage != self.stage:
+            self._attach_stage()
+        max_distance = self.get_setting("MMEMaxVisibleDistance", 500)
+        self.spatial_index.set_cell_size(max_distance)
+
         closest_prim = None
         closest_distance = 0
-        for prim in all_visible_prims:
-            prim_position = prim.GetAttribute("xformOp:translate").Get()
-            distance = math.sqrt(
-                (prim_position[0] - camera_position[0]) ** 2 + (prim_position[1] - camera_position[1]) ** 2 + (prim_position[2] - camera_position[2]) ** 2
-            )
-            if closest_distance > self.get_setting("MMEMaxVisibleDistance", 500):
-                closest_prim = None
-                continue
-            if not closest_prim:
-                closest_prim = prim
-                closest_distance = distance
-            elif distance < closest_distance:
-                closest_prim = prim
+        view_projection = self.get_view_projection(window, camera_prim)
+        if view_projection is not None:
+            # All objects are culled against the view frustum at once
+            visible_mask = self.spatial_index.get_visible_mask(get_frustum_planes(view_projection))
+            object_path, distance = self.spatial_index.nearest(camera_position, max_distance, visible_mask)
+            if object_path is not None:
+                closest_prim = self.stage.GetPrimAtPath(object_path)
                 closest_distance = distance
+        else:
+            # Candidates are sorted by distance, so the first visible one is the closest
+            for object_path, distance in self.spatial_index.query_radius(camera_position, max_distance):
+                ui_position, is_visible = get_ui_position_for_prim(window, object_path)
+                if is_visible:
+                    closest_prim = self.stage.GetPrimAtPath(object_path)
+                    closest_distance = distance
+                    break
 
         if not hasattr(self, "last_roaming_prim"):
             self.last_roaming_prim = closest_prim
@@ -918,92 +1868,72 @@ class MaterialManagerExtended(omni.ext.IExt):
             children.extend(self.get_all_children_of_prim(child))
         return children
 
+    def get_material_rows(self, prim):
+        """
+        It loops through all meshes of the prim and collects the materials that are bound to them, every material
+        is listed once
+
+        :param prim: The prim to get all children of
+        :return: A list of (material path, material name, path of the first mesh it's bound to) tuples.
+        """
+        rows = []
+        processed_materials = set()
+        for mesh in self.get_meshes_from_prim(prim):
+            for material_path in mesh.GetRelationship('material:binding').GetTargets():
+                if material_path in processed_materials:
+                    continue
+                processed_materials.add(material_path)
+                material_prim = self.stage.GetPrimAtPath(material_path)
+                if material_prim:
+                    rows.append((material_path, material_prim.GetName(), mesh.GetPath()))
+        return rows
+
     def render_current_materials_frame(self, prim):
         """
-        It loops through all meshes of the selected prim, gets all materials that are binded to the mesh, and then loops
-        through all materials and renders a button for each material
+        It renders the list of materials that are bound to the meshes of the selected prim.
+        Rows are served by the materials model to a ui.TreeView, which builds widgets only for the visible rows.
+        If the frame is already built, only the model is updated and only the changed rows are built again.
 
         :param prim: The prim to get all children of
         :return: The return value is a ui.Frame object.
         """
-        all_meshes = []
-        all_mat_paths = []
-        # Get all meshes
-        for mesh in self.get_all_children_of_prim(prim):
-            if mesh.GetTypeName() == "Mesh":
-                material_paths = mesh.GetRelationship('material:binding').GetTargets()
-                all_meshes.append({"mesh": mesh, "material_paths": material_paths})
-                for original_material_prim_path in material_paths:
-                    all_mat_paths.append(original_material_prim_path)
-        materials_quantity = len(list(dict.fromkeys(all_mat_paths)))
-        processed_materials = []
-        scrolling_frame_height = ui.Percent(80)
-        materials_column_count = 1
+        rows = self.get_material_rows(prim)
+        self.materials_model.set_rows(rows)
+        materials_quantity = len(rows)
+        scrolling_frame_height = 80
         if materials_quantity < 2:
-            scrolling_frame_height = ui.Percent(50)
+            scrolling_frame_height = 50
         elif materials_quantity < 4:
-            scrolling_frame_height = ui.Percent(70)
+            scrolling_frame_height = 70
         elif materials_quantity > 6:
-            materials_column_count = 2
-            scrolling_frame_height = ui.Percent(100)
+            scrolling_frame_height = 100
+        # The frame is built again only if its layout changes, otherwise the model updates the rows
+        layout = (scrolling_frame_height, materials_quantity == 0)
 
         if not self.materials_frame:
             self.materials_frame = ui.Frame(name="materials_frame", identifier="materials_frame")
+        elif layout == self._materials_frame_layout:
+            return self.materials_frame
+        self._materials_frame_layout = layout
 
         with self.materials_frame:
-            with ui.ScrollingFrame(height=scrolling_frame_height):
-                with ui.VGrid(column_count=materials_column_count, height=ui.Pixel(10)):
-                    material_counter = 1
-                    # loop through all meshes
-                    for mesh_data in all_meshes:
-                        def sl_mat_fn(mesh_path=mesh_data["mesh"].GetPath()):
-                            return self.select_material(mesh_path)
-                        # Get currently binded materials for the current mesh
-                        current_material_prims = mesh_data["material_paths"]
-                        # Loop through all binded materials paths
-                        for original_material_prim_path in current_material_prims:
-                            if original_material_prim_path in processed_materials:
-                                continue
-                            # Get the material prim from path
-                            original_material_prim = self.stage.GetPrimAtPath(original_material_prim_path)
-                            if not original_material_prim:
-                                continue
-                            with ui.HStack():
-                                if materials_column_count == 1:
-                                    ui.Spacer(height=10, width=10)
-                                ui.Label(
-                                    f"{material_counter}.",
-                                    name="material_counter",
-                                    width=20 if materials_column_count == 1 else 50,
-                                )
-                                ui.Image(
-                                    height=24,
-                                    width=24,
-                                    name="material_preview",
-                                    fill_policy=ui.FillPolicy.PRESERVE_ASPECT_FIT
-                                )
-                                if materials_column_count == 1:
-                                    ui.Spacer(height=10, width=10)
-                                ui.Label(
-                                    original_material_prim.GetName(),
-                                    elided_text=True,
-                                    name="material_name"
-                                )
-                                ui.Button(
-                                    "Select",
-                                    name="variant_button",
-                                    width=ui.Percent(30),
-                                    clicked_fn=sl_mat_fn,
-                                )
-                            material_counter += 1
-                            processed_materials.append(original_material_prim_path)
-                    if len(all_mat_paths) == 0:
+            with ui.ScrollingFrame(height=ui.Percent(scrolling_frame_height)):
+                if materials_quantity == 0:
+                    with ui.VStack(height=ui.Pixel(10)):
                         ui.Label(
                             "No materials were found. Please make sure that the selected model is valid.",
                             name="main_hint",
                             height=30
                         )
-                    ui.Spacer(height=10)
+                        ui.Spacer(height=10)
+                else:
+                    # The tree view is the direct child of the scrolling frame, so only the visible rows are built
+                    ui.TreeView(
+                        self.materials_model,
+                        delegate=self.materials_delegate,
+                        root_visible=False,
+                        header_visible=False,
+                    )
         return self.materials_frame
 
     def render_objectlevel_frame(self, prim):
@@ -1017,6 +1947,7 @@ class MaterialManagerExtended(omni.ext.IExt):
         if not prim:
             return
         looks = prim.GetPrimAtPath("Looks")
+        self.current_object = prim
 
         if not hasattr(self, "variants_frame") or self.variants_frame:
             self.variants_frame = None
@@ -1051,10 +1982,31 @@ class MaterialManagerExtended(omni.ext.IExt):
                 ui.Button(
                     "Add new variant",
                     height=30,
-                    clicked_fn=lambda: self.add_variant(looks, prim),
+                    clicked_fn=lambda: self.add_variant(looks, prim, background=True),
                     alignment=ui.Alignment.CENTER_BOTTOM,
                     tooltip="Create a new variant, based on the current look",
                 )
+                ui.Spacer(height=5)
+                with ui.HStack(height=20):
+                    self.library_path_field = ui.StringField(width=ui.Percent(60))
+                    self.library_path_field.model.set_value(self.get_default_library_path(prim))
+                    ui.Spacer(width=5)
+                    ui.Button(
+                        "Export",
+                        name="variant_button",
+                        clicked_fn=lambda: self.export_variants(
+                            prim, self.library_path_field.model.get_value_as_string()
+                        ),
+                        tooltip="Move all variants into a library file, only the active one stays loaded",
+                    )
+                    ui.Button(
+                        "Import",
+                        name="variant_button",
+                        clicked_fn=lambda: self.import_variants(
+                            prim, self.library_path_field.model.get_value_as_string()
+                        ),
+                        tooltip="Add the variants of a library file, they are loaded only when enabled",
+                    )
 
     def open_scene_settings(self):
         """
@@ -1117,43 +2069,58 @@ class MaterialManagerExtended(omni.ext.IExt):
 
         self._window = ui.Window(self.WINDOW_NAME, width=300, height=300)
         with self._window.frame:
-            if not prim:
-                self.render_scenelevel_frame()
-            else:
-                self.render_objectlevel_frame(prim)
+            with ui.VStack():
+                self.progress_frame = ui.Frame(height=0, name="progress_frame", identifier="progress_frame")
+                self.render_progress_frame()
+                if not prim:
+                    self.render_scenelevel_frame()
+                else:
+                    self.render_objectlevel_frame(prim)
 
-    # SCENE SETTINGS
-    def is_MME_exists(self, prim):
+    def render_progress_frame(self):
         """
-        A recursive method that checks if the prim has a MME prim in its hierarchy
+        It renders a progress bar with a Cancel button for every long operation that is running in the background.
+        The frame is empty if there are none.
 
-        :param prim: The prim to check
-        :return: A boolean value.
+        :return: The progress_frame is being returned.
         """
-        for child in prim.GetChildren():
-            if child.GetName() == "Looks":
-                if child.GetPrimAtPath("MME"):
-                    return True
-                else:
-                    return False
-            if self.is_MME_exists(child):
-                return True
-        return False
+        if not self.progress_frame:
+            return None
+        self._progress_jobs = self.jobs.jobs
+        self._progress_models = {}
+        with self.progress_frame:
+            with ui.VStack(style=_style, height=0):
+                for job in self._progress_jobs:
+                    model = ui.SimpleFloatModel(job.progress)
+                    self._progress_models[job] = model
+                    with ui.HStack(height=ui.Pixel(24)):
+                        ui.Spacer(width=10)
+                        ui.ProgressBar(model, height=20)
+                        ui.Spacer(width=5)
+                        ui.Button(
+                            "Cancel",
+                            name="variant_button",
+                            width=ui.Percent(20),
+                            tooltip=job.name,
+                            clicked_fn=lambda j=job: self.jobs.cancel(j),
+                        )
+                        ui.Spacer(width=10)
+                if self._progress_jobs:
+                    ui.Spacer(height=5)
+        return self.progress_frame
 
+    # SCENE SETTINGS
     def get_mme_valid_objects_on_stage(self):
         """
-        Returns a list of valid objects on the stage.
+        Returns a list of valid objects on the stage, i.e. all objects that have a Looks/MME folder at any depth.
+        The list is served from the index, which is updated incrementally on every stage change.
         """
         if not self.stage:
             return []
-        valid_objects = []
-        default_prim = self.stage.GetDefaultPrim()
-        # Get all objects and check if it has Looks folder
-        for obj in default_prim.GetAllChildren():
-            if obj:
-                if self.is_MME_exists(obj):
-                    valid_objects.append(obj)
-        return valid_objects
+        if self.mme_index.stage != self.stage:
+            # The stage was replaced without an OPENED event reaching us yet
+            self._attach_stage()
+        return self.mme_index.get_objects()
 
     def select_prim(self, prim_path):
         """
@@ -1183,10 +2150,13 @@ class MaterialManagerExtended(omni.ext.IExt):
 
     def set_setting(self, value, attribute_name, create_only=False):
         """
-        It checks if the attribute for showing viewport ui exists, under the DefaultPrim
-        if it doesn't, it creates it, but if it does, it changes the value instead
+        It checks if the attribute for the setting exists, under the DefaultPrim
+        if it doesn't, it creates it, but if it does, it changes the value instead.
+        If the settingsInSessionLayer option is on, the value is written into the session layer, so changing
+        settings doesn't make the scene dirty. Otherwise a value left in the session layer is removed, it would
+        override the one written into the edit target.
 
-        :param value: True or False
+        :param value: The value of the setting
         :param create_only: If True, the attribute will only be created if it doesn't exist,
         defaults to False (optional)
         :return: The return value is the value of the attribute.
@@ -1196,16 +2166,27 @@ class MaterialManagerExtended(omni.ext.IExt):
             return
         # Get DefaultPrim from Stage
         default_prim = self.stage.GetDefaultPrim()
+        if not default_prim:
+            return
+        attribute_type = get_setting_type(attribute_name, value)
+        if carb.settings.get_settings().get(SESSION_LAYER_SETTING):
+            attribute = default_prim.GetAttribute(attribute_name)
+            if attribute and (attribute.Get() == value or create_only):
+                return
+            with Usd.EditContext(self.stage, self.stage.GetSessionLayer()):
+                default_prim.CreateAttribute(attribute_name, attribute_type, custom=True).Set(value)
+            return
+        self._clear_session_setting(default_prim, attribute_name)
         # Get attribute from DefaultPrim if it exists
         attribute = default_prim.GetAttribute(attribute_name)
-        attribute_path = attribute.GetPath()
+        attribute_path = default_prim.GetPath().AppendProperty(attribute_name)
         # check if attribute exists
         if not attribute:
             # if not, create it
             omni.kit.commands.execute(
                 'CreateUsdAttributeOnPath',
                 attr_path=attribute_path,
-                attr_type=Sdf.ValueTypeNames.Bool,
+                attr_type=attribute_type,
                 custom=True,
                 attr_value=value,
                 variability=Sdf.VariabilityVarying
@@ -1217,13 +2198,49 @@ class MaterialManagerExtended(omni.ext.IExt):
                 'ChangeProperty',
                 prop_path=attribute_path,
                 value=value,
-                prev=not value,
+                prev=attribute.Get(),
             )
 
+    def _clear_session_setting(self, default_prim, attribute_name):
+        """
+        It removes the value of the setting from the session layer, where set_setting writes it while the
+        settingsInSessionLayer option is on
+
+        :param default_prim: The default prim of the stage
+        :param attribute_name: The name of the setting
+        :return: The removed value, None if there was none.
+        """
+        prim_spec = self.stage.GetSessionLayer().GetPrimAtPath(default_prim.GetPath())
+        if not prim_spec or attribute_name not in prim_spec.properties:
+            return None
+        attribute_spec = prim_spec.properties[attribute_name]
+        value = attribute_spec.default
+        prim_spec.RemoveProperty(attribute_spec)
+        return value
+
+    def set_settings_in_session_layer(self, value):
+        """
+        It switches the settingsInSessionLayer option. When it's switched off, the settings written into the session
+        layer are moved into the edit target, so they are saved with the scene, as a single undo step.
+
+        :param value: True to write the settings into the session layer
+        """
+        carb.settings.get_settings().set(SESSION_LAYER_SETTING, value)
+        self.check_stage()
+        default_prim = self.stage.GetDefaultPrim() if self.stage and not value else None
+        if not default_prim:
+            return
+        with omni.kit.undo.group():
+            for attribute_name in SETTINGS_TYPES:
+                setting_value = self._clear_session_setting(default_prim, attribute_name)
+                if setting_value is not None:
+                    self.set_setting(setting_value, attribute_name)
+
     def get_setting(self, attribute_name, default_value=True):
         """
-        It gets the value of an attribute from the default prim of the stage
-        
+        It gets the value of an attribute from the default prim of the stage.
+        Values are served from the in-memory copy of the settings, which is updated on every change of the stage.
+
         :param attribute_name: The name of the attribute you want to get
         :param default_value: The value to return if the attribute doesn't exist, defaults to True (optional)
         :return: The value of the attribute.
@@ -1231,67 +2248,369 @@ class MaterialManagerExtended(omni.ext.IExt):
         self.check_stage()
         if not self.stage:
             return
-        # Get DefaultPrim from Stage
-        default_prim = self.stage.GetDefaultPrim()
-        # Get attribute from DefaultPrim called
-        attribute = default_prim.GetAttribute(attribute_name)
-        if attribute:
-            return attribute.Get()
-        else:
-            return default_value  # Attribute was not created yet, so we return default_value
+        if self.settings.stage != self.stage:
+            # The stage was replaced without an OPENED event reaching us yet
+            self._attach_stage()
+        # Attribute could be not created yet, so we return default_value in that case
+        return self.settings.get(attribute_name, default_value)
 
     def render_active_objects_frame(self, valid_objects=None):
         """
-        It creates a UI frame with a list of buttons that select objects in the scene
+        It renders the list of objects with variants, every row has a button that selects the object in the scene.
+        Rows are served by the objects model to a ui.TreeView, which builds widgets only for the visible rows.
+        If the frame is already built, only the model is updated and only the changed rows are built again.
 
         :param valid_objects: a list of objects that have variants
         :return: The active_objects_frame is being returned.
         """
         if not valid_objects:
             valid_objects = self.get_mme_valid_objects_on_stage()
-        objects_quantity = len(valid_objects)
-        objects_column_count = 1
-        if objects_quantity > 6:
-            objects_column_count = 2
+        rows = [(prim.GetPath(), prim.GetName(), prim.GetPath()) for prim in valid_objects if prim]
+        self.active_objects_model.set_rows(rows)
+        layout = len(rows) == 0
         if not self.active_objects_frame:
             self.active_objects_frame = ui.Frame(name="active_objects_frame", identifier="active_objects_frame")
+        elif layout == self._active_objects_frame_layout:
+            return self.active_objects_frame
+        self._active_objects_frame_layout = layout
+
         with self.active_objects_frame:
-            with ui.VGrid(column_count=objects_column_count):
-                material_counter = 1
-                # loop through all meshes
-                for prim in valid_objects:
-                    if not prim:
+            with ui.ScrollingFrame(height=ui.Pixel(100)):
+                if rows:
+                    # The tree view is the direct child of the scrolling frame, so only the visible rows are built
+                    ui.TreeView(
+                        self.active_objects_model,
+                        delegate=self.active_objects_delegate,
+                        root_visible=False,
+                        header_visible=False,
+                    )
+                else:
+                    with ui.VStack():
+                        ui.Label(
+                            "No models with variants were found.",
+                            name="main_hint",
+                            height=30
+                        )
+                        ui.Spacer(height=10)
+        return self.active_objects_frame
+
+    # VARIANT SETS
+    def uses_look_variants(self, parent_prim):
+        """
+        It checks if the looks of the object are switched by the MMELook variant set instead of rebinding meshes.
+        Objects that have the variant set keep using it, others are converted on their first switch if the
+        MMEUseVariantSets setting is enabled.
+
+        :param parent_prim: The object root prim
+        :return: True if the variant set is or will be used.
+        """
+        return has_look_variants(parent_prim) or self.get_setting("MMEUseVariantSets", False)
+
+    def get_look_variants_data(self, looks):
+        """
+        It collects the folders and the bindings of the original materials and of every variant of the object
+
+        :param looks: The looks prim
+        :return: Variant name -> (folder path, list of (mesh path, material path)).
+        """
+        looks_path = looks.GetPath()
+        mme_folder_path = self.get_mesh_data_folder_path(looks_path, None)
+        looks_data = {
+            ORIGINAL_LOOK: (mme_folder_path, self.get_bindings(self.get_mesh_data(looks_path, None), None)),
+        }
+        for folder in self.get_all_materials_variants(looks):
+            folder_name = folder.GetName()
+            all_materials = self.get_mesh_data(looks_path, folder_name)
+            looks_data[get_look_variant_name(folder_name)] = (
+                folder.GetPath(),
+                self.get_bindings(all_materials, folder.GetPath()),
+            )
+        return looks_data
+
+    def sync_look_variants(self, parent_prim, looks):
+        """
+        It (re)builds the MMELook variant set of the object from the mesh data of all its variants and selects the
+        currently active one. The bindings and the flags authored directly on the prims are moved into the variants.
+
+        :param parent_prim: The object root prim
+        :param looks: The looks prim
+        """
+        if not looks.GetPrimAtPath("MME"):
+            return
+        omni.kit.commands.execute(
+            "SetMMELookVariants",
+            prim_path=parent_prim.GetPath(),
+            looks=self.get_look_variants_data(looks),
+            selection=get_look_variant_name(self.get_active_folder_name(looks)),
+            stage=self.stage,
+        )
+
+    def select_look_variants(self, folder_names):
+        """
+        It selects the variants of the MMELook variant sets, objects without the variant set or without the
+        requested variant are synchronized first
+
+        :param folder_names: A dictionary of object path -> name of the variant folder, None for the original materials
+        """
+        selections = {}
+        for object_path, folder_name in folder_names.items():
+            parent_prim = self.stage.GetPrimAtPath(object_path)
+            variant_name = get_look_variant_name(folder_name)
+            if variant_name not in get_look_variant_names(parent_prim):
+                self.sync_look_variants(parent_prim, self.get_looks_folder(parent_prim))
+            selections[object_path] = variant_name
+        omni.kit.commands.execute("SetMMELookSelection", selections=selections, stage=self.stage)
+
+    def set_use_look_variants(self, value):
+        """
+        It enables or disables the variant set backend. All objects are converted to variant sets, or their variant
+        sets are removed and the active look is bound directly again, as a single undo step.
+
+        :param value: True to switch looks with variant sets
+        """
+        self.set_setting(value, "MMEUseVariantSets")
+        flags = {}
+        bindings = []
+        activations = {}
+        self.ignore_change = True
+        try:
+            with omni.kit.undo.group():
+                for prim in self.get_mme_valid_objects_on_stage():
+                    looks = self.get_looks_folder(prim)
+                    if not looks or not looks.GetPrimAtPath("MME"):
                         continue
+                    if value:
+                        # The variant set is built from the composed folders, deactivated ones are activated first
+                        self.activate_variants(self.get_variant_activations(looks, None))
+                        self.sync_look_variants(prim, looks)
+                    elif has_look_variants(prim):
+                        folder_name = self.get_active_folder_name(looks)
+                        omni.kit.commands.execute(
+                            "SetMMELookVariants", prim_path=prim.GetPath(), looks=None, stage=self.stage
+                        )
+                        object_flags, object_bindings = self.get_variant_edits(looks, folder_name)
+                        # The variant set held the flags of all folders, so every flag is written again
+                        for folder in [looks.GetPrimAtPath("MME")] + self.get_all_materials_variants(looks):
+                            object_flags.setdefault(folder.GetPath(), False)
+                        flags.update(object_flags)
+                        bindings.extend(object_bindings)
+                        activations.update(self.get_variant_activations(looks, folder_name))
+                if flags:
+                    omni.kit.commands.execute("SetMMEActiveFlags", flags=flags, stage=self.stage)
+                self.activate_variants(activations)
+                if bindings:
+                    omni.kit.commands.execute(
+                        "BindMaterialsBatch",
+                        bindings=bindings,
+                        strength="weakerThanDescendants",
+                        stage=self.stage,
+                    )
+        finally:
+            self.ignore_change = False
+
+    def set_deactivate_variants(self, value):
+        """
+        It enables or disables deactivating the variant folders that are not enabled. The folders of all objects are
+        deactivated, or activated again, with a single command.
+
+        :param value: True to keep only the enabled variant folder of every object active
+        """
+        self.set_setting(value, "MMEDeactivateVariants")
+        activations = {}
+        for prim in self.get_mme_valid_objects_on_stage():
+            looks = self.get_looks_folder(prim)
+            if looks and looks.GetPrimAtPath("MME"):
+                activations.update(self.get_variant_activations(looks, self.get_active_folder_name(looks)))
+        self.ignore_change = True
+        try:
+            self.activate_variants(activations)
+        finally:
+            self.ignore_change = False
+
+    # PRESETS
+    def save_preset(self, name):
+        """
+        It remembers the active variant of every MME object on the stage under the given name
+
+        :param name: The name of the preset
+        """
+        self.check_stage()
+        default_prim = self.stage.GetDefaultPrim() if self.stage else None
+        if not default_prim or not name:
+            return
+        active_variants = {}
+        for prim in self.get_mme_valid_objects_on_stage():
+            looks = self.get_looks_folder(prim)
+            if looks:
+                active_variants[prim.GetPath()] = self.get_active_folder_name(looks)
+        objects, variants = encode_preset(active_variants)
+        # Saving under the name of an existing preset updates it, a name that only maps to the same key doesn't
+        objects_attr_name, variants_attr_name, name_attr_name = get_preset_attr_names(
+            get_preset_key(default_prim, name, create=True)
+        )
+        with omni.kit.undo.group():
+            for attr_name, attr_type, attr_value in (
+                (objects_attr_name, Sdf.ValueTypeNames.StringArray, objects),
+                (variants_attr_name, Sdf.ValueTypeNames.StringArray, variants),
+                (name_attr_name, Sdf.ValueTypeNames.String, name),
+            ):
+                omni.kit.commands.execute(
+                    'CreateUsdAttributeOnPath',
+                    attr_path=default_prim.GetPath().AppendProperty(attr_name),
+                    attr_type=attr_type,
+                    custom=True,
+                    variability=Sdf.VariabilityVarying,
+                    attr_value=attr_value,
+                )
+        self.render_presets_frame()
+
+    def delete_preset(self, key):
+        """
+        It removes the preset from the stage
+
+        :param key: The key of the preset, see get_preset_keys
+        """
+        self.check_stage()
+        default_prim = self.stage.GetDefaultPrim() if self.stage else None
+        if key not in get_preset_keys(default_prim):
+            return
+        with omni.kit.undo.group():
+            for attr_name in get_preset_attr_names(key):
+                if default_prim.GetAttribute(attr_name):
+                    omni.kit.commands.execute(
+                        'RemoveProperty',
+                        prop_path=default_prim.GetPath().AppendProperty(attr_name),
+                    )
+        self.render_presets_frame()
+
+    def apply_preset(self, key, background=False):
+        """
+        It enables the variants remembered in the preset on all objects at once. The edits are collected object by
+        object, then the flags of all objects are authored by one batched command and the bindings in chunks (see
+        add_variant, also for the undo groups), and the UI is refreshed once at the end.
+
+        :param key: The key of the preset, see get_preset_keys
+        :param background: If True, the edits are collected over several frames and the job can be cancelled
+        :return: The job, or None if the preset doesn't exist.
+        """
+        self.check_stage()
+        default_prim = self.stage.GetDefaultPrim() if self.stage else None
+        preset = read_preset(default_prim, key)
+        if preset is None:
+            carb.log_warn(f"Look preset {key} was not found.")
+            return None
+        name = get_preset_display_name(default_prim, key)
+        return self._start_job(
+            f"Applying the preset {name}",
+            self._apply_preset_steps(name, preset),
+            on_done=self._on_preset_applied,
+            background=background,
+        )
+
+    def _apply_preset_steps(self, name, preset):
+        """
+        The steps of apply_preset: it collects the flags and bindings of one object per step
+
+        :param name: The name of the preset
+        :param preset: A dictionary of object path -> folder name, see read_preset
+        :return: The function that authors the edits.
+        """
+        flags = {}
+        bindings = []
+        selections = {}
+        load = set()
+        unload = set()
+        activations = {}
+        for index, (object_path, folder_name) in enumerate(preset.items()):
+            looks = self.get_looks_folder(self.stage.GetPrimAtPath(object_path))
+            folder = None
+            if looks:
+                folder = looks.GetPrimAtPath("MME" if folder_name is None else f"MME/{folder_name}")
+            if not folder:
+                carb.log_warn(f"Skipping {object_path} from the preset {name}, the object or its variant is missing.")
+            elif self.uses_look_variants(looks.GetParent()):
+                selections[object_path] = folder_name
+            else:
+                object_flags, object_bindings = self.get_variant_edits(looks, folder_name)
+                flags.update(object_flags)
+                bindings.extend(object_bindings)
+                object_load, object_unload = self.get_variant_loads(looks, folder_name)
+                load.update(object_load)
+                unload.update(object_unload)
+                activations.update(self.get_variant_activations(looks, folder_name))
+            yield (index + 1) / len(preset)
+        return lambda: self._author_variant_edits_steps(flags, bindings, selections, load, unload, activations)
+
+    def _author_variant_edits_steps(self, flags, bindings, selections, load=(), unload=(), activations=None):
+        """
+        It authors MMEisActive flags, material bindings and variant selections of many objects. It's the commit of
+        apply_preset, it yields after every chunk of bindings.
+
+        :param flags: A dictionary of folder path -> value of MMEisActive
+        :param bindings: A list of (mesh path, material path) tuples
+        :param selections: A dictionary of object path -> folder name, for objects that use the variant set
+        :param load: The paths of the variant folders from libraries to load (optional)
+        :param unload: The paths of the variant folders from libraries to unload (optional)
+        :param activations: A dictionary of variant folder path -> active, see get_variant_activations (optional)
+        """
+        self.ignore_change = True
+        try:
+            self.activate_variants(activations)
+            self.load_variants(load, unload)
+            if selections:
+                self.select_look_variants(selections)
+            if flags:
+                omni.kit.commands.execute("SetMMEActiveFlags", flags=flags, stage=self.stage)
+        finally:
+            self.ignore_change = False
+        yield from self._bind_materials_steps(bindings)
+
+    def _on_preset_applied(self, job):
+        if self.current_ui == "object" and self.current_object and self.current_object.IsValid():
+            self.render_objectlevel_frame(self.current_object)
+
+    def render_presets_frame(self):
+        """
+        It creates a UI frame with a list of all presets stored on the stage
+
+        :return: The presets_frame is being returned.
+        """
+        self.check_stage()
+        default_prim = self.stage.GetDefaultPrim() if self.stage else None
+        preset_keys = get_preset_keys(default_prim)
+        if not self.presets_frame:
+            self.presets_frame = ui.Frame(name="presets_frame", identifier="presets_frame")
+        with self.presets_frame:
+            with ui.VStack(height=ui.Pixel(10)):
+                for preset_key in preset_keys:
                     with ui.HStack():
-                        if objects_column_count == 1:
-                            ui.Spacer(height=10, width=10)
+                        ui.Spacer(height=10, width=10)
                         ui.Label(
-                            f"{material_counter}.",
-                            name="material_counter",
-                            width=20 if objects_column_count == 1 else 50,
+                            get_preset_display_name(default_prim, preset_key), elided_text=True, name="material_name"
                         )
-                        if objects_column_count == 1:
-                            ui.Spacer(height=10, width=10)
-                        ui.Label(
-                            prim.GetName(),
-                            elided_text=True,
-                            name="material_name"
+                        ui.Button(
+                            "Apply",
+                            name="variant_button",
+                            width=ui.Percent(20),
+                            clicked_fn=lambda p_key=preset_key: self.apply_preset(p_key, background=True),
                         )
                         ui.Button(
-                            "Select",
+                            "Add variant",
                             name="variant_button",
-                            width=ui.Percent(30),
-                            clicked_fn=lambda mesh_path=prim.GetPath(): self.select_prim(mesh_path),
+                            width=ui.Percent(20),
+                            tooltip="Create a new variant of every model of the preset",
+                            clicked_fn=lambda p_key=preset_key: self.add_variants_to_preset(p_key, background=True),
                         )
-                        material_counter += 1
-                if objects_quantity == 0:
-                    ui.Label(
-                        "No models with variants were found.",
-                        name="main_hint",
-                        height=30
-                    )
+                        ui.Button(
+                            "Delete",
+                            name="variant_button",
+                            width=ui.Percent(20),
+                            clicked_fn=lambda p_key=preset_key: self.delete_preset(p_key),
+                        )
+                if not preset_keys:
+                    ui.Label("No presets were saved yet.", name="main_hint", height=30)
                 ui.Spacer(height=10)
-        return self.active_objects_frame
+        return self.presets_frame
 
     def render_scene_settings_layout(self, dock_in=False):
         """
@@ -1307,6 +2626,8 @@ class MaterialManagerExtended(omni.ext.IExt):
             self._window_scenemanager.deferred_dock_in(self.WINDOW_NAME)
         if self.active_objects_frame:
             self.active_objects_frame = None
+        if self.presets_frame:
+            self.presets_frame = None
         with self._window_scenemanager.frame:
             with ui.VStack(style=_style):
                 with ui.HStack(height=ui.Pixel(10), name="label_container"):
@@ -1319,8 +2640,35 @@ class MaterialManagerExtended(omni.ext.IExt):
                     ui.Spacer(width=10)
                     ui.Label("Models with variants in your scene", name="secondary_label")
                     ui.Spacer(height=40)
-                with ui.ScrollingFrame(height=ui.Pixel(100)):
-                    self.render_active_objects_frame(valid_objects)
+                self.render_active_objects_frame(valid_objects)
+                ui.Spacer(height=5)
+                with ui.HStack(height=20):
+                    ui.Spacer(width=10)
+                    ui.Button(
+                        "Add variant to selected models",
+                        name="variant_button",
+                        clicked_fn=lambda: self.add_variants_to_selection(background=True),
+                        tooltip="Create a new variant of every selected model, based on its current look",
+                    )
+                    ui.Spacer(width=10)
+                ui.Spacer(height=10)
+                with ui.HStack(height=ui.Pixel(30)):
+                    ui.Spacer(width=10)
+                    ui.Label("Look presets", name="secondary_label")
+                with ui.HStack(height=20):
+                    ui.Spacer(width=10)
+                    self.preset_name_field = ui.StringField(width=ui.Percent(60))
+                    ui.Spacer(width=10)
+                    ui.Button(
+                        "Save current looks",
+                        name="variant_button",
+                        clicked_fn=lambda: self.save_preset(self.preset_name_field.model.get_value_as_string()),
+                        tooltip="Remember the active variant of every model in the scene",
+                    )
+                    ui.Spacer(width=10)
+                ui.Spacer(height=5)
+                with ui.ScrollingFrame(height=ui.Pixel(80)):
+                    self.render_presets_frame()
                 ui.Spacer(height=10)
                 with ui.HStack(height=ui.Pixel(30)):
                     ui.Spacer(width=10)
@@ -1355,4 +2703,56 @@ class MaterialManagerExtended(omni.ext.IExt):
                             )
                         ui.Spacer(height=10)
                         ui.Separator(height=6)
+                        with ui.HStack(height=20):
+                            # New variants reference shared copies of identical materials instead of copying them
+                            ui.Spacer(width=ui.Percent(5))
+                            ui.Label("Share identical materials between variants:", width=ui.Percent(70))
+                            ui.Spacer(width=ui.Percent(10))
+                            self.deduplicate_materials = ui.CheckBox(width=ui.Percent(15))
+                            self.deduplicate_materials.model.set_value(
+                                self.get_setting("MMEDeduplicateMaterials", False)
+                            )
+                            self.deduplicate_materials.model.add_value_changed_fn(
+                                lambda value: self.set_setting(value.get_value_as_bool(), "MMEDeduplicateMaterials")
+                            )
+                        ui.Spacer(height=10)
+                        ui.Separator(height=6)
+                        with ui.HStack(height=20):
+                            # Looks are stored as variants of the MMELook variant set on every model
+                            ui.Spacer(width=ui.Percent(5))
+                            ui.Label("Switch looks with USD variant sets:", width=ui.Percent(70))
+                            ui.Spacer(width=ui.Percent(10))
+                            self.use_variant_sets = ui.CheckBox(width=ui.Percent(15))
+                            self.use_variant_sets.model.set_value(self.get_setting("MMEUseVariantSets", False))
+                            self.use_variant_sets.model.add_value_changed_fn(
+                                lambda value: self.set_use_look_variants(value.get_value_as_bool())
+                            )
+                        ui.Spacer(height=10)
+                        ui.Separator(height=6)
+                        with ui.HStack(height=20):
+                            # Folders of the looks that are not enabled are deactivated, so they aren't composed
+                            ui.Spacer(width=ui.Percent(5))
+                            ui.Label("Deactivate variants that are not enabled:", width=ui.Percent(70))
+                            ui.Spacer(width=ui.Percent(10))
+                            self.deactivate_variants = ui.CheckBox(width=ui.Percent(15))
+                            self.deactivate_variants.model.set_value(self.get_setting("MMEDeactivateVariants", False))
+                            self.deactivate_variants.model.add_value_changed_fn(
+                                lambda value: self.set_deactivate_variants(value.get_value_as_bool())
+                            )
+                        ui.Spacer(height=10)
+                        ui.Separator(height=6)
+                        with ui.HStack(height=20):
+                            # Settings are written into the session layer, so they don't make the scene dirty
+                            ui.Spacer(width=ui.Percent(5))
+                            ui.Label("Keep settings out of the scene file:", width=ui.Percent(70))
+                            ui.Spacer(width=ui.Percent(10))
+                            self.settings_in_session_layer = ui.CheckBox(width=ui.Percent(15))
+                            self.settings_in_session_layer.model.set_value(
+                                bool(carb.settings.get_settings().get(SESSION_LAYER_SETTING))
+                            )
+                            self.settings_in_session_layer.model.add_value_changed_fn(
+                                lambda value: self.set_settings_in_session_layer(value.get_value_as_bool())
+                            )
+                        ui.Spacer(height=10)
+                        ui.Separator(height=6)
                     
@@ -0,0 +1,141 @@
+__all__ = ["PrimListItem", "PrimListModel", "PrimListDelegate"]
+
+from typing import Dict, List
+
+import omni.ui as ui
+from pxr import Sdf
+
+
+class PrimListItem(ui.AbstractItem):
+    """
+    A row of the list: a material or an object
+
+    :param path: The path of the prim that is shown in the row
+    :param name: The text of the row
+    :param target_path: The path passed to the callback of the Select button
+    """
+
+    def __init__(self, path, name, target_path):
+        super().__init__()
+        self.path = path
+        self.name = name
+        self.target_path = target_path
+        self.index = 0
+
+    def get_row(self):
+        return self.path, self.name, self.target_path
+
+
+class PrimListModel(ui.AbstractItemModel):
+    """
+    A flat list of prims shown by ui.TreeView, which builds widgets only for the rows that are visible.
+    The rows are replaced with set_rows, which compares them with the current ones position by position, so only
+    the rows that have changed are built again, e.g. when one mesh is rebound.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._items: List[PrimListItem] = []
+        self._items_by_path: Dict[Sdf.Path, PrimListItem] = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def set_rows(self, rows):
+        """
+        It replaces the rows of the list
+
+        :param rows: A list of (path, name, target path) tuples
+        :return: True if anything has changed.
+        """
+        if len(rows) != len(self._items):
+            self._items = [PrimListItem(*row) for row in rows]
+            for index, item in enumerate(self._items):
+                item.index = index
+            self._items_by_path = {item.path: item for item in self._items}
+            self._item_changed(None)
+            return True
+        changed_items = []
+        for item, row in zip(self._items, rows):
+            if item.get_row() != tuple(row):
+                item.path, item.name, item.target_path = row
+                changed_items.append(item)
+        if changed_items:
+            self._items_by_path = {item.path: item for item in self._items}
+        if len(changed_items) > len(self._items) // 2:
+            # It's cheaper to rebuild the visible rows at once
+            self._item_changed(None)
+        else:
+            for item in changed_items:
+                self._item_changed(item)
+        return bool(changed_items)
+
+    def refresh_path(self, path):
+        """It builds the row of the prim again, e.g. when its thumbnail is ready"""
+        item = self._items_by_path.get(path)
+        if item is not None:
+            self._item_changed(item)
+
+    def get_item_children(self, item):
+        if item is not None:
+            return []
+        return self._items
+
+    def get_item_value_model_count(self, item):
+        return 1
+
+    def get_item_value_model(self, item, column_id):
+        return None
+
+
+class PrimListDelegate(ui.AbstractItemDelegate):
+    """
+    It builds the widgets of a row: the counter, the preview (optional), the name and the Select button
+
+    :param clicked_fn: Called with the target path of the row when the Select button is clicked
+    :param preview_fn: Called with the path of the row, returns the path of its preview image or None if it's not
+        available yet. If it's not set, rows have no preview (optional)
+    """
+
+    def __init__(self, clicked_fn, preview_fn=None):
+        super().__init__()
+        self._clicked_fn = clicked_fn
+        self._preview_fn = preview_fn
+
+    def build_branch(self, model, item, column_id, level, expanded):
+        # The list is flat, there is nothing to expand
+        pass
+
+    def build_header(self, column_id):
+        pass
+
+    def build_widget(self, model, item, column_id, level, expanded):
+        with ui.HStack(height=24):
+            ui.Spacer(height=10, width=10)
+            ui.Label(f"{item.index + 1}.", name="material_counter", width=20)
+            if self._preview_fn:
+                preview_url = self._preview_fn(item.path)
+                if preview_url:
+                    ui.Image(
+                        preview_url,
+                        height=24,
+                        width=24,
+                        name="material_thumbnail",
+                        fill_policy=ui.FillPolicy.PRESERVE_ASPECT_FIT
+                    )
+                else:
+                    # The placeholder icon comes from the style
+                    ui.Image(
+                        height=24,
+                        width=24,
+                        name="material_preview",
+                        fill_policy=ui.FillPolicy.PRESERVE_ASPECT_FIT
+                    )
+            ui.Spacer(height=10, width=10)
+            ui.Label(item.name, elided_text=True, name="material_name")
+            ui.Button(
+                "Select",
+                name="variant_button",
+                width=ui.Percent(30),
+                clicked_fn=lambda target_path=item.target_path: self._clicked_fn(target_path),
+            )
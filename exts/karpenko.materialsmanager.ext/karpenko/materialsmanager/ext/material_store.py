@@ -0,0 +1,188 @@
+__all__ = [
+    "STORE_NAME",
+    "get_store_path",
+    "get_material_fingerprint",
+    "share_materials",
+    "get_unused_store_entries",
+]
+
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+from pxr import Sdf, Usd
+
+from .prim_serializer import clone_prims, get_unique_name
+
+# Shared copies of materials live under the default prim, in <default prim>/MMEMaterialStore/M_<fingerprint>
+STORE_NAME = "MMEMaterialStore"
+_ENTRY_PREFIX = "M_"
+# Length of the fingerprint used in the entry name, 64 bits are more than enough for a stage
+_ENTRY_HASH_LENGTH = 16
+
+
+def get_store_path(stage: Usd.Stage) -> Optional[Sdf.Path]:
+    """
+    It returns the path of the material store of the stage
+
+    :param stage: The stage
+    :return: The path or None if the stage has no default prim.
+    """
+    default_prim = stage.GetDefaultPrim()
+    if not default_prim:
+        return None
+    return default_prim.GetPath().AppendChild(STORE_NAME)
+
+
+def _get_relative_paths(paths, root: Sdf.Path) -> Optional[List[str]]:
+    """It returns the paths relative to the root, or None if any of them points outside of it"""
+    relative_paths = []
+    for path in paths:
+        if not path.HasPrefix(root):
+            return None
+        relative_paths.append(str(path.MakeRelativePath(root)))
+    return relative_paths
+
+
+def get_material_fingerprint(prim: Usd.Prim, strict: bool = True) -> Optional[str]:
+    """
+    It hashes the composed material network: types, attribute values, time samples, connections and relationships
+    of the material and all its descendants. Names of the material and of the parent prims don't matter, so
+    identical materials of different objects and variants have the same fingerprint.
+
+    :param prim: The material prim
+    :param strict: If False, connections and targets outside of the material are hashed as absolute paths instead
+        of giving up (optional)
+    :return: A hex digest, or None if the network has connections or targets outside of the material, a shared
+        copy can't be referenced then.
+    """
+    root = prim.GetPath()
+    digest = hashlib.sha1()
+    for source_prim in Usd.PrimRange(prim):
+        digest.update(f"P{source_prim.GetPath().MakeRelativePath(root)}:{source_prim.GetTypeName()}\n".encode())
+        for prop in sorted(source_prim.GetAuthoredProperties(), key=lambda p: p.GetName()):
+            if isinstance(prop, Usd.Attribute):
+                connections = _get_relative_paths(prop.GetConnections(), root)
+                if connections is None:
+                    if strict:
+                        return None
+                    connections = [str(path) for path in prop.GetConnections()]
+                samples = [(time, prop.Get(time)) for time in prop.GetTimeSamples()]
+                value = prop.Get(Usd.TimeCode.Default()) if prop.HasAuthoredValue() else None
+                digest.update(f"A{prop.GetName()}:{prop.GetTypeName()}={value!r}{samples!r}{connections}\n".encode())
+            else:
+                targets = _get_relative_paths(prop.GetTargets(), root)
+                if targets is None:
+                    if strict:
+                        return None
+                    targets = [str(path) for path in prop.GetTargets()]
+                digest.update(f"R{prop.GetName()}{targets}\n".encode())
+    return digest.hexdigest()
+
+
+def _get_entry_material(layer: Sdf.Layer, entry_path: Sdf.Path) -> Optional[Sdf.Path]:
+    entry_spec = layer.GetPrimAtPath(entry_path)
+    if not entry_spec or not entry_spec.nameChildren:
+        return None
+    return next(iter(entry_spec.nameChildren)).path
+
+
+def share_materials(
+    stage: Usd.Stage, prim_paths: List[Sdf.Path], root: Sdf.Path, layer: Optional[Sdf.Layer] = None
+) -> Dict[Sdf.Path, Sdf.Path]:
+    """
+    It works like clone_prims, but instead of copying every material it places a prim under the root that
+    references a shared copy of the material from the store. The copy is added to the store only if there isn't
+    one with the same fingerprint yet. Edits of the referencing prim are stored as overrides on top of the shared
+    copy, so a material is physically duplicated only by what diverges.
+    Materials that can't be shared (see get_material_fingerprint) are cloned as usual.
+
+    :param stage: The stage to take the materials from
+    :param prim_paths: The paths of the materials
+    :param root: The path of the prim the materials will be placed under
+    :param layer: The layer to write to, defaults to the current edit target of the stage (optional)
+    :return: A map of source paths to the paths of the new prims.
+    """
+    if layer is None:
+        layer = stage.GetEditTarget().GetLayer()
+    root = Sdf.Path(str(root))
+    store_path = get_store_path(stage)
+    if store_path is None:
+        return clone_prims(stage, prim_paths, root, layer)
+
+    shared = {}
+    to_clone = []
+    for prim_path in prim_paths:
+        prim_path = Sdf.Path(str(prim_path))
+        prim = stage.GetPrimAtPath(prim_path)
+        if not prim or prim_path in shared:
+            continue
+        fingerprint = get_material_fingerprint(prim)
+        if fingerprint is None:
+            to_clone.append(prim_path)
+        else:
+            shared[prim_path] = fingerprint
+
+    with Sdf.ChangeBlock():
+        # The clones are placed first, the names they take aren't used by the shared materials, see get_unique_name
+        paths_map = clone_prims(stage, to_clone, root, layer) if to_clone else {}
+        taken_names = set(path.name for path in paths_map.values())
+        for prim_path, fingerprint in shared.items():
+            entry_path = store_path.AppendChild(f"{_ENTRY_PREFIX}{fingerprint[:_ENTRY_HASH_LENGTH]}")
+            material_path = _get_entry_material(layer, entry_path)
+            if material_path is None:
+                for scope_path in (store_path, entry_path):
+                    scope_spec = Sdf.CreatePrimInLayer(layer, scope_path)
+                    scope_spec.specifier = Sdf.SpecifierDef
+                    scope_spec.typeName = "Scope"
+                material_path = clone_prims(stage, [prim_path], entry_path, layer)[prim_path]
+
+            target_name = get_unique_name(prim_path.name, taken_names)
+            taken_names.add(target_name)
+            target_path = root.AppendChild(target_name)
+            target_spec = Sdf.CreatePrimInLayer(layer, target_path)
+            target_spec.specifier = Sdf.SpecifierDef
+            target_spec.referenceList.ClearEditsAndMakeExplicit()
+            target_spec.referenceList.explicitItems = [Sdf.Reference(primPath=material_path)]
+            paths_map[prim_path] = target_path
+    return paths_map
+
+
+def _get_store_references(layer: Sdf.Layer, store_path: Sdf.Path) -> Iterable[Sdf.Path]:
+    """It yields the paths in the store that prims of the layer reference, also inside variants"""
+    prim_paths = []
+
+    def collect(path):
+        if path.IsPrimPath() or path.IsPrimVariantSelectionPath():
+            prim_paths.append(path)
+
+    layer.Traverse(Sdf.Path.absoluteRootPath, collect)
+    for path in prim_paths:
+        prim_spec = layer.GetPrimAtPath(path)
+        if not prim_spec or not prim_spec.hasReferences:
+            continue
+        for reference in prim_spec.referenceList.GetAddedOrExplicitItems():
+            if not reference.assetPath and reference.primPath.HasPrefix(store_path):
+                yield reference.primPath
+
+
+def get_unused_store_entries(stage: Usd.Stage, store_path: Sdf.Path) -> List[Sdf.Path]:
+    """
+    It finds entries of the store that nothing references anymore. All layers of the layer stack of the stage are
+    searched, so references authored in sublayers, in an earlier edit target or on folders that are unloaded or
+    deactivated keep their entries.
+
+    :param stage: The stage with the store
+    :param store_path: The path of the store, see get_store_path
+    :return: A list of entry paths.
+    """
+    store_path = Sdf.Path(str(store_path))
+    store_prim = stage.GetPrimAtPath(store_path)
+    if not store_prim:
+        return []
+    entry_depth = store_path.pathElementCount + 1
+    used = set()
+    for layer in stage.GetLayerStack(includeSessionLayers=True):
+        for path in _get_store_references(layer, store_path):
+            if path.pathElementCount >= entry_depth:
+                used.add(path.GetPrefixes()[entry_depth - 1])
+    return [entry.GetPath() for entry in store_prim.GetAllChildren() if entry.GetPath() not in used]
@@ -0,0 +1,179 @@
+__all__ = [
+    "MESH_DATA_VERSION",
+    "LEGACY_ATTR",
+    "VERSION_ATTR",
+    "MESHES_ATTR",
+    "MATERIALS_ATTR",
+    "INDICES_ATTR",
+    "MESH_DATA_ATTRS",
+    "encode_mesh_data",
+    "encode_mesh_data_changes",
+    "encode_legacy_mesh_data",
+    "decode_legacy_mesh_data",
+    "has_legacy_mesh_data",
+    "read_mesh_data",
+    "write_mesh_data",
+]
+
+import base64
+import json
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import carb
+from pxr import Sdf
+
+# Version 1: MMEMeshData, an array of base64 encoded JSON objects {"path": ..., "mesh": ...}
+# Version 2: parallel arrays, mesh paths with indices into a deduplicated array of material paths
+MESH_DATA_VERSION = 2
+
+LEGACY_ATTR = "MMEMeshData"
+VERSION_ATTR = "MMEMeshDataVersion"
+MESHES_ATTR = "MMEMeshDataMeshes"
+MATERIALS_ATTR = "MMEMeshDataMaterials"
+INDICES_ATTR = "MMEMeshDataIndices"
+# All attributes that hold the data, a change in any of them means the data has changed
+MESH_DATA_ATTRS = (LEGACY_ATTR, VERSION_ATTR, MESHES_ATTR, MATERIALS_ATTR, INDICES_ATTR)
+
+
+def encode_mesh_data(mesh_materials) -> Dict[str, Tuple[Sdf.ValueTypeName, object]]:
+    """
+    It converts the list of mesh/material pairs into the values of the version 2 attributes
+
+    :param mesh_materials: A list of dictionaries containing the following keys: path, mesh
+    :return: A dictionary of attribute name -> (type, value).
+    """
+    meshes = []
+    materials = []
+    indices = []
+    material_indices = {}
+    for mat_data in mesh_materials:
+        material_path = str(mat_data["path"])
+        index = material_indices.get(material_path)
+        if index is None:
+            index = len(materials)
+            material_indices[material_path] = index
+            materials.append(material_path)
+        meshes.append(str(mat_data["mesh"]))
+        indices.append(index)
+    return {
+        VERSION_ATTR: (Sdf.ValueTypeNames.Int, MESH_DATA_VERSION),
+        MESHES_ATTR: (Sdf.ValueTypeNames.StringArray, meshes),
+        MATERIALS_ATTR: (Sdf.ValueTypeNames.StringArray, materials),
+        INDICES_ATTR: (Sdf.ValueTypeNames.IntArray, indices),
+    }
+
+
+def encode_mesh_data_changes(prim, changes) -> Optional[Dict[str, Tuple[Sdf.ValueTypeName, object]]]:
+    """
+    It applies new materials of some meshes to the version 2 data stored on the prim and returns the values of only
+    the attributes that have changed, so the rest of the data doesn't have to be written again.
+    A material that is not in the list yet takes the slot of the replaced one if nothing else uses it, otherwise
+    it's appended. Slots that become unused are left in place, they are dropped by the next full write.
+
+    :param prim: The variant folder prim
+    :param changes: A dictionary of mesh path -> new material path
+    :return: A dictionary of attribute name -> (type, value), None if the prim has no version 2 data.
+    """
+    if not prim or _get_value(prim, VERSION_ATTR) != MESH_DATA_VERSION:
+        return None
+    changes = {str(mesh): str(material) for mesh, material in changes.items()}
+    meshes = _get_value(prim, MESHES_ATTR) or []
+    materials = list(_get_value(prim, MATERIALS_ATTR) or [])
+    indices = list(_get_value(prim, INDICES_ATTR) or [])
+    material_indices = {material_path: index for index, material_path in enumerate(materials)}
+    usage = Counter(indices)
+    result = {}
+    for position, mesh in enumerate(meshes):
+        material_path = changes.get(mesh)
+        old_index = indices[position]
+        if material_path is None or materials[old_index] == material_path:
+            continue
+        index = material_indices.get(material_path)
+        if index is None and usage[old_index] == 1:
+            # The replaced material isn't used by any other mesh, the slot is reused and the indices stay the same
+            del material_indices[materials[old_index]]
+            materials[old_index] = material_path
+            material_indices[material_path] = old_index
+            result[MATERIALS_ATTR] = (Sdf.ValueTypeNames.StringArray, materials)
+            continue
+        if index is None:
+            index = len(materials)
+            material_indices[material_path] = index
+            materials.append(material_path)
+            result[MATERIALS_ATTR] = (Sdf.ValueTypeNames.StringArray, materials)
+        usage[old_index] -= 1
+        usage[index] += 1
+        indices[position] = index
+        result[INDICES_ATTR] = (Sdf.ValueTypeNames.IntArray, indices)
+    return result
+
+
+def encode_legacy_mesh_data(mesh_materials) -> List[bytes]:
+    """It converts the list of mesh/material pairs into the version 1 format, kept for comparison and tests"""
+    return [
+        base64.b64encode(json.dumps({"path": str(mat_data["path"]), "mesh": str(mat_data["mesh"])}).encode())
+        for mat_data in mesh_materials
+    ]
+
+
+def decode_legacy_mesh_data(values) -> List[Tuple[str, str]]:
+    """
+    It decodes the version 1 format
+
+    :param values: The value of the MMEMeshData attribute
+    :return: A list of (mesh path, material path) tuples.
+    """
+    result = []
+    for item in values:
+        mat_data = json.loads(base64.b64decode(item).decode("utf-8"))
+        result.append((mat_data["mesh"], mat_data["path"]))
+    return result
+
+
+def _get_value(prim, name):
+    attr = prim.GetAttribute(name)
+    return attr.Get() if attr else None
+
+
+def has_legacy_mesh_data(prim) -> bool:
+    """It checks if the mesh data on the folder is stored in the version 1 format and has to be migrated"""
+    return bool(prim) and _get_value(prim, VERSION_ATTR) is None and bool(_get_value(prim, LEGACY_ATTR))
+
+
+def read_mesh_data(prim) -> Optional[List[Tuple[str, str]]]:
+    """
+    It reads the mesh data stored on the variant (or MME) folder, data in the version 1 format is decoded as well.
+    Reading never writes to the stage, the data is migrated by the next write, see has_legacy_mesh_data.
+
+    :param prim: The variant folder prim
+    :return: A list of (mesh path, material path) tuples, None if there is no data.
+    """
+    if not prim:
+        return None
+    version = _get_value(prim, VERSION_ATTR)
+    if version == MESH_DATA_VERSION:
+        meshes = _get_value(prim, MESHES_ATTR) or []
+        materials = _get_value(prim, MATERIALS_ATTR) or []
+        indices = _get_value(prim, INDICES_ATTR) or []
+        return [(mesh, materials[index]) for mesh, index in zip(meshes, indices)]
+    if version is not None:
+        carb.log_warn(f"Unsupported mesh data version {version} on {prim.GetPath()}")
+        return None
+    legacy_value = _get_value(prim, LEGACY_ATTR)
+    if not legacy_value:
+        return None
+    return decode_legacy_mesh_data(legacy_value)
+
+
+def write_mesh_data(prim, mesh_materials):
+    """
+    It writes the mesh data directly with the Usd API, e.g. to set up stages without Kit commands
+
+    :param prim: The variant folder prim
+    :param mesh_materials: A list of dictionaries containing the following keys: path, mesh
+    """
+    for name, (type_name, value) in encode_mesh_data(mesh_materials).items():
+        prim.CreateAttribute(name, type_name, custom=True).Set(value)
+    if prim.GetAttribute(LEGACY_ATTR):
+        prim.RemoveProperty(LEGACY_ATTR)
@@ -0,0 +1,198 @@
+__all__ = ["MMEObjectIndex"]
+
+from typing import Dict, List, Optional, Set
+
+from pxr import Sdf, Usd
+
+
+class MMEObjectIndex:
+    """
+    An index of all objects on the stage that own a Looks/MME folder (i.e. have at least one variant).
+    It is built once when the stage is opened and then kept up to date from the resynced paths of
+    Usd.Notice.ObjectsChanged, so only the changed parts of the stage are scanned again.
+    """
+
+    def __init__(self):
+        self._stage = None
+        # Path of the object -> path of its MME folder
+        self._objects: Dict[Sdf.Path, Sdf.Path] = {}
+        self._sorted_paths: Optional[List[Sdf.Path]] = None
+        # All proper ancestors of the objects, built on demand
+        self._ancestors: Optional[Set[Sdf.Path]] = None
+
+    @property
+    def stage(self):
+        return self._stage
+
+    def rebuild(self, stage):
+        """
+        It scans the whole stage and collects all objects with a Looks/MME folder
+
+        :param stage: The stage to index
+        """
+        self._stage = stage
+        self._objects.clear()
+        self._sorted_paths = None
+        self._ancestors = None
+        if stage:
+            self._scan(stage.GetPseudoRoot())
+
+    def rebuild_steps(self, stage):
+        """
+        It works like rebuild, but scans the stage one prim at a time and yields after every prim, so the scan can
+        be spread over several frames (see FrameBudgetScheduler). Only paths are kept between the steps, prims
+        removed in the meantime are skipped and the changes are picked up by on_objects_changed.
+
+        :param stage: The stage to index
+        """
+        self._stage = stage
+        self._objects.clear()
+        self._sorted_paths = None
+        self._ancestors = None
+        if not stage:
+            return None
+        pending = [Sdf.Path.absoluteRootPath]
+        while pending:
+            prim = stage.GetPrimAtPath(pending.pop())
+            if prim and not self._check(prim):
+                pending.extend(reversed([child.GetPath() for child in prim.GetChildren()]))
+            yield None
+        return None
+
+    def clear(self):
+        self._stage = None
+        self._objects.clear()
+        self._sorted_paths = None
+        self._ancestors = None
+
+    def _scan(self, prim):
+        """
+        It walks the subtree of the prim and adds all MME objects it finds. Children of Looks folders are skipped,
+        there is nothing but materials and variants inside.
+        """
+        iterator = iter(Usd.PrimRange(prim))
+        for child in iterator:
+            if self._check(child):
+                iterator.PruneChildren()
+
+    def _check(self, prim) -> bool:
+        """
+        It adds the object if the prim is its MME or Looks folder
+
+        :return: True if the children of the prim don't need to be scanned.
+        """
+        name = prim.GetName()
+        if name == "MME":
+            looks = prim.GetParent()
+            if looks and looks.GetName() == "Looks":
+                self._add(looks.GetParent().GetPath(), prim.GetPath())
+            return True
+        if name == "Looks":
+            mme_folder = prim.GetChild("MME")
+            if mme_folder:
+                self._add(prim.GetParent().GetPath(), mme_folder.GetPath())
+            return True
+        return False
+
+    def _add(self, object_path, mme_path):
+        self._objects[object_path] = mme_path
+        self._sorted_paths = None
+        self._ancestors = None
+
+    def _remove_under(self, root) -> List[Sdf.Path]:
+        """Removes all entries that live under the root or whose MME folder lives under the root"""
+        removed = [
+            object_path for object_path, mme_path in self._objects.items()
+            if object_path.HasPrefix(root) or mme_path.HasPrefix(root)
+        ]
+        for object_path in removed:
+            del self._objects[object_path]
+        if removed:
+            self._sorted_paths = None
+            self._ancestors = None
+        return removed
+
+    def on_objects_changed(self, notice):
+        """
+        Called by Tf.Notice. It re-scans only the resynced subtrees of the stage.
+
+        :param notice: Usd.Notice.ObjectsChanged
+        :return: A tuple of the rescanned (added or possibly changed) and removed object paths.
+        """
+        if not self._stage:
+            return [], []
+        resynced = sorted(path for path in notice.GetResyncedPaths() if path.IsPrimPath() or path.IsAbsoluteRootPath())
+        roots = []
+        for path in resynced:
+            # Nested paths are covered by the scan of their ancestor
+            if roots and path.HasPrefix(roots[-1]):
+                continue
+            roots.append(path)
+        removed = set()
+        before = set(self._objects)
+        for root in roots:
+            removed.update(self._remove_under(root))
+            prim = self._stage.GetPrimAtPath(root)
+            if prim:
+                # It also works if the root is the MME or Looks folder itself
+                self._scan(prim)
+        added = [path for path in self._objects if path in removed or path not in before]
+        return added, [path for path in removed if path not in self._objects]
+
+    def contains(self, object_path) -> bool:
+        return Sdf.Path(str(object_path)) in self._objects
+
+    def get_object_paths(self) -> List[Sdf.Path]:
+        """Returns paths of all MME objects, sorted by path"""
+        if self._sorted_paths is None:
+            self._sorted_paths = sorted(self._objects)
+        return self._sorted_paths
+
+    def get_object_paths_under(self, path) -> List[Sdf.Path]:
+        """
+        It returns the paths of the object at the path and of all objects under it, e.g. the objects whose world
+        transforms depend on the transform of the prim at the path.
+        Paths that aren't objects nor their ancestors are answered with set lookups only.
+
+        :param path: The path of the prim
+        :return: A list of object paths.
+        """
+        path = Sdf.Path(str(path))
+        if self._ancestors is None:
+            self._ancestors = set()
+            for object_path in self._objects:
+                parent_path = object_path.GetParentPath()
+                while not parent_path.isEmpty and parent_path not in self._ancestors:
+                    self._ancestors.add(parent_path)
+                    parent_path = parent_path.GetParentPath()
+        if path not in self._ancestors:
+            return [path] if path in self._objects else []
+        return [object_path for object_path in self.get_object_paths() if object_path.HasPrefix(path)]
+
+    def get_object_path_of(self, path) -> Optional[Sdf.Path]:
+        """
+        It returns the path of the closest object that contains the prim at the path, e.g. the owner of a mesh
+
+        :param path: The path of the prim
+        :return: The object path, None if the prim doesn't belong to any object.
+        """
+        path = Sdf.Path(str(path))
+        while not path.isEmpty:
+            if path in self._objects:
+                return path
+            path = path.GetParentPath()
+        return None
+
+    def get_objects(self) -> List[Usd.Prim]:
+        """Returns all valid MME objects on the stage, sorted by path"""
+        if not self._stage:
+            return []
+        objects = []
+        for object_path in self.get_object_paths():
+            prim = self._stage.GetPrimAtPath(object_path)
+            if prim:
+                objects.append(prim)
+        return objects
+
+    def __len__(self):
+        return len(self._objects)
@@ -0,0 +1,127 @@
+__all__ = [
+    "PRESET_ATTR_PREFIX",
+    "get_preset_keys",
+    "get_preset_display_name",
+    "get_preset_key",
+    "get_preset_attr_names",
+    "encode_preset",
+    "read_preset",
+]
+
+from typing import Dict, List, Optional, Tuple
+
+from pxr import Sdf, Tf
+
+# Presets are stored on the default prim, next to the scene settings:
+# MMEPreset:<key>:objects - paths of the objects, MMEPreset:<key>:variants - names of their active variants,
+# MMEPreset:<key>:name - the name the preset was saved with. The key is the name made a valid identifier, so
+# different names can share it, see get_preset_key. Everything except saving works with keys, names are for the UI.
+PRESET_ATTR_PREFIX = "MMEPreset:"
+_OBJECTS_SUFFIX = ":objects"
+_VARIANTS_SUFFIX = ":variants"
+_NAME_SUFFIX = ":name"
+# Stored instead of a variant name when the original materials are active
+ORIGINAL_VARIANT = ""
+
+
+def get_preset_attr_names(key: str) -> Tuple[str, str, str]:
+    """
+    It returns names of the attributes that store the preset
+
+    :param key: The key of the preset, see get_preset_key
+    :return: A tuple of the objects, variants and name attribute names.
+    """
+    key = Tf.MakeValidIdentifier(key)
+    return tuple(f"{PRESET_ATTR_PREFIX}{key}{suffix}" for suffix in (_OBJECTS_SUFFIX, _VARIANTS_SUFFIX, _NAME_SUFFIX))
+
+
+def get_preset_keys(prim) -> List[str]:
+    """
+    It returns keys of all presets stored on the prim
+
+    :param prim: The default prim
+    :return: A sorted list of keys.
+    """
+    if not prim:
+        return []
+    names = []
+    for attr in prim.GetAttributes():
+        attr_name = attr.GetName()
+        if attr_name.startswith(PRESET_ATTR_PREFIX) and attr_name.endswith(_OBJECTS_SUFFIX):
+            names.append(attr_name[len(PRESET_ATTR_PREFIX):-len(_OBJECTS_SUFFIX)])
+    return sorted(names)
+
+
+def get_preset_display_name(prim, key: str) -> str:
+    """
+    It returns the name the preset was saved with, the key for presets saved before the name was stored
+
+    :param prim: The default prim
+    :param key: The key of the preset
+    :return: The name.
+    """
+    name_attr = prim.GetAttribute(get_preset_attr_names(key)[2]) if prim else None
+    return (name_attr.Get() if name_attr else None) or key
+
+
+def get_preset_key(prim, name: str, create: bool = False) -> Optional[str]:
+    """
+    It returns the key of the preset saved with the given name, e.g. to save it again. A new preset gets the name
+    made a valid identifier, with a number appended if another preset uses it already, so e.g. "Car A" and "Car-A"
+    don't overwrite each other.
+
+    :param prim: The default prim
+    :param name: The name of the preset, see get_preset_display_name
+    :param create: Return a free key if there is no preset with the name (optional)
+    :return: The key, None if there is no such preset and create is False.
+    """
+    keys = get_preset_keys(prim)
+    for key in keys:
+        if get_preset_display_name(prim, key) == name:
+            return key
+    if not create:
+        return None
+    key = base_key = Tf.MakeValidIdentifier(name)
+    index = 1
+    while key in keys:
+        key = f"{base_key}_{index}"
+        index += 1
+    return key
+
+
+def encode_preset(active_variants: Dict[Sdf.Path, Optional[str]]) -> Tuple[List[str], List[str]]:
+    """
+    It converts a map of object paths to the names of their active variants into the attribute values
+
+    :param active_variants: Object path -> variant name, None for the original materials
+    :return: A tuple of object paths and variant names.
+    """
+    objects = []
+    variants = []
+    for object_path, variant_name in sorted(active_variants.items()):
+        objects.append(str(object_path))
+        variants.append(variant_name or ORIGINAL_VARIANT)
+    return objects, variants
+
+
+def read_preset(prim, key: str) -> Optional[Dict[Sdf.Path, Optional[str]]]:
+    """
+    It reads the preset from the prim
+
+    :param prim: The default prim
+    :param key: The key of the preset, see get_preset_keys
+    :return: Object path -> variant name (None for the original materials), or None if there is no such preset.
+    """
+    if not prim or key not in get_preset_keys(prim):
+        return None
+    objects_attr_name, variants_attr_name, _ = get_preset_attr_names(key)
+    objects_attr = prim.GetAttribute(objects_attr_name)
+    variants_attr = prim.GetAttribute(variants_attr_name)
+    if not objects_attr or not variants_attr:
+        return None
+    objects = objects_attr.Get() or []
+    variants = variants_attr.Get() or []
+    return {
+        Sdf.Path(object_path): (variant_name if variant_name != ORIGINAL_VARIANT else None)
+        for object_path, variant_name in zip(objects, variants)
+    }
@@ -6,14 +6,39 @@
 # distribution of this software and related documentation without an express
 # license agreement from NVIDIA CORPORATION is strictly prohibited.
 #
-__all__ = ["update_property_paths", "get_prim_as_text", "text_to_stage"]
+__all__ = [
+    "update_property_paths",
+    "remap_property_paths",
+    "extract_prims_to_layer",
+    "get_prim_as_text",
+    "text_to_stage",
+    "clone_prims",
+    "get_unique_name",
+]
 
 from omni.kit.commands import execute
 from pxr import Sdf
 from pxr import Tf
 from pxr import Usd
+from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Set
+from typing import Tuple
+
+# Fields that are either written explicitly by _copy_composed_prim or must never be copied as plain metadata
+_STRUCTURAL_FIELDS = {
+    "specifier",
+    "typeName",
+    "custom",
+    "variability",
+    "default",
+    "timeSamples",
+    "connectionPaths",
+    "targetPaths",
+    "primChildren",
+    "properties",
+}
 
 
 def _to_layer(text: str) -> Optional[Sdf.Layer]:
@@ -48,31 +73,267 @@ def update_property_paths(prim_spec, old_path, new_path):
         update_property_paths(child, old_path, new_path)
 
 
-def get_prim_as_text(stage: Usd.Stage, prim_paths: List[Sdf.Path]) -> Optional[str]:
-    """Generate a text from the stage and prim path"""
+def _remap_path(path: Sdf.Path, paths_map: Dict[Sdf.Path, Sdf.Path]) -> Sdf.Path:
+    """Replace the prefix of the path with the new one if any of its ancestors is in the map"""
+    prefix = path.GetPrimPath()
+    while prefix and prefix != Sdf.Path.absoluteRootPath:
+        if prefix in paths_map:
+            return path.ReplacePrefix(prefix, paths_map[prefix])
+        prefix = prefix.GetParentPath()
+    return path
 
-    if not prim_paths:
+
+def _remap_list_op(list_op, paths_map: Dict[Sdf.Path, Sdf.Path]):
+    """Remap explicit, prepended and appended items of the path list op, touching only lists that change"""
+    for field in ("explicitItems", "prependedItems", "appendedItems"):
+        items = getattr(list_op, field)
+        if not items:
+            continue
+        new_items = [_remap_path(path, paths_map) for path in items]
+        if new_items != list(items):
+            setattr(list_op, field, new_items)
+
+
+def remap_property_paths(prim_spec, paths_map: Dict[Sdf.Path, Sdf.Path]):
+    """
+    The same as update_property_paths, but remaps all the paths of the map in a single pass over the specs.
+
+    :param prim_spec: The root spec to start from
+    :param paths_map: A map of old prim paths to the new ones
+    """
+    if not prim_spec:
         return
 
-    # TODO: It can be slow in large scenes. Ideally we need to flatten specific prims.
-    flatten_layer = stage.Flatten()
+    for rel in prim_spec.relationships:
+        _remap_list_op(rel.targetPathList, paths_map)
+
+    for attr in prim_spec.attributes:
+        _remap_list_op(attr.connectionPathList, paths_map)
+
+    for child in prim_spec.nameChildren:
+        remap_property_paths(child, paths_map)
+
+
+def _copy_metadata(source, spec):
+    """Write all composed metadata of a Usd object that isn't handled separately to the given spec"""
+    for key, value in source.GetAllAuthoredMetadata().items():
+        if key in _STRUCTURAL_FIELDS:
+            continue
+        try:
+            spec.SetInfo(key, value)
+        except Tf.ErrorException:
+            # Some composed values can't be authored back (e.g. fields unknown to the spec type), skip them
+            continue
+
+
+def _copy_composed_prim(prim: Usd.Prim, layer: Sdf.Layer, target_path: Sdf.Path):
+    """
+    It writes the composed (flattened) state of the prim and all its descendants into the layer at target_path.
+    Only the given subtree is composed, so the cost depends on the size of the prim, not on the size of the stage.
+
+    :param prim: The source prim on the stage
+    :param layer: The layer to write to
+    :param target_path: The path of the copy in the layer
+    """
+    source_root = prim.GetPath()
+    for source_prim in Usd.PrimRange(prim):
+        prim_spec = Sdf.CreatePrimInLayer(layer, source_prim.GetPath().ReplacePrefix(source_root, target_path))
+        prim_spec.specifier = Sdf.SpecifierDef
+        prim_spec.typeName = source_prim.GetTypeName()
+        _copy_metadata(source_prim, prim_spec)
+
+        for attr in source_prim.GetAuthoredAttributes():
+            attr_spec = Sdf.AttributeSpec(
+                prim_spec,
+                attr.GetName(),
+                attr.GetTypeName(),
+                attr.GetVariability(),
+                attr.IsCustom(),
+            )
+            _copy_metadata(attr, attr_spec)
+            if attr.HasAuthoredValue():
+                value = attr.Get(Usd.TimeCode.Default())
+                if value is not None:
+                    attr_spec.default = value
+                for time in attr.GetTimeSamples():
+                    layer.SetTimeSample(attr_spec.path, time, attr.Get(time))
+            connections = attr.GetConnections()
+            if connections:
+                attr_spec.connectionPathList.explicitItems = connections
+
+        for rel in source_prim.GetAuthoredRelationships():
+            rel_spec = Sdf.RelationshipSpec(prim_spec, rel.GetName(), rel.IsCustom())
+            _copy_metadata(rel, rel_spec)
+            targets = rel.GetTargets()
+            if targets:
+                rel_spec.targetPathList.explicitItems = targets
+
+
+def _collect_connected_prim_paths(prim_spec, result: Set[Sdf.Path]):
+    """It adds the prims that the attributes of the spec and its descendants are connected to into the set"""
+    for attr in prim_spec.attributes:
+        for path in attr.connectionPathList.explicitItems:
+            result.add(path.GetPrimPath())
+
+    for child in prim_spec.nameChildren:
+        _collect_connected_prim_paths(child, result)
+
+
+def _get_outside_sources(
+    layer: Sdf.Layer, item_paths: List[Sdf.Path], paths_map: Dict[Sdf.Path, Sdf.Path]
+) -> List[Sdf.Path]:
+    """
+    It returns the prims that the copies at item_paths are connected to, but that aren't copied yet, neither on
+    their own nor as a part of a copied prim. Ancestors of copied prims are skipped, they would be copied twice.
+    """
+    sources = set()
+    for item_path in item_paths:
+        _collect_connected_prim_paths(layer.GetPrimAtPath(item_path), sources)
+    return sorted(
+        path for path in sources
+        if _remap_path(path, paths_map) == path and not any(copied.HasPrefix(path) for copied in paths_map)
+    )
+
+
+def extract_prims_to_layer(
+    stage: Usd.Stage, prim_paths: List[Sdf.Path]
+) -> Tuple[Optional[Sdf.Layer], Dict[Sdf.Path, Sdf.Path]]:
+    """
+    It composes only the given prims (e.g. materials with their shader networks) into a new anonymous layer,
+    wrapping each of them into a separate Item_XX root prim, and remaps all internal connections to the new paths.
+    Shaders and node graphs outside of the given prims that they are connected to (e.g. a texture shared by several
+    materials) are copied as items of their own after them, so the layer doesn't depend on the stage.
+
+    :param stage: The stage to take the prims from
+    :param prim_paths: The paths of the prims to extract
+    :return: The anonymous layer and a map of source paths (also of the connected prims) to the paths inside of
+        that layer.
+    """
+    if not prim_paths:
+        return None, {}
+
     anonymous_layer = Sdf.Layer.CreateAnonymous(prim_paths[0].name + ".usda")
     paths_map = {}
 
-    for i in range(0, len(prim_paths)):
-        item_name = str.format("Item_{:02d}", i)
-        Sdf.PrimSpec(anonymous_layer, item_name, Sdf.SpecifierDef)
-        prim_path = prim_paths[i]
-        anonymous_path = Sdf.Path.absoluteRootPath.AppendChild(item_name).AppendChild(prim_path.name)
+    with Sdf.ChangeBlock():
+        batch = [Sdf.Path(prim_path) for prim_path in prim_paths]
+        visited = set(batch)
+        index = 0
+        while batch:
+            item_paths = []
+            for prim_path in batch:
+                item_name = str.format("Item_{:02d}", index)
+                index += 1
+                prim = stage.GetPrimAtPath(prim_path)
+                if not prim:
+                    continue
+                Sdf.PrimSpec(anonymous_layer, item_name, Sdf.SpecifierDef)
+                anonymous_path = Sdf.Path.absoluteRootPath.AppendChild(item_name).AppendChild(prim_path.name)
+
+                # Copy only the composed subtree of this prim instead of flattening the whole stage
+                _copy_composed_prim(prim, anonymous_layer, anonymous_path)
+
+                paths_map[prim_path] = anonymous_path
+                item_paths.append(anonymous_path)
 
-        # Copy
-        Sdf.CopySpec(flatten_layer, prim_path, anonymous_layer, anonymous_path)
+            # The copies of the connected prims can be connected further
+            sources = [
+                path for path in _get_outside_sources(anonymous_layer, item_paths, paths_map) if path not in visited
+            ]
+            visited.update(sources)
+            batch = [path for path in sources if stage.GetPrimAtPath(path)]
 
-        paths_map[prim_path] = anonymous_path
+        for prim in anonymous_layer.rootPrims:
+            remap_property_paths(prim, paths_map)
+
+    return anonymous_layer, paths_map
+
+
+def _get_single_source_layer(prim: Usd.Prim) -> Optional[Sdf.Layer]:
+    """
+    If the whole subtree of the prim is described by specs from one layer without any composition arcs, return that
+    layer, so the specs can be copied as they are. Otherwise, return None.
+    """
+    source_layer = None
+    for source_prim in Usd.PrimRange(prim):
+        prim_stack = source_prim.GetPrimStack()
+        if len(prim_stack) != 1 or prim_stack[0].path != source_prim.GetPath():
+            return None
+        if source_layer is None:
+            source_layer = prim_stack[0].layer
+        elif prim_stack[0].layer != source_layer:
+            return None
+    return source_layer
+
+
+def get_unique_name(name: str, taken) -> str:
+    """
+    It makes the name a valid identifier and appends a number if it's taken already, e.g. Paint, Paint_1, Paint_2
 
-    for prim in anonymous_layer.rootPrims:
-        for source_path, target_path in paths_map.items():
-            update_property_paths(prim, source_path, target_path)
+    :param name: The name to start from
+    :param taken: The names that can't be used
+    :return: The name.
+    """
+    unique_name = name = Tf.MakeValidIdentifier(name)
+    index = 1
+    while unique_name in taken:
+        unique_name = f"{name}_{index}"
+        index += 1
+    return unique_name
+
+
+def clone_prims(
+    stage: Usd.Stage, prim_paths: List[Sdf.Path], root: Sdf.Path, layer: Optional[Sdf.Layer] = None
+) -> Dict[Sdf.Path, Sdf.Path]:
+    """
+    It copies the given prims under the root directly into the layer, without serializing them to text.
+    Prims that are fully described by a single layer are copied spec by spec, anything else is composed first.
+    Connections and relationships between the copied prims are remapped to the new location.
+    The copies keep the names of the prims, a prim with the same name as one copied before it (e.g. a Paint material
+    of another object) gets a number appended, see get_unique_name.
+
+    :param stage: The stage to take the prims from
+    :param prim_paths: The paths of the prims to copy
+    :param root: The path of the prim the copies will be placed under
+    :param layer: The layer to write to, defaults to the current edit target of the stage (optional)
+    :return: A map of source paths to the paths of the copies.
+    """
+    if layer is None:
+        layer = stage.GetEditTarget().GetLayer()
+    root = Sdf.Path(root)
+    paths_map = {}
+    taken_names = set()
+
+    with Sdf.ChangeBlock():
+        if not layer.GetPrimAtPath(root):
+            Sdf.CreatePrimInLayer(layer, root)
+        for prim_path in prim_paths:
+            prim_path = Sdf.Path(prim_path)
+            prim = stage.GetPrimAtPath(prim_path)
+            if not prim or prim_path in paths_map:
+                continue
+            target_name = get_unique_name(prim_path.name, taken_names)
+            taken_names.add(target_name)
+            target_path = root.AppendChild(target_name)
+            source_layer = _get_single_source_layer(prim)
+            if source_layer:
+                Sdf.CopySpec(source_layer, prim_path, layer, target_path)
+            else:
+                _copy_composed_prim(prim, layer, target_path)
+            paths_map[prim_path] = target_path
+
+        for target_path in paths_map.values():
+            remap_property_paths(layer.GetPrimAtPath(target_path), paths_map)
+
+    return paths_map
+
+
+def get_prim_as_text(stage: Usd.Stage, prim_paths: List[Sdf.Path]) -> Optional[str]:
+    """Generate a text from the stage and prim path"""
+
+    anonymous_layer, _ = extract_prims_to_layer(stage, prim_paths)
+    if not anonymous_layer:
+        return
 
     return anonymous_layer.ExportToString()
 
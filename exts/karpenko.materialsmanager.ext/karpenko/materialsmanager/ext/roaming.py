@@ -0,0 +1,112 @@
+__all__ = ["RoamingController"]
+
+import asyncio
+
+import carb
+from omni.kit.viewport.utility import get_active_viewport_camera_path
+from pxr import Sdf
+
+
+class RoamingController:
+    """
+    Drives roaming mode from changes of the active camera instead of polling.
+    A search is scheduled only when the camera (or one of its ancestors) is changed on the stage, so nothing runs
+    while the camera is static. Bursts of changes are debounced: the search runs once the camera has been still
+    for the debounce interval, and while it keeps moving, at least once per throttle interval.
+
+    :param search_fn: Called to find and show the closest object
+    :param get_setting: Used to read MMERoamingDebounce and MMERoamingThrottle (in seconds)
+    """
+
+    DEFAULT_DEBOUNCE = 0.1
+    DEFAULT_THROTTLE = 0.5
+
+    def __init__(self, search_fn, get_setting):
+        self._search_fn = search_fn
+        self._get_setting = get_setting
+        self._task = None
+        self._dirty = None
+        self._camera_path = None
+
+    @property
+    def is_running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """It starts listening to the camera, the first search is scheduled right away"""
+        if self.is_running:
+            return
+        self._dirty = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+        self.mark_dirty()
+
+    def stop(self):
+        """It cancels the roaming task"""
+        if self._task:
+            self._task.cancel()
+        self._task = None
+        self._dirty = None
+        self._camera_path = None
+
+    def mark_dirty(self):
+        """Schedules a search, e.g. when the camera has moved or the list of objects has changed"""
+        if self._dirty:
+            self._dirty.set()
+
+    def _get_camera_path(self):
+        camera_path = get_active_viewport_camera_path()
+        return Sdf.Path(str(camera_path)) if camera_path else None
+
+    def on_objects_changed(self, notice):
+        """
+        Called by Tf.Notice. Schedules a search if the active camera or any of its ancestors has changed.
+
+        :param notice: Usd.Notice.ObjectsChanged
+        """
+        if not self.is_running:
+            return
+        camera_path = self._get_camera_path()
+        if camera_path != self._camera_path:
+            # The active camera was switched
+            self._camera_path = camera_path
+            self.mark_dirty()
+            return
+        if not camera_path:
+            return
+        for path in notice.GetChangedInfoOnlyPaths():
+            if camera_path.HasPrefix(path.GetPrimPath()):
+                self.mark_dirty()
+                return
+        for path in notice.GetResyncedPaths():
+            if camera_path.HasPrefix(path.GetPrimPath()):
+                self.mark_dirty()
+                return
+
+    def _get_interval(self, name, default_value):
+        value = self._get_setting(name, default_value)
+        try:
+            return max(float(value), 0.0)
+        except (TypeError, ValueError):
+            return default_value
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            await self._dirty.wait()
+            debounce = self._get_interval("MMERoamingDebounce", self.DEFAULT_DEBOUNCE)
+            throttle = self._get_interval("MMERoamingThrottle", self.DEFAULT_THROTTLE)
+            first_change = loop.time()
+            # Wait until the camera is still for the debounce interval, but not longer than the throttle interval
+            while True:
+                self._dirty.clear()
+                timeout = min(debounce, throttle - (loop.time() - first_change))
+                if timeout <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._dirty.wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            try:
+                self._search_fn()
+            except Exception as e:
+                carb.log_error(f"Roaming mode failed to find the closest object: {e}")
@@ -0,0 +1,255 @@
+__all__ = ["FRAME_BUDGET_SETTING", "Job", "FrameBudgetScheduler"]
+
+import asyncio
+import inspect
+import time
+from typing import Callable, Generator, List, Optional
+
+import carb
+import omni.kit.app
+import omni.kit.undo
+
+# carb setting with the time (in milliseconds) long operations may take per frame
+FRAME_BUDGET_SETTING = "/exts/karpenko.materialsmanager.ext/frameBudgetMs"
+
+
+class Job:
+    """
+    A long operation split into small steps. The steps are a generator that yields after every step, optionally
+    with the progress (0..1), and returns a function that commits the result. Nothing should be written to the
+    stage by the steps themselves, the commit function is called at the end, in one undo group.
+    The commit function may return a generator too, it yields between chunks of edits, then the chunks are written
+    over the next frames. The chunks written in one frame are an undo group of their own, no group is left open
+    between frames, so commands of the user never end up in the undo steps of the job.
+
+    :param name: The name of the operation, it's shown in the UI
+    :param steps: The generator
+    :param on_done: Called with the job when it's committed (optional)
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMMITTING = "committing"
+    DONE = "done"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+    def __init__(self, name: str, steps: Generator, on_done: Optional[Callable[["Job"], None]] = None):
+        self.name = name
+        self.state = Job.PENDING
+        self.progress = 0.0
+        self.result = None
+        self._steps = steps
+        self._commit_steps = None
+        # The latest history entry of every undo group the commit has written, oldest first
+        self._undo_entries = []
+        self._on_done = on_done
+
+    @property
+    def is_finished(self):
+        return self.state in (Job.DONE, Job.CANCELLED, Job.FAILED)
+
+    def cancel(self):
+        """
+        It stops the job, nothing it has prepared is committed. If the commit is being written over several frames,
+        the chunks written so far are undone.
+        """
+        if self.is_finished:
+            return
+        if self._commit_steps is not None:
+            self._commit_steps.close()
+            self._commit_steps = None
+            self._undo_commit()
+        else:
+            self._steps.close()
+        self.state = Job.CANCELLED
+
+    def _undo_commit(self):
+        """It undoes the undo groups of the commit, newest first, as long as nothing else was done after them"""
+        while self._undo_entries:
+            if _get_latest_entry() is not self._undo_entries[-1]:
+                carb.log_warn(
+                    f"{self.name} was cancelled after the stage was edited, the changes it has already made are "
+                    "kept in the undo history."
+                )
+                break
+            self._undo_entries.pop()
+            omni.kit.undo.undo()
+        self._undo_entries.clear()
+
+    def _write(self, fn):
+        """It calls fn in an undo group and remembers the group, if fn has executed any command"""
+        latest_entry = _get_latest_entry()
+        with omni.kit.undo.group():
+            result = fn()
+        entry = _get_latest_entry()
+        if entry is not None and entry is not latest_entry:
+            self._undo_entries.append(entry)
+        return result
+
+    def _run_commit_steps(self, deadline):
+        """It writes chunks of the commit until the deadline, returns (finished, result of the commit)"""
+        try:
+            while True:
+                next(self._commit_steps)
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return False, None
+        except StopIteration as e:
+            return True, e.value
+
+    def run_slice(self, deadline: Optional[float]) -> bool:
+        """
+        It runs the steps until the deadline, or all of them if there is none
+
+        :param deadline: time.perf_counter() value
+        :return: True if the job is finished.
+        """
+        if self.is_finished:
+            return True
+        if self.state != Job.COMMITTING:
+            self.state = Job.RUNNING
+            try:
+                while True:
+                    progress = next(self._steps)
+                    if progress is not None:
+                        self.progress = progress
+                    if deadline is not None and time.perf_counter() >= deadline:
+                        return False
+            except StopIteration as e:
+                commit = e.value
+            except Exception as e:
+                return self._fail(e)
+            if commit is None:
+                return self._finish(None)
+            try:
+                result = self._write(commit)
+            except Exception as e:
+                return self._fail(e)
+            if not inspect.isgenerator(result):
+                return self._finish(result)
+            self._commit_steps = result
+            self.state = Job.COMMITTING
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+        try:
+            finished, result = self._write(lambda: self._run_commit_steps(deadline))
+        except Exception as e:
+            self._commit_steps = None
+            return self._fail(e)
+        if not finished:
+            return False
+        self._commit_steps = None
+        return self._finish(result)
+
+    def _fail(self, error):
+        self.state = Job.FAILED
+        carb.log_error(f"{self.name} failed: {error}")
+        return True
+
+    def _finish(self, result):
+        self.result = result
+        self.state = Job.DONE
+        self.progress = 1.0
+        self._undo_entries.clear()
+        if self._on_done:
+            self._on_done(self)
+        return True
+
+
+def _get_latest_entry():
+    """It returns the latest entry of the undo history, None if it's empty"""
+    return next(reversed(omni.kit.undo.get_history().values()), None)
+
+
+class FrameBudgetScheduler:
+    """
+    Runs jobs cooperatively on the main thread: every frame the first job in the queue runs for at most the frame
+    budget, then the scheduler waits for the next update of the app, so the UI stays responsive.
+    A submitted job starts right away, operations that fit into the budget are finished without waiting for a frame.
+
+    :param get_budget: Returns the budget per frame in milliseconds
+    :param on_progress: Called after every slice and whenever the list of jobs changes (optional)
+    """
+
+    DEFAULT_BUDGET_MS = 8.0
+
+    def __init__(self, get_budget: Callable[[], Optional[float]], on_progress: Optional[Callable[[], None]] = None):
+        self._get_budget = get_budget
+        self._on_progress = on_progress
+        self._jobs: List[Job] = []
+        self._task = None
+
+    @property
+    def jobs(self) -> List[Job]:
+        """The jobs that are waiting or running"""
+        return list(self._jobs)
+
+    def _get_deadline(self):
+        budget = self._get_budget()
+        try:
+            budget = float(budget) if budget is not None else self.DEFAULT_BUDGET_MS
+        except (TypeError, ValueError):
+            budget = self.DEFAULT_BUDGET_MS
+        return time.perf_counter() + max(budget, 0.0) / 1000.0
+
+    def _notify(self):
+        if self._on_progress:
+            self._on_progress()
+
+    def run(self, name: str, steps: Generator, on_done=None) -> Job:
+        """
+        It runs the job to the end right away, e.g. for scripts and headless runs
+
+        :param name: The name of the job
+        :param steps: The generator of the job, see Job
+        :param on_done: Called with the job when it's committed (optional)
+        :return: The finished job.
+        """
+        job = Job(name, steps, on_done)
+        job.run_slice(None)
+        return job
+
+    def submit(self, name: str, steps: Generator, on_done=None) -> Job:
+        """
+        It queues the job, it's run in slices of the frame budget
+
+        :param name: The name of the job
+        :param steps: The generator of the job, see Job
+        :param on_done: Called with the job when it's committed (optional)
+        :return: The job, it can be cancelled.
+        """
+        job = Job(name, steps, on_done)
+        if not self._jobs and job.run_slice(self._get_deadline()):
+            # It fits into the budget
+            return job
+        self._jobs.append(job)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        self._notify()
+        return job
+
+    def cancel(self, job: Job):
+        """It cancels the job and removes it from the queue"""
+        job.cancel()
+        if job in self._jobs:
+            self._jobs.remove(job)
+            self._notify()
+
+    def cancel_all(self):
+        for job in self._jobs:
+            job.cancel()
+        self._jobs.clear()
+        if self._task:
+            self._task.cancel()
+        self._task = None
+        self._notify()
+
+    async def _run(self):
+        while self._jobs:
+            await omni.kit.app.get_app().next_update_async()
+            if not self._jobs:
+                break
+            job = self._jobs[0]
+            if job.run_slice(self._get_deadline()) and job in self._jobs:
+                self._jobs.remove(job)
+            self._notify()
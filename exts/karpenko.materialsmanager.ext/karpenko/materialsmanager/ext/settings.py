@@ -0,0 +1,126 @@
+__all__ = ["SETTINGS_TYPES", "SESSION_LAYER_SETTING", "SceneSettings", "get_setting_type"]
+
+from typing import Set
+
+from pxr import Sdf
+
+# carb setting that tells to author scene settings into the session layer instead of the edit target
+SESSION_LAYER_SETTING = "/persistent/exts/karpenko.materialsmanager.ext/settingsInSessionLayer"
+
+# Scene settings are stored as attributes of the default prim. Only these are loaded, other MME* attributes of the
+# default prim (e.g. the look presets) aren't settings. The types of other names are guessed from the value.
+SETTINGS_TYPES = {
+    "MMEEnableViewportUI": Sdf.ValueTypeNames.Bool,
+    "MMEEnableRoamingMode": Sdf.ValueTypeNames.Bool,
+    "MMEMaxVisibleDistance": Sdf.ValueTypeNames.Double,
+    "MMERoamingDebounce": Sdf.ValueTypeNames.Double,
+    "MMERoamingThrottle": Sdf.ValueTypeNames.Double,
+    "MMEUseVariantSets": Sdf.ValueTypeNames.Bool,
+    "MMEDeduplicateMaterials": Sdf.ValueTypeNames.Bool,
+    "MMEDeactivateVariants": Sdf.ValueTypeNames.Bool,
+}
+
+
+def get_setting_type(name, value):
+    """
+    It returns the attribute type for the setting
+
+    :param name: The name of the setting
+    :param value: The value that is going to be set
+    :return: Sdf.ValueTypeName
+    """
+    if name in SETTINGS_TYPES:
+        return SETTINGS_TYPES[name]
+    if isinstance(value, bool):
+        return Sdf.ValueTypeNames.Bool
+    if isinstance(value, int):
+        return Sdf.ValueTypeNames.Int
+    if isinstance(value, float):
+        return Sdf.ValueTypeNames.Double
+    return Sdf.ValueTypeNames.String
+
+
+class SceneSettings:
+    """
+    An in-memory copy of the settings stored on the default prim of the stage, see SETTINGS_TYPES.
+    It's loaded once for the stage and then updated from Usd.Notice.ObjectsChanged, so reading a setting never
+    touches the stage.
+    """
+
+    def __init__(self):
+        self._stage = None
+        self._prim_path = None
+        self._values = {}
+
+    @property
+    def stage(self):
+        return self._stage
+
+    def load(self, stage):
+        """
+        It reads all settings from the default prim of the stage
+
+        :param stage: The stage to read from
+        """
+        self._stage = stage
+        self._prim_path = None
+        self._values.clear()
+        if not stage:
+            return
+        default_prim = stage.GetDefaultPrim()
+        if not default_prim:
+            return
+        self._prim_path = default_prim.GetPath()
+        for name in SETTINGS_TYPES:
+            self._read(name, default_prim.GetAttribute(name))
+
+    def clear(self):
+        self._stage = None
+        self._prim_path = None
+        self._values.clear()
+
+    def _read(self, name, attr):
+        # The attribute is invalid when it was removed
+        value = attr.Get() if attr else None
+        if value is None:
+            self._values.pop(name, None)
+        else:
+            self._values[name] = value
+
+    def get(self, name, default_value=None):
+        """
+        It returns the value of the setting
+
+        :param name: The name of the attribute on the default prim
+        :param default_value: The value to return if the setting doesn't exist (optional)
+        :return: The value of the setting.
+        """
+        value = self._values.get(name)
+        return default_value if value is None else value
+
+    def on_objects_changed(self, notice) -> Set[str]:
+        """
+        Called by Tf.Notice. It re-reads the changed settings.
+
+        :param notice: Usd.Notice.ObjectsChanged
+        :return: A set of names of the settings that have changed.
+        """
+        if not self._stage:
+            return set()
+        changed = set()
+        for paths in (notice.GetChangedInfoOnlyPaths(), notice.GetResyncedPaths()):
+            for path in paths:
+                if path == Sdf.Path.absoluteRootPath or (
+                    path.IsPrimPath() and self._prim_path and self._prim_path.HasPrefix(path)
+                ):
+                    # The default prim itself (or which prim is the default one) could have changed, reload everything
+                    previous = dict(self._values)
+                    self.load(self._stage)
+                    return {
+                        name for name in set(previous) | set(self._values)
+                        if previous.get(name) != self._values.get(name)
+                    }
+                if path.IsPropertyPath() and path.GetPrimPath() == self._prim_path and path.name in SETTINGS_TYPES:
+                    self._read(path.name, self._stage.GetAttributeAtPath(path))
+                    changed.add(path.name)
+        return changed
@@ -0,0 +1,240 @@
+__all__ = ["SpatialIndex", "get_frustum_planes"]
+
+import math
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+def get_frustum_planes(view_projection) -> np.ndarray:
+    """
+    It extracts the planes of the view frustum from the view-projection matrix
+
+    :param view_projection: A 4x4 matrix that transforms row vectors (like Gf.Matrix4d) to the clip space
+    :return: A (6, 4) array of planes (a, b, c, d) with unit normals pointing inside, a point is inside a plane
+        if a*x + b*y + c*z + d >= 0.
+    """
+    matrix = np.asarray(view_projection, dtype=np.float64).reshape(4, 4)
+    w = matrix[:, 3]
+    planes = np.array([
+        w + matrix[:, 0],  # left
+        w - matrix[:, 0],  # right
+        w + matrix[:, 1],  # bottom
+        w - matrix[:, 1],  # top
+        w + matrix[:, 2],  # near
+        w - matrix[:, 2],  # far
+    ])
+    norms = np.linalg.norm(planes[:, :3], axis=1)
+    norms[norms == 0] = 1.0
+    return planes / norms[:, None]
+
+
+class SpatialIndex:
+    """
+    A uniform grid over object positions, backed by a NumPy array.
+    Objects are hashed into cubic cells, so a radius query only looks at the cells the sphere overlaps instead of
+    every object on the stage. Positions can be added, moved and removed one by one.
+    Every object also has bounds (a sphere), they are used to cull objects outside of the view frustum.
+
+    :param cell_size: The size of a grid cell, ideally close to the typical query radius
+    """
+
+    def __init__(self, cell_size: float = 500.0):
+        self._cell_size = float(cell_size) if cell_size and cell_size > 0 else 1.0
+        self._positions = np.zeros((16, 3), dtype=np.float64)
+        # Bounding spheres: center (x, y, z) and radius
+        self._bounds = np.zeros((16, 4), dtype=np.float64)
+        self._keys: List[Hashable] = []
+        self._rows: Dict[Hashable, int] = {}
+        self._row_cells: List[Tuple[int, int, int]] = []
+        self._cells: Dict[Tuple[int, int, int], Set[int]] = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    @property
+    def cell_size(self):
+        return self._cell_size
+
+    @property
+    def keys(self) -> List[Hashable]:
+        """Keys in row order, matches the rows of positions"""
+        return self._keys
+
+    @property
+    def positions(self) -> np.ndarray:
+        """A (N, 3) view of all positions in row order"""
+        return self._positions[:len(self._keys)]
+
+    def get_row(self, key) -> Optional[int]:
+        return self._rows.get(key)
+
+    def _cell_of(self, position) -> Tuple[int, int, int]:
+        size = self._cell_size
+        return (
+            math.floor(position[0] / size),
+            math.floor(position[1] / size),
+            math.floor(position[2] / size),
+        )
+
+    def set_cell_size(self, cell_size: float):
+        """
+        It changes the size of the cells and rehashes all positions if the size is different
+
+        :param cell_size: The new size of a cell
+        """
+        if not cell_size or cell_size <= 0 or cell_size == self._cell_size:
+            return
+        self._cell_size = float(cell_size)
+        self._cells.clear()
+        for row in range(len(self._keys)):
+            cell = self._cell_of(self._positions[row])
+            self._row_cells[row] = cell
+            self._cells.setdefault(cell, set()).add(row)
+
+    def update(self, key, position, bounds=None):
+        """
+        It adds the key with the given position or moves it, if it's already in the index
+
+        :param key: Any hashable key, e.g. a prim path
+        :param position: A sequence of 3 floats
+        :param bounds: A (center, radius) tuple, defaults to a point at the position (optional)
+        """
+        row = self._rows.get(key)
+        cell = self._cell_of(position)
+        if row is None:
+            row = len(self._keys)
+            if row == len(self._positions):
+                self._positions = np.resize(self._positions, (row * 2, 3))
+                self._bounds = np.resize(self._bounds, (row * 2, 4))
+            self._keys.append(key)
+            self._row_cells.append(cell)
+            self._rows[key] = row
+        else:
+            old_cell = self._row_cells[row]
+            if old_cell != cell:
+                self._discard_from_cell(old_cell, row)
+                self._row_cells[row] = cell
+        self._positions[row] = (position[0], position[1], position[2])
+        center, radius = bounds if bounds is not None else (position, 0.0)
+        self._bounds[row] = (center[0], center[1], center[2], radius)
+        self._cells.setdefault(cell, set()).add(row)
+
+    def _discard_from_cell(self, cell, row):
+        rows = self._cells.get(cell)
+        if rows is None:
+            return
+        rows.discard(row)
+        if not rows:
+            del self._cells[cell]
+
+    def remove(self, key):
+        """
+        It removes the key from the index. The last row is moved into its place to keep the arrays dense.
+
+        :param key: The key to remove
+        """
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        self._discard_from_cell(self._row_cells[row], row)
+        last = len(self._keys) - 1
+        if row != last:
+            last_key = self._keys[last]
+            last_cell = self._row_cells[last]
+            self._discard_from_cell(last_cell, last)
+            self._keys[row] = last_key
+            self._row_cells[row] = last_cell
+            self._positions[row] = self._positions[last]
+            self._bounds[row] = self._bounds[last]
+            self._rows[last_key] = row
+            self._cells.setdefault(last_cell, set()).add(row)
+        self._keys.pop()
+        self._row_cells.pop()
+
+    def clear(self):
+        self._keys.clear()
+        self._rows.clear()
+        self._row_cells.clear()
+        self._cells.clear()
+
+    def get_visible_mask(self, planes) -> np.ndarray:
+        """
+        It tests the bounds of all objects against the planes in one go
+
+        :param planes: A (M, 4) array of planes, see get_frustum_planes
+        :return: A boolean array over rows, True for objects that are at least partly inside all planes.
+        """
+        bounds = self._bounds[:len(self._keys)]
+        distances = bounds[:, :3] @ planes[:, :3].T + planes[:, 3]
+        return np.all(distances >= -bounds[:, 3:4], axis=1)
+
+    def _rows_near(self, point, radius) -> np.ndarray:
+        """Returns rows of all objects in cells that overlap the sphere"""
+        low = self._cell_of([point[0] - radius, point[1] - radius, point[2] - radius])
+        high = self._cell_of([point[0] + radius, point[1] + radius, point[2] + radius])
+        cells_count = (high[0] - low[0] + 1) * (high[1] - low[1] + 1) * (high[2] - low[2] + 1)
+        rows = []
+        if cells_count > len(self._cells):
+            # The sphere covers more cells than there are occupied ones, it's cheaper to check occupied cells
+            for cell, cell_rows in self._cells.items():
+                if all(low[i] <= cell[i] <= high[i] for i in range(3)):
+                    rows.extend(cell_rows)
+        else:
+            for x in range(low[0], high[0] + 1):
+                for y in range(low[1], high[1] + 1):
+                    for z in range(low[2], high[2] + 1):
+                        cell_rows = self._cells.get((x, y, z))
+                        if cell_rows:
+                            rows.extend(cell_rows)
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+    def query_radius(self, point, radius: float, candidate_mask: Optional[np.ndarray] = None):
+        """
+        It returns keys of all objects within the radius of the point, sorted from the closest one
+
+        :param point: A sequence of 3 floats
+        :param radius: The maximum distance
+        :param candidate_mask: A boolean array over rows, objects with False are skipped (optional)
+        :return: A list of (key, distance) tuples.
+        """
+        if not self._keys or radius is None or radius < 0:
+            return []
+        rows = self._rows_near(point, radius)
+        if candidate_mask is not None and len(rows):
+            rows = rows[candidate_mask[rows]]
+        if not len(rows):
+            return []
+        deltas = self._positions[rows] - np.asarray(point[:3], dtype=np.float64)
+        distances_sq = np.einsum("ij,ij->i", deltas, deltas)
+        inside = distances_sq <= radius * radius
+        rows = rows[inside]
+        distances = np.sqrt(distances_sq[inside])
+        order = np.argsort(distances, kind="stable")
+        return [(self._keys[rows[i]], float(distances[i])) for i in order]
+
+    def nearest(self, point, max_distance: float, candidate_mask: Optional[np.ndarray] = None):
+        """
+        It finds the closest object to the point, not further than max_distance
+
+        :param point: A sequence of 3 floats
+        :param max_distance: The maximum distance
+        :param candidate_mask: A boolean array over rows, objects with False are skipped (optional)
+        :return: A (key, distance) tuple, or (None, None) if nothing was found.
+        """
+        if not self._keys or max_distance is None or max_distance < 0:
+            return None, None
+        rows = self._rows_near(point, max_distance)
+        if candidate_mask is not None and len(rows):
+            rows = rows[candidate_mask[rows]]
+        if not len(rows):
+            return None, None
+        deltas = self._positions[rows] - np.asarray(point[:3], dtype=np.float64)
+        distances_sq = np.einsum("ij,ij->i", deltas, deltas)
+        closest = int(np.argmin(distances_sq))
+        if distances_sq[closest] > max_distance * max_distance:
+            return None, None
+        return self._keys[rows[closest]], float(math.sqrt(distances_sq[closest]))
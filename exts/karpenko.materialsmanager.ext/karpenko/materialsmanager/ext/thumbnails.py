@@ -0,0 +1,395 @@
+__all__ = [
+    "THUMBNAIL_CACHE_DIR_SETTING",
+    "THUMBNAIL_CACHE_SIZE_SETTING",
+    "THUMBNAIL_SIZE_SETTING",
+    "encode_png",
+    "ThumbnailRenderer",
+    "SwatchRenderer",
+    "StubRenderer",
+    "ThumbnailDiskCache",
+    "ThumbnailService",
+]
+
+import asyncio
+import hashlib
+import math
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import carb
+from pxr import Sdf, Usd
+
+from .material_store import get_material_fingerprint
+
+# carb settings of the thumbnail pipeline
+THUMBNAIL_CACHE_DIR_SETTING = "/exts/karpenko.materialsmanager.ext/thumbnailCacheDir"
+THUMBNAIL_CACHE_SIZE_SETTING = "/exts/karpenko.materialsmanager.ext/thumbnailCacheSizeMB"
+THUMBNAIL_SIZE_SETTING = "/exts/karpenko.materialsmanager.ext/thumbnailSize"
+
+# Inputs of the common shaders that hold the base color, in the order of preference
+_COLOR_INPUTS = ("inputs:diffuse_color_constant", "inputs:diffuseColor", "inputs:base_color", "inputs:albedo")
+
+
+def encode_png(width: int, height: int, pixels: bytes) -> bytes:
+    """
+    It encodes 8-bit RGBA pixels as PNG
+
+    :param width: The width of the image
+    :param height: The height of the image
+    :param pixels: width * height * 4 bytes, row by row
+    :return: The content of the PNG file.
+    """
+    stride = width * 4
+    raw = b"".join(b"\x00" + pixels[y * stride:(y + 1) * stride] for y in range(height))
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(raw, 9)),
+        chunk(b"IEND", b""),
+    ))
+
+
+def _get_key_color(key):
+    """It derives a stable color from the key, used when the material has no known base color"""
+    digest = hashlib.sha1(key.encode()).digest()
+    return tuple(0.2 + 0.6 * channel / 255 for channel in digest[:3])
+
+
+class ThumbnailRenderer:
+    """
+    The base class of the renderer backends. prepare is called on the main thread and reads from the stage
+    everything render needs, render may then run anywhere (e.g. in a worker thread) and must not touch the stage.
+    """
+
+    def prepare(self, prim: Usd.Prim, key: str):
+        """
+        It collects the data needed to render the material
+
+        :param prim: The material prim
+        :param key: The content key of the material
+        :return: Anything, it's passed to render.
+        """
+        return key
+
+    async def render(self, prepared, size: int) -> bytes:
+        """
+        It renders the thumbnail
+
+        :param prepared: The result of prepare
+        :param size: The width and the height of the thumbnail
+        :return: The content of a PNG file.
+        """
+        raise NotImplementedError
+
+
+class SwatchRenderer(ThumbnailRenderer):
+    """
+    Renders a shaded sphere in the base color of the material. The color is taken from the common inputs of the
+    shaders of the material (OmniPBR, UsdPreviewSurface), materials without one get a color derived from their key.
+    The image is computed in a worker thread.
+    """
+
+    def prepare(self, prim, key):
+        for shader in Usd.PrimRange(prim):
+            for name in _COLOR_INPUTS:
+                attr = shader.GetAttribute(name)
+                value = attr.Get() if attr else None
+                if value is not None and len(value) >= 3:
+                    return tuple(min(max(float(channel), 0.0), 1.0) for channel in value[:3])
+        return _get_key_color(key)
+
+    async def render(self, prepared, size):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self._render_sphere, prepared, size)
+
+    @staticmethod
+    def _render_sphere(color, size):
+        pixels = bytearray(size * size * 4)
+        radius = size / 2 - 1
+        center = size / 2
+        # Light from the top left, in front of the sphere
+        light = (-0.5, -0.6, 0.62)
+        length = math.sqrt(sum(i * i for i in light))
+        light = tuple(i / length for i in light)
+        for y in range(size):
+            for x in range(size):
+                dx = (x + 0.5 - center) / radius
+                dy = (y + 0.5 - center) / radius
+                distance = dx * dx + dy * dy
+                if distance > 1.0:
+                    continue
+                dz = math.sqrt(1.0 - distance)
+                diffuse = max(dx * light[0] + dy * light[1] + dz * light[2], 0.0)
+                specular = max(2 * diffuse * dz - light[2], 0.0) ** 24
+                offset = (y * size + x) * 4
+                for channel in range(3):
+                    value = color[channel] * (0.15 + 0.85 * diffuse) + 0.5 * specular
+                    pixels[offset + channel] = int(min(value, 1.0) * 255)
+                # Anti-aliased edge
+                pixels[offset + 3] = int(min((1.0 - distance) * radius, 1.0) * 255)
+        return encode_png(size, size, bytes(pixels))
+
+
+class StubRenderer(ThumbnailRenderer):
+    """
+    A deterministic renderer for headless runs and tests: a flat image in a color derived from the key, rendered
+    synchronously. The same material always gives the same bytes.
+    """
+
+    def __init__(self):
+        self.rendered: List[str] = []
+
+    async def render(self, prepared, size):
+        self.rendered.append(prepared)
+        red, green, blue = (int(channel * 255) for channel in _get_key_color(prepared))
+        return encode_png(size, size, bytes((red, green, blue, 255)) * (size * size))
+
+
+class ThumbnailDiskCache:
+    """
+    A bounded LRU cache of thumbnails on disk, one PNG file per key. The recency is kept in the modification time of
+    the files, so it survives restarts. The directory is scanned and created only when it's used for the first time.
+
+    :param directory: The directory of the cache
+    :param max_bytes: The maximum total size of the files, the least recently used ones are deleted above it
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "Optional[OrderedDict[str, int]]" = None
+        self._size = 0
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, f"{key}.png")
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        self._size = 0
+        try:
+            files = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".png")]
+        except OSError:
+            return
+        stats = sorted(((entry.stat(), entry.name[:-len(".png")]) for entry in files), key=lambda i: i[0].st_mtime)
+        for stat, key in stats:
+            self._entries[key] = stat.st_size
+            self._size += stat.st_size
+
+    def __len__(self):
+        self._load()
+        return len(self._entries)
+
+    @property
+    def size(self):
+        self._load()
+        return self._size
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        It returns the path of the cached thumbnail and marks it as recently used
+
+        :param key: The key of the thumbnail
+        :return: The path of the file, None on a cache miss.
+        """
+        self._load()
+        if key not in self._entries:
+            return None
+        path = self._get_path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            # The file was removed by someone else
+            self._size -= self._entries.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return path
+
+    def put(self, key: str, data: bytes) -> Optional[str]:
+        """
+        It stores the thumbnail and deletes the least recently used ones if the cache is full
+
+        :param key: The key of the thumbnail
+        :param data: The content of the PNG file
+        :return: The path of the file, None if it couldn't be written.
+        """
+        self._load()
+        path = self._get_path(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            carb.log_warn(f"Unable to write the thumbnail {path}: {e}")
+            return None
+        self._size += len(data) - self._entries.pop(key, 0)
+        self._entries[key] = len(data)
+        self._evict(keep=key)
+        return path
+
+    def _evict(self, keep):
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, size = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            self._size -= size
+            try:
+                os.remove(self._get_path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """It deletes all files of the cache"""
+        self._load()
+        for key in list(self._entries):
+            try:
+                os.remove(self._get_path(key))
+            except OSError:
+                pass
+        self._entries.clear()
+        self._size = 0
+
+
+class ThumbnailService:
+    """
+    Provides material thumbnails without blocking the UI. Thumbnails are keyed by the content fingerprint of the
+    material and the size, so identical materials share a thumbnail and an edited material gets a new one.
+    A request is answered right away from memory or from the disk cache, otherwise the thumbnail is rendered in the
+    background and the callback is called with its path once it's ready. Paths served from memory point to the same
+    files, so the UI reuses the textures it has already loaded.
+
+    :param disk_cache: The on-disk cache of rendered thumbnails
+    :param renderer: The renderer backend, defaults to SwatchRenderer (optional)
+    :param size: The width and the height of the thumbnails (optional)
+    :param max_memory_entries: The number of paths kept in memory (optional)
+    """
+
+    def __init__(self, disk_cache: ThumbnailDiskCache, renderer: Optional[ThumbnailRenderer] = None,
+                 size: int = 64, max_memory_entries: int = 512):
+        self.disk_cache = disk_cache
+        self.renderer = renderer or SwatchRenderer()
+        self.size = size
+        self._max_memory_entries = max_memory_entries
+        # Key -> path of the thumbnail
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        # Path of the material -> key, dropped when the material changes
+        self._keys: Dict[Sdf.Path, str] = {}
+        # Key -> callbacks waiting for the thumbnail
+        self._pending: Dict[str, List[Callable[[str], None]]] = {}
+        self._tasks: Dict[str, asyncio.Future] = {}
+
+    def get_key(self, prim: Usd.Prim) -> str:
+        """
+        It returns the key of the material thumbnail, the content fingerprint is computed once per material
+
+        :param prim: The material prim
+        :return: The key.
+        """
+        prim_path = prim.GetPath()
+        key = self._keys.get(prim_path)
+        if key is None:
+            fingerprint = get_material_fingerprint(prim, strict=False)
+            key = f"{fingerprint[:32]}_{self.size}"
+            self._keys[prim_path] = key
+        return key
+
+    def _remember(self, key, path):
+        self._memory[key] = path
+        self._memory.move_to_end(key)
+        if len(self._memory) > self._max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def request(self, prim: Usd.Prim, on_ready: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        It returns the path of the thumbnail of the material if it's available, otherwise it schedules rendering
+
+        :param prim: The material prim
+        :param on_ready: Called with the path of the thumbnail when it has been rendered (optional)
+        :return: The path of the thumbnail, None if it's being rendered.
+        """
+        if not prim:
+            return None
+        key = self.get_key(prim)
+        path = self._memory.get(key)
+        if path is not None:
+            self._memory.move_to_end(key)
+            return path
+        path = self.disk_cache.get(key)
+        if path is not None:
+            self._remember(key, path)
+            return path
+        callbacks = self._pending.setdefault(key, [])
+        if on_ready is not None:
+            callbacks.append(on_ready)
+        if key not in self._tasks:
+            prepared = self.renderer.prepare(prim, key)
+            self._tasks[key] = asyncio.ensure_future(self._render(key, prepared))
+        return None
+
+    async def _render(self, key, prepared):
+        try:
+            data = await self.renderer.render(prepared, self.size)
+            path = self.disk_cache.put(key, data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            carb.log_warn(f"Unable to render the material thumbnail {key}: {e}")
+            path = None
+        finally:
+            self._tasks.pop(key, None)
+        callbacks = self._pending.pop(key, [])
+        if path is None:
+            return
+        self._remember(key, path)
+        for callback in callbacks:
+            callback(path)
+
+    async def wait(self):
+        """It waits until all scheduled thumbnails are rendered"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    def cancel(self):
+        """It cancels rendering of all scheduled thumbnails"""
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self._pending.clear()
+
+    def clear(self):
+        """It forgets the keys of the materials, e.g. when the stage is closed"""
+        self._keys.clear()
+
+    def on_objects_changed(self, notice):
+        """
+        Called by Tf.Notice. It drops the keys of the materials that were edited, removed or resynced.
+
+        :param notice: Usd.Notice.ObjectsChanged
+        """
+        if not self._keys:
+            return
+        for path in notice.GetChangedInfoOnlyPaths():
+            # An attribute of a shader changes the key of the material it belongs to
+            prim_path = path.GetPrimPath()
+            while not prim_path.isEmpty and prim_path != Sdf.Path.absoluteRootPath:
+                self._keys.pop(prim_path, None)
+                prim_path = prim_path.GetParentPath()
+        for path in notice.GetResyncedPaths():
+            prim_path = path.GetPrimPath()
+            stale = [material_path for material_path in self._keys if material_path.HasPrefix(prim_path)]
+            for material_path in stale:
+                del self._keys[material_path]
+            while not prim_path.isEmpty and prim_path != Sdf.Path.absoluteRootPath:
+                self._keys.pop(prim_path, None)
+                prim_path = prim_path.GetParentPath()
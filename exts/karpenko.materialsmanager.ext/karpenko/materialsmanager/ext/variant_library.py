@@ -0,0 +1,219 @@
+__all__ = [
+    "LIBRARY_ROOT",
+    "export_variant_library",
+    "get_library_variants",
+    "read_library_mesh_data",
+    "get_library_asset_path",
+    "is_library_folder",
+    "get_library_loads",
+    "get_library_payloads",
+    "is_linked_library",
+]
+
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pxr import Sdf, Usd
+
+from .mesh_data import MESH_DATA_ATTRS, encode_mesh_data, read_mesh_data
+from .prim_serializer import clone_prims
+
+# Variant folders are stored in the library as children of this root prim, which is the default prim of the layer
+LIBRARY_ROOT = "Variants"
+# Name of the object the variants were exported from, stored in the custom layer data
+_OBJECT_NAME_KEY = "MMEObjectName"
+_ACTIVE_FLAG_NAME = "MMEisActive"
+
+
+def _make_relative(path: str, object_path: Sdf.Path) -> str:
+    path = Sdf.Path(str(path))
+    return str(path.MakeRelativePath(object_path)) if path.HasPrefix(object_path) else str(path)
+
+
+def _make_absolute(path: str, object_path: Sdf.Path) -> str:
+    path = Sdf.Path(str(path))
+    return str(path.MakeAbsolutePath(object_path)) if not path.IsAbsolutePath() else str(path)
+
+
+def _normalize_file_path(file_path: str) -> str:
+    return os.path.normcase(os.path.realpath(file_path))
+
+
+def export_variant_library(
+    stage: Usd.Stage, object_path: Sdf.Path, folder_paths: Iterable[Sdf.Path], file_path: str, overwrite: bool = False
+) -> Optional[Sdf.Layer]:
+    """
+    It writes the variant folders of an object with their materials into a standalone layer, so they can be
+    loaded on demand (see is_library_folder) or imported into another scene. Mesh and material paths of the mesh
+    data are stored relative to the object, so the library can be used by any object with the same hierarchy.
+    The content is built in memory first, so a library can be exported over itself while the stage loads it.
+
+    :param stage: The stage to take the variant folders from
+    :param object_path: The path of the object root
+    :param folder_paths: The paths of the variant folders
+    :param file_path: The path of the library file, e.g. car_looks.usd
+    :param overwrite: Replace the file if it exists (optional)
+    :return: The saved layer, None if it couldn't be created or the file exists and overwrite is False.
+    """
+    object_path = Sdf.Path(str(object_path))
+    exists = os.path.exists(file_path)
+    if exists and not overwrite:
+        return None
+    layer = Sdf.Layer.CreateAnonymous(os.path.splitext(file_path)[1] or ".usda")
+    root_path = Sdf.Path.absoluteRootPath.AppendChild(LIBRARY_ROOT)
+    with Sdf.ChangeBlock():
+        root_spec = Sdf.CreatePrimInLayer(layer, root_path)
+        root_spec.specifier = Sdf.SpecifierDef
+        root_spec.typeName = "Scope"
+        layer.defaultPrim = LIBRARY_ROOT
+        layer.customLayerData = {_OBJECT_NAME_KEY: object_path.name}
+        paths_map = clone_prims(stage, list(folder_paths), root_path, layer)
+        for folder_path, library_path in paths_map.items():
+            entries = read_mesh_data(stage.GetPrimAtPath(folder_path)) or []
+            folder_spec = layer.GetPrimAtPath(library_path)
+            # Whether the folder is active is decided by the scene, see MMEDeactivateVariants
+            folder_spec.ClearInfo("active")
+            # The flag and the mesh data are kept on the folder in the scene, see is_library_folder
+            for attr_name in (_ACTIVE_FLAG_NAME,) + MESH_DATA_ATTRS:
+                attr_spec = folder_spec.attributes.get(attr_name)
+                if attr_spec:
+                    folder_spec.RemoveProperty(attr_spec)
+            mesh_data = encode_mesh_data(
+                {"mesh": _make_relative(mesh, object_path), "path": _make_relative(material, object_path)}
+                for mesh, material in entries
+            )
+            for attr_name, (attr_type, attr_value) in mesh_data.items():
+                attr_spec = Sdf.AttributeSpec(folder_spec, attr_name, attr_type, Sdf.VariabilityVarying, True)
+                attr_spec.default = attr_value
+
+    content = layer
+    layer = Sdf.Layer.FindOrOpen(file_path) if exists else Sdf.Layer.CreateNew(file_path)
+    if not layer:
+        return None
+    layer.TransferContent(content)
+    layer.Save()
+    # The stage may hold the file under another identifier, e.g. resolved from a relative asset path
+    real_path = _normalize_file_path(layer.realPath)
+    for used_layer in stage.GetUsedLayers():
+        if used_layer != layer and used_layer.realPath and _normalize_file_path(used_layer.realPath) == real_path:
+            used_layer.Reload()
+    return layer
+
+
+def get_library_variants(layer: Sdf.Layer) -> List[Sdf.Path]:
+    """
+    It returns the paths of the variant folders stored in the library
+
+    :param layer: The library layer
+    :return: A list of paths of prims in the layer.
+    """
+    root_spec = layer.GetPrimAtPath(Sdf.Path.absoluteRootPath.AppendChild(LIBRARY_ROOT)) if layer else None
+    if not root_spec:
+        return []
+    return [child.path for child in root_spec.nameChildren]
+
+
+def read_library_mesh_data(layer: Sdf.Layer, library_path: Sdf.Path, object_path: Sdf.Path) -> List[dict]:
+    """
+    It reads the mesh data of a variant folder of the library and resolves its paths against the object
+
+    :param layer: The library layer
+    :param library_path: The path of the variant folder in the layer
+    :param object_path: The path of the object the variant is imported into
+    :return: A list of dictionaries containing the material path and the mesh path.
+    """
+    # The layer is opened on its own stage, it's small and nothing is composed around it
+    stage = Usd.Stage.Open(layer, Usd.Stage.LoadNone)
+    entries = read_mesh_data(stage.GetPrimAtPath(library_path)) or []
+    object_path = Sdf.Path(str(object_path))
+    return [
+        {"mesh": Sdf.Path(_make_absolute(mesh, object_path)), "path": Sdf.Path(_make_absolute(material, object_path))}
+        for mesh, material in entries
+    ]
+
+
+def get_library_asset_path(stage: Usd.Stage, file_path: str) -> str:
+    """
+    It returns the asset path the scene should use for the library: relative to the edit target layer of the stage
+    (the payloads are authored there) if both are local files, otherwise the file path as it is
+
+    :param stage: The stage that will load the library
+    :param file_path: The path of the library file
+    :return: The asset path.
+    """
+    layer = stage.GetEditTarget().GetLayer()
+    if layer.anonymous or not layer.realPath:
+        return file_path
+    try:
+        relative_path = os.path.relpath(os.path.abspath(file_path), os.path.dirname(layer.realPath))
+    except ValueError:
+        # E.g. the files are on different drives
+        return file_path
+    return "./" + relative_path.replace(os.sep, "/")
+
+
+def is_library_folder(prim: Usd.Prim) -> bool:
+    """
+    It checks if the variant folder takes its materials from a library as a payload. The flag and the mesh data are
+    authored on the folder itself, so they are available even when the payload is not loaded.
+    """
+    return bool(prim) and prim.HasAuthoredPayloads()
+
+
+def get_library_loads(mme_folder: Usd.Prim, folder_name: Optional[str]) -> Tuple[Set[Sdf.Path], Set[Sdf.Path]]:
+    """
+    It returns which library variant folders have to be loaded and unloaded so that only the active one is loaded
+
+    :param mme_folder: The MME folder of the object
+    :param folder_name: The name of the active variant folder, None or False if no variant is active
+    :return: A tuple of the paths to load and the paths to unload.
+    """
+    load = set()
+    unload = set()
+    if not mme_folder:
+        return load, unload
+    # Unloaded folders are skipped by GetChildren
+    for folder in mme_folder.GetAllChildren():
+        if not is_library_folder(folder):
+            continue
+        if folder_name and folder.GetName() == folder_name:
+            if not folder.IsLoaded():
+                load.add(folder.GetPath())
+        elif folder.IsLoaded():
+            unload.add(folder.GetPath())
+    return load, unload
+
+
+def is_linked_library(mme_folder: Usd.Prim, file_path: str) -> bool:
+    """
+    It checks if any variant folder of the object takes its materials from the library file
+
+    :param mme_folder: The MME folder of the object
+    :param file_path: The path of the library file
+    :return: True if the file is a library of the object.
+    """
+    if not mme_folder:
+        return False
+    real_path = _normalize_file_path(file_path)
+    for folder in mme_folder.GetAllChildren():
+        for prim_spec in folder.GetPrimStack():
+            for payload in prim_spec.payloadList.GetAddedOrExplicitItems():
+                if payload.assetPath and _normalize_file_path(
+                    prim_spec.layer.ComputeAbsolutePath(payload.assetPath)
+                ) == real_path:
+                    return True
+    return False
+
+
+def get_library_payloads(prim: Usd.Prim) -> Dict[str, Sdf.Path]:
+    """
+    It returns the payloads authored on the variant folder in the strongest layer that has them
+
+    :param prim: The variant folder prim
+    :return: A dictionary of asset path -> prim path.
+    """
+    for prim_spec in prim.GetPrimStack():
+        payloads = prim_spec.payloadList.GetAddedOrExplicitItems()
+        if payloads:
+            return {payload.assetPath: payload.primPath for payload in payloads}
+    return {}
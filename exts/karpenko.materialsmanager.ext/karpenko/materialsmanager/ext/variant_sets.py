@@ -0,0 +1,188 @@
+__all__ = [
+    "LOOK_VARIANT_SET",
+    "ORIGINAL_LOOK",
+    "get_look_variant_name",
+    "get_look_folder_name",
+    "has_look_variants",
+    "get_look_variant_names",
+    "get_selected_look",
+    "author_look_variants",
+    "remove_look_variants",
+]
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pxr import Sdf
+
+# Every MME variant of an object can be expressed as a variant of this variant set on the object root
+LOOK_VARIANT_SET = "MMELook"
+# Name of the variant that holds the original materials
+ORIGINAL_LOOK = "Original"
+
+_BINDING_REL_NAME = "material:binding"
+_BINDING_API_NAME = "MaterialBindingAPI"
+_ACTIVE_FLAG_NAME = "MMEisActive"
+
+
+def get_look_variant_name(folder_name: Optional[str]) -> str:
+    """
+    It returns the name of the variant for the variant folder
+
+    :param folder_name: The name of the variant folder, None for the original materials
+    :return: The name of the variant.
+    """
+    return folder_name or ORIGINAL_LOOK
+
+
+def get_look_folder_name(variant_name: str) -> Optional[str]:
+    """
+    It returns the name of the variant folder for the variant, see get_look_variant_name
+
+    :param variant_name: The name of the variant
+    :return: The name of the folder, None for the original materials.
+    """
+    return None if variant_name == ORIGINAL_LOOK else variant_name
+
+
+def has_look_variants(prim) -> bool:
+    """
+    It checks if the variants of the object are stored in the MMELook variant set
+
+    :param prim: The object root prim
+    :return: True if the prim has the variant set.
+    """
+    return bool(prim) and prim.GetVariantSets().HasVariantSet(LOOK_VARIANT_SET)
+
+
+def get_look_variant_names(prim) -> List[str]:
+    """
+    It returns names of all variants of the MMELook variant set
+
+    :param prim: The object root prim
+    :return: A list of variant names, empty if there is no variant set.
+    """
+    if not has_look_variants(prim):
+        return []
+    return prim.GetVariantSet(LOOK_VARIANT_SET).GetVariantNames()
+
+
+def get_selected_look(prim) -> Optional[str]:
+    """
+    It returns the name of the currently selected variant of the MMELook variant set
+
+    :param prim: The object root prim
+    :return: The name of the variant, None if there is no variant set or nothing is selected.
+    """
+    if not has_look_variants(prim):
+        return None
+    return prim.GetVariantSet(LOOK_VARIANT_SET).GetVariantSelection() or None
+
+
+def _get_local_path(path: Sdf.Path, prim_path: Sdf.Path, variant_path: Sdf.Path) -> Sdf.Path:
+    """It returns the path of the spec inside the variant for the path of a prim under the object root"""
+    return path.ReplacePrefix(prim_path, variant_path)
+
+
+def _author_flag(layer: Sdf.Layer, folder_path: Sdf.Path, value: bool):
+    prim_spec = Sdf.CreatePrimInLayer(layer, folder_path)
+    attr_spec = prim_spec.attributes.get(_ACTIVE_FLAG_NAME)
+    if not attr_spec:
+        attr_spec = Sdf.AttributeSpec(
+            prim_spec, _ACTIVE_FLAG_NAME, Sdf.ValueTypeNames.Bool, Sdf.VariabilityVarying, True
+        )
+    attr_spec.default = value
+
+
+def _author_binding(layer: Sdf.Layer, prim_path: Sdf.Path, material_path: Sdf.Path):
+    prim_spec = Sdf.CreatePrimInLayer(layer, prim_path)
+    schemas = Sdf.TokenListOp()
+    schemas.prependedItems = [_BINDING_API_NAME]
+    prim_spec.SetInfo("apiSchemas", schemas)
+    rel_spec = prim_spec.relationships.get(_BINDING_REL_NAME)
+    if not rel_spec:
+        rel_spec = Sdf.RelationshipSpec(prim_spec, _BINDING_REL_NAME, False)
+    rel_spec.targetPathList.ClearEditsAndMakeExplicit()
+    rel_spec.targetPathList.explicitItems = [material_path]
+
+
+def _clear_local_opinions(layer: Sdf.Layer, mesh_paths: Iterable[Sdf.Path], folder_paths: Iterable[Sdf.Path]):
+    """
+    Local opinions are stronger than variants, so the bindings and the flags authored directly on the prims
+    would hide whatever the selected variant says. They are removed, the variants hold them instead.
+    """
+    for mesh_path in mesh_paths:
+        rel_spec = layer.GetRelationshipAtPath(mesh_path.AppendProperty(_BINDING_REL_NAME))
+        if rel_spec:
+            layer.GetPrimAtPath(mesh_path).RemoveProperty(rel_spec)
+    for folder_path in folder_paths:
+        attr_spec = layer.GetAttributeAtPath(folder_path.AppendProperty(_ACTIVE_FLAG_NAME))
+        if attr_spec:
+            layer.GetPrimAtPath(folder_path).RemoveProperty(attr_spec)
+
+
+def _remove_variant_set_spec(prim_spec: Sdf.PrimSpec):
+    if LOOK_VARIANT_SET in prim_spec.variantSets:
+        del prim_spec.variantSets[LOOK_VARIANT_SET]
+    name_list = prim_spec.variantSetNameList
+    for items_name in ("explicitItems", "prependedItems", "appendedItems"):
+        items = list(getattr(name_list, items_name))
+        if LOOK_VARIANT_SET in items:
+            items.remove(LOOK_VARIANT_SET)
+            setattr(name_list, items_name, items)
+    if LOOK_VARIANT_SET in prim_spec.variantSelections:
+        del prim_spec.variantSelections[LOOK_VARIANT_SET]
+
+
+def author_look_variants(
+    layer: Sdf.Layer,
+    prim_path: Sdf.Path,
+    looks: Dict[str, Tuple[Sdf.Path, List[Tuple[Sdf.Path, Sdf.Path]]]],
+    selection: str,
+):
+    """
+    It (re)creates the MMELook variant set on the object root. Each variant binds its materials to the meshes
+    and sets MMEisActive flags of the folders, so switching between looks is a single variant selection edit.
+    The bindings and the flags authored locally in the layer are moved into the variants.
+
+    :param layer: The layer to author into
+    :param prim_path: The path of the object root
+    :param looks: Variant name -> (path of the folder with materials, list of (mesh path, material path))
+    :param selection: The name of the variant to select
+    """
+    prim_path = Sdf.Path(str(prim_path))
+    folder_paths = [folder_path for folder_path, _ in looks.values()]
+    mesh_paths = set()
+    with Sdf.ChangeBlock():
+        prim_spec = Sdf.CreatePrimInLayer(layer, prim_path)
+        _remove_variant_set_spec(prim_spec)
+        variant_set_spec = Sdf.VariantSetSpec(prim_spec, LOOK_VARIANT_SET)
+        for variant_name, (active_folder_path, bindings) in looks.items():
+            variant_path = Sdf.VariantSpec(variant_set_spec, variant_name).primSpec.path
+            for folder_path in folder_paths:
+                local_folder_path = _get_local_path(folder_path, prim_path, variant_path)
+                _author_flag(layer, local_folder_path, folder_path == active_folder_path)
+            for mesh_path, material_path in bindings:
+                mesh_path = Sdf.Path(str(mesh_path))
+                mesh_paths.add(mesh_path)
+                local_mesh_path = _get_local_path(mesh_path, prim_path, variant_path)
+                _author_binding(layer, local_mesh_path, Sdf.Path(str(material_path)))
+        prim_spec.variantSetNameList.prependedItems = list(prim_spec.variantSetNameList.prependedItems) + [
+            LOOK_VARIANT_SET
+        ]
+        prim_spec.variantSelections[LOOK_VARIANT_SET] = selection
+        _clear_local_opinions(layer, mesh_paths, folder_paths)
+
+
+def remove_look_variants(layer: Sdf.Layer, prim_path: Sdf.Path):
+    """
+    It removes the MMELook variant set from the object root, the caller is expected to author the bindings and
+    the flags of the selected look locally again.
+
+    :param layer: The layer to remove the variant set from
+    :param prim_path: The path of the object root
+    """
+    prim_spec = layer.GetPrimAtPath(Sdf.Path(str(prim_path)))
+    if not prim_spec:
+        return
+    with Sdf.ChangeBlock():
+        _remove_variant_set_spec(prim_spec)
@@ -18,6 +18,9 @@ from pxr import UsdLux
 import omni.usd
 import omni.kit.commands
 
+# Properties that change the bounds of a prim, besides the xformOp* ones
+BOUNDS_PROPERTIES = {"points", "extent", "visibility", "purpose", "xformOpOrder"}
+
 
 class WidgetInfoModel(sc.AbstractManipulatorModel):
     """
@@ -54,6 +57,10 @@ class WidgetInfoModel(sc.AbstractManipulatorModel):
         self.get_setting = get_setting
         self._current_path = ""
         self._stage_listener = None
+        # Kept for the lifetime of the model, cleared only when transforms or geometry of the object change
+        self._bbox_cache = None
+        # The mesh the widget is placed above, see find_child_mesh_with_position
+        self._anchor_path = None
 
         # Save the UsdContext name (we currently only work with single Context)
         self._usd_context_name = ''
@@ -71,6 +78,7 @@ class WidgetInfoModel(sc.AbstractManipulatorModel):
 
     def _notice_changed(self, notice, stage):
         """Called by Tf.Notice"""
+        self._invalidate_bounds(notice)
         if self.get_setting("MMEEnableRoamingMode", False):
             self._item_changed(self.position)
             return
@@ -78,6 +86,41 @@ class WidgetInfoModel(sc.AbstractManipulatorModel):
             if self._current_path in str(p.GetPrimPath()):
                 self._item_changed(self.position)
 
+    def _invalidate_bounds(self, notice):
+        """
+        It drops the cached bounds and the anchor mesh if transforms or geometry of the object, or transforms of its
+        ancestors, have changed. Other changes, e.g. of materials, keep them.
+        """
+        if self._bbox_cache is None and self._anchor_path is None:
+            return
+        if not self._prim:
+            return
+        object_path = self._prim.GetPath()
+        for path in notice.GetResyncedPaths():
+            prim_path = path.GetPrimPath()
+            if prim_path.HasPrefix(object_path) or object_path.HasPrefix(prim_path):
+                self._clear_bounds()
+                return
+        for path in notice.GetChangedInfoOnlyPaths():
+            if not path.IsPropertyPath():
+                continue
+            if path.name not in BOUNDS_PROPERTIES and not path.name.startswith("xformOp:"):
+                continue
+            prim_path = path.GetPrimPath()
+            if prim_path.HasPrefix(object_path) or object_path.HasPrefix(prim_path):
+                self._clear_bounds()
+                return
+
+    def _clear_bounds(self):
+        if self._bbox_cache is not None:
+            self._bbox_cache.Clear()
+        self._anchor_path = None
+
+    def _get_bbox_cache(self):
+        if self._bbox_cache is None:
+            self._bbox_cache = UsdGeom.BBoxCache(Usd.TimeCode.Default(), includedPurposes=[UsdGeom.Tokens.default_])
+        return self._bbox_cache
+
     def get_item(self, identifier):
         if identifier == "position":
             return self.position
@@ -158,37 +201,40 @@ class WidgetInfoModel(sc.AbstractManipulatorModel):
 
     def find_child_mesh_with_position(self, prim):
         """
-        A recursive method to find a child with a valid position.
+        It finds the first mesh under the prim with a valid position, the widget is placed above it.
+        The result is memoized until transforms or geometry of the object change.
         """
-        if prim.IsA(UsdGeom.Mesh):
-            self._current_path = str(prim.GetPath())
-            prim_position = self._get_position(non_recursive=True)
+        if self._anchor_path is not None:
+            anchor = prim.GetStage().GetPrimAtPath(self._anchor_path)
+            if anchor:
+                return anchor
+        for child in Usd.PrimRange(prim):
+            if not child.IsA(UsdGeom.Mesh):
+                continue
+            prim_position = self._compute_position(child)
             if prim_position[0] == 0.0 or prim_position[1] == 0.0 or prim_position[2] == 0.0:
-                pass
-            else:
-                return prim
-        for child in prim.GetChildren():
-            result = self.find_child_mesh_with_position(child)
-            if result:
-                return result
-        return None
-
-    def _get_position(self, non_recursive=False):
+                continue
+            self._anchor_path = child.GetPath()
+            return child
+        # There is no such mesh, the bounds of the whole object are used
+        self._anchor_path = prim.GetPath()
+        return prim
+
+    def _compute_position(self, prim):
+        """It returns the top center of the world bounds of the prim"""
+        bound = self._get_bbox_cache().ComputeWorldBound(prim)
+        range = bound.ComputeAlignedBox()
+        bboxMin = range.GetMin()
+        bboxMax = range.GetMax()
+        return [(bboxMin[0] + bboxMax[0]) * 0.5, bboxMax[1] + self._offset, (bboxMin[2] + bboxMax[2]) * 0.5]
+
+    def _get_position(self):
         """Returns position of currently selected object"""
         stage = self._get_context().get_stage()
         if not stage or not self._current_path:
             return [0, 0, 0]
-
+        prim = stage.GetPrimAtPath(self._current_path)
+        if not prim:
+            return [0, 0, 0]
         # Get position directly from USD
-        if non_recursive:
-            prim = stage.GetPrimAtPath(self._current_path)
-        else:
-            prim = self.find_child_mesh_with_position(stage.GetPrimAtPath(self._current_path))
-        box_cache = UsdGeom.BBoxCache(Usd.TimeCode.Default(), includedPurposes=[UsdGeom.Tokens.default_])
-        bound = box_cache.ComputeWorldBound(prim)
-        range = bound.ComputeAlignedBox()
-        bboxMin = range.GetMin()
-        bboxMax = range.GetMax()
-
-        position = [(bboxMin[0] + bboxMax[0]) * 0.5, bboxMax[1] + self._offset, (bboxMin[2] + bboxMax[2]) * 0.5]
-        return position
+        return self._compute_position(self.find_child_mesh_with_position(prim))